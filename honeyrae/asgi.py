@@ -3,6 +3,13 @@ ASGI config for honeyrae project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run it with an ASGI server (e.g. ``uvicorn honeyrae.asgi:application``) to
+serve the async views under ``async/`` (``async/login``, ``async/register``,
+``async/tickets``, ``async/customers`` and ``async/employees``) and the
+``tickets/events`` change feed on the event loop; under WSGI each of them
+would still tie up a worker thread, the feed for as long as a client stays
+connected. Compare the two stacks with ``python manage.py benchmark_asgi``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
 """
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
+import copy
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,13 +47,39 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'repairsapi.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'repairsapi.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'repairsapi.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'repairsapi.pagination.IdCursorPagination',
+    'PAGE_SIZE': 100,
 }
 
+# Token -> user lookups cached in each process by CachedTokenAuthentication
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 60  # seconds
+
+# Process pool used by the async/login and async/register views to hash
+# passwords off the event loop. None starts one worker per CPU. Requests
+# beyond MAX_PENDING queued or running hashes are answered with a 503.
+PASSWORD_HASHING_POOL_SIZE = None
+PASSWORD_HASHING_MAX_PENDING = 64
+
+# The /tickets/events feed is read from the TicketEvent table, which
+# `python manage.py prune_ticket_events` trims to the last HISTORY events.
+# Clients reconnecting with Last-Event-ID after an older event are reset.
+TICKET_EVENTS_HISTORY = 1000
+
 CORS_ORIGIN_WHITELIST = (
     'http://localhost:3000',
     'http://127.0.0.1:3000'
@@ -59,6 +87,7 @@ CORS_ORIGIN_WHITELIST = (
 
 
 MIDDLEWARE = [
+    'repairsapi.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -66,9 +95,23 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'repairsapi.middleware.ReplicaPinningMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Log N+1 query patterns and requests over their view's query budget to the
+# console. For development: enable it with HONEYRAE_INSPECT_QUERIES=1, and it
+# stays off unless DEBUG is on. A query shape counts as N+1 once one request
+# runs it N_PLUS_ONE_THRESHOLD times.
+if os.environ.get('HONEYRAE_INSPECT_QUERIES') == '1':
+    MIDDLEWARE.append('repairsapi.middleware.QueryInspectionMiddleware')
+N_PLUS_ONE_THRESHOLD = 3
+
+# /metrics exposes per-route latencies, so it only answers a scraper sending
+# `Authorization: Bearer <METRICS_TOKEN>` (Prometheus' `authorization` scrape
+# option). Set it with HONEYRAE_METRICS_TOKEN; unset, /metrics refuses everyone.
+METRICS_TOKEN = os.environ.get('HONEYRAE_METRICS_TOKEN')
+
 ROOT_URLCONF = 'honeyrae.urls'
 
 TEMPLATES = [
@@ -100,6 +143,70 @@ DATABASES = {
     }
 }
 
+# Production SQLite profile, for several server processes sharing the file.
+# Enable it with HONEYRAE_SQLITE_PROFILE=production. The backend applies WAL
+# and the other PRAGMAs in repairsapi/db/sqlite3/base.py to each connection
+# and retries on lock contention, and each worker keeps its connection open
+# between requests rather than reconnecting every time.
+if os.environ.get('HONEYRAE_SQLITE_PROFILE') == 'production':
+    DATABASES['default'].update({
+        'ENGINE': 'repairsapi.db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'lock_retries': 5,
+            'lock_backoff': 0.05,
+        },
+    })
+
+
+# Read replicas for the list and retrieve actions; see repairsapi/routers.py.
+# HONEYRAE_REPLICAS is a comma separated list of database files kept current
+# by whatever replicates the primary (e.g. Litestream or LiteFS), each added
+# as replica1, replica2, ... Without it replica1 is still defined, so tests
+# have a second database to stand in for a replica, but nothing reads from it.
+REPLICA_NAMES = [name for name in os.environ.get('HONEYRAE_REPLICAS', '').split(',') if name]
+for number, name in enumerate(REPLICA_NAMES or [BASE_DIR / 'replica.sqlite3'], start=1):
+    DATABASES[f'replica{number}'] = {**copy.deepcopy(DATABASES['default']), 'NAME': name}
+REPLICA_DATABASES = [f'replica{number}' for number in range(1, len(REPLICA_NAMES) + 1)]
+
+DATABASE_ROUTERS = ['repairsapi.routers.ReplicaRouter']
+
+# After writing, a user reads from the primary for this long, long enough for
+# the replicas to have their write. Pins are kept in this cache, which must
+# be shared by every server process for the pin to follow the user: the
+# per-process LocMemCache of 'default' fails the repairsapi.E001 system check
+# once HONEYRAE_REPLICAS is set, so add a Redis or Memcached cache with it.
+REPLICA_PIN_SECONDS = 5
+REPLICA_PIN_CACHE = 'default'
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'repairsapi-responses',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+}
+
+# Rendered list/detail responses are cached in this cache (None disables
+# it). Entries are keyed on table versions, so writes invalidate them.
+# 'responses' is a LocMemCache, so each server process keeps its own copy;
+# see repairsapi/response_cache.py. Tests run with it off, see TEST_RUNNER.
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_MAX_ENTRY_BYTES = 1024 * 1024
+
+TEST_RUNNER = 'repairsapi.testing.TestRunner'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -2,7 +2,10 @@ from django.contrib import admin
 from django.urls import include, path
 from rest_framework import routers
 from repairsapi.views import register_user, login_user
+from repairsapi.views import async_register_user, async_login_user
+from repairsapi.views import AsyncCustomerView, AsyncEmployeeView, AsyncServiceTicketView, TicketEventView
 from repairsapi.views import CustomerView, EmployeeView, ServiceTicketView
+from repairsapi.views import metrics
 
 router = routers.DefaultRouter(trailing_slash=False)
 router.register(r'customers', CustomerView, 'customer')
@@ -10,8 +13,19 @@ router.register(r'employees', EmployeeView, 'employee')
 router.register(r'tickets', ServiceTicketView, 'ticket')
 
 urlpatterns = [
+    # Ahead of the router, whose tickets/<pk> route would match it too
+    path('tickets/events', TicketEventView.as_view()),
     path('', include(router.urls)),
     path('register', register_user),
     path('login', login_user),
+    path('async/register', async_register_user),
+    path('async/login', async_login_user),
+    path('async/customers', AsyncCustomerView.as_view()),
+    path('async/customers/<int:pk>', AsyncCustomerView.as_view()),
+    path('async/employees', AsyncEmployeeView.as_view()),
+    path('async/employees/<int:pk>', AsyncEmployeeView.as_view()),
+    path('async/tickets', AsyncServiceTicketView.as_view()),
+    path('async/tickets/<int:pk>', AsyncServiceTicketView.as_view()),
+    path('metrics', metrics),
     path('admin/', admin.site.urls),
 ]
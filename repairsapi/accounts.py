@@ -0,0 +1,226 @@
+"""Account creation for registration and bulk imports
+
+`create_account()` writes one registration's user, profile and token in a
+single transaction, for `register_user` and `async_register_user`.
+
+`import_accounts()` does the same for a stream of rows, many at a time:
+passwords are hashed across a process pool, and each batch is inserted
+with one `bulk_create` per table. A row that fails validation or uses an
+email that is already taken is reported back instead of aborting the
+import.
+"""
+import csv
+import itertools
+import json
+from django.contrib.auth import hashers
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from rest_framework.authtoken.models import Token
+from repairsapi.models import Customer, Employee
+from repairsapi.versions import bump_versions
+
+
+DUPLICATE_EMAIL = 'An account with that email address already exists'
+
+
+def registration_error(data):
+    '''Validates the fields of a registration request
+
+    Method arguments:
+      data -- The parsed request body
+
+    Returns:
+      str -- A message describing the first problem, or None if valid
+    '''
+    account_type = data.get('account_type', None)
+    email = data.get('email', None)
+    first_name = data.get('first_name', None)
+    last_name = data.get('last_name', None)
+    password = data.get('password', None)
+
+    if account_type is None \
+        or email is None \
+        or first_name is None \
+        or last_name is None \
+        or password is None:
+        return 'You must provide email, password, first_name, last_name and account_type'
+
+    if account_type == 'customer':
+        if data.get('address', None) is None:
+            return 'You must provide an address for a customer'
+    elif account_type == 'employee':
+        if data.get('specialty', None) is None:
+            return 'You must provide a specialty for an employee'
+    else:
+        return 'Invalid account type. Valid values are \'customer\' or \'employee\''
+
+    return None
+
+
+def new_user(data, password):
+    '''Unsaved User for a validated registration
+
+    Method arguments:
+      data -- The registration fields
+      password -- The already hashed password
+    '''
+    return User(
+        username=User.normalize_username(data['email']),
+        email=User.objects.normalize_email(data['email']),
+        password=password,
+        first_name=data['first_name'],
+        last_name=data['last_name'],
+        is_staff=data['account_type'] == 'employee'
+    )
+
+
+def new_profile(data, user_id):
+    '''Unsaved Employee or Customer for a validated registration'''
+    if data['account_type'] == 'employee':
+        return Employee(specialty=data['specialty'], user_id=user_id)
+    return Customer(address=data['address'], user_id=user_id)
+
+
+def create_account(data, password):
+    '''Creates the user, profile and token for a validated registration
+
+    Method arguments:
+      data -- The registration fields
+      password -- The already hashed password
+
+    Returns:
+      Token -- The new user's token
+    '''
+    with transaction.atomic():
+        user = new_user(data, password)
+        user.save()
+        new_profile(data, user.id).save()
+
+        return Token.objects.create(user=user)
+
+
+def read_accounts(lines, file_format):
+    '''Parse registrations from CSV or NDJSON one row at a time
+
+    CSV needs a header row naming the registration fields. Empty CSV cells
+    count as missing, so a customer row may leave `specialty` blank.
+
+    Method arguments:
+      lines -- Iterable of text lines, such as an open file
+      file_format -- 'csv' or 'ndjson'
+
+    Returns:
+      iterator -- (line number, dict of fields) pairs. The dict is None
+                  for a line that isn't a JSON object.
+    '''
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {field: value for field, value in row.items() if value not in ('', None)}
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            data = None
+        yield number, data if isinstance(data, dict) else None
+
+
+def import_accounts(rows, batch_size=500, executor=None):
+    '''Create accounts for every valid row, `batch_size` rows per transaction
+
+    Method arguments:
+      rows -- Iterable of (row number, fields) pairs, as from read_accounts()
+      batch_size -- Rows hashed and inserted together
+      executor -- Pool to hash passwords in, or None to hash in this process
+
+    Returns:
+      tuple -- The number of accounts created, and a list of
+               {'row', 'email', 'message'} dicts for the rows skipped
+    '''
+    created = 0
+    errors = []
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, batch_size)):
+        created += import_batch(batch, errors, executor)
+
+    return created, sorted(errors, key=lambda error: error['row'])
+
+
+def import_batch(batch, errors, executor):
+    '''Validate, hash and insert one batch of rows
+
+    Returns:
+      int -- The number of accounts created
+    '''
+    def skip(number, data, message):
+        errors.append({'row': number, 'email': (data or {}).get('email'), 'message': message})
+
+    accounts = {}
+    for number, data in batch:
+        message = 'Not a JSON object' if data is None else registration_error(data)
+        if message is None and User.normalize_username(data['email']) in accounts:
+            message = DUPLICATE_EMAIL
+        if message is not None:
+            skip(number, data, message)
+            continue
+        accounts[User.normalize_username(data['email'])] = (number, data)
+
+    for username in registered(accounts):
+        skip(*accounts.pop(username), DUPLICATE_EMAIL)
+
+    if not accounts:
+        return 0
+
+    plain = [data['password'] for number, data in accounts.values()]
+    passwords = executor.map(hashers.make_password, plain, chunksize=16) if executor else map(hashers.make_password, plain)
+    accounts = [(number, data, password) for (number, data), password in zip(accounts.values(), passwords)]
+
+    try:
+        with transaction.atomic():
+            insert_accounts([(data, password) for number, data, password in accounts])
+        return len(accounts)
+    except IntegrityError:
+        pass
+
+    # Someone registered one of these emails since the check above, so
+    # find out which by creating the batch's accounts one at a time
+    created = 0
+    for number, data, password in accounts:
+        try:
+            create_account(data, password)
+            created += 1
+        except IntegrityError:
+            skip(number, data, DUPLICATE_EMAIL)
+
+    return created
+
+
+def registered(usernames):
+    '''The subset of `usernames` that already have accounts, found with one query'''
+    return set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+
+def insert_accounts(accounts):
+    '''Bulk insert the users, profiles and tokens of validated registrations
+
+    Method arguments:
+      accounts -- List of (fields, hashed password) pairs
+    '''
+    users = [new_user(data, password) for data, password in accounts]
+    User.objects.bulk_create(users)
+
+    # Read ids back by username rather than relying on bulk_create
+    # setting them, which not every backend supports
+    ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id'))
+    profiles = [new_profile(data, ids[user.username]) for (data, password), user in zip(accounts, users)]
+
+    Customer.objects.bulk_create([profile for profile in profiles if isinstance(profile, Customer)])
+    Employee.objects.bulk_create([profile for profile in profiles if isinstance(profile, Employee)])
+    Token.objects.bulk_create([Token(key=Token.generate_key(), user_id=user_id) for user_id in ids.values()])
+
+    # Bulk inserts skip the save signals that keep these current
+    bump_versions(User, Customer, Employee)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RepairsapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'repairsapi'
+
+    def ready(self):
+        # Connect the signal receivers and register the system checks
+        from repairsapi import checks, signals  # pylint: disable=import-outside-toplevel,unused-import
@@ -0,0 +1,161 @@
+"""Authentication classes for the repairsapi views"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+
+class TokenCache:
+    """Bounded, thread safe LRU cache of token key -> Token with a TTL
+
+    Entries are evicted least recently used first once `max_size` is
+    reached, and expire `ttl` seconds after they were cached. The `hits`
+    and `misses` counters are cumulative for the life of the process.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached Token for `key`, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, token):
+        """Cache `token` under `key`, evicting the oldest entries if full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, token)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Drop a single token"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        """Drop every token belonging to the user with primary key `user_id`"""
+        with self._lock:
+            stale = [key for key, (_, token) in self._entries.items() if token.user_id == user_id]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Current size and hit/miss counters"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+token_cache = TokenCache(
+    max_size=getattr(settings, 'TOKEN_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_CACHE_TTL', 60)
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in replacement for TokenAuthentication that skips the
+    token/user query for recently seen tokens
+
+    Saving or deleting a Token or User in this process evicts the affected
+    entries (see repairsapi.signals). Changes made in other processes, or
+    through queryset `update()` calls that send no signals, are picked up
+    once the entry's TTL runs out.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is not None:
+            return (token.user, token)
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, token)
+        return (user, token)
+
+    async def aauthenticate(self, request):
+        """Async counterpart of `authenticate()` for the async views
+
+        Parses the Authorization header exactly as TokenAuthentication
+        does, but looks an uncached token up with the async ORM.
+
+        Returns:
+            tuple -- (user, token), or None if no token was given
+        """
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        if len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+
+        try:
+            key = auth[1].decode()
+        except UnicodeError as exc:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. Token string should not contain invalid characters.')
+            ) from exc
+
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        """Async counterpart of `authenticate_credentials()`"""
+        token = token_cache.get(key)
+        if token is not None:
+            return (token.user, token)
+
+        model = self.get_model()
+        try:
+            token = await model.objects.select_related('user').aget(key=key)
+        except model.DoesNotExist as exc:
+            raise exceptions.AuthenticationFailed(_('Invalid token.')) from exc
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        token_cache.set(key, token)
+        return (token.user, token)
+
+
+class QueryTokenAuthentication(CachedTokenAuthentication):
+    """CachedTokenAuthentication that also accepts the token as `?token=`
+
+    For the event stream, since browsers' EventSource can't send headers.
+    The Authorization header still takes precedence.
+    """
+
+    async def aauthenticate(self, request):
+        credentials = await super().aauthenticate(request)
+        if credentials is None and request.query_params.get('token'):
+            return await self.aauthenticate_credentials(request.query_params['token'])
+        return credentials
@@ -0,0 +1,27 @@
+"""System checks for the repairsapi settings"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, Tags.database)
+def check_replica_pin_cache(app_configs, **kwargs):  # pylint: disable=unused-argument
+    '''With read replicas, REPLICA_PIN_CACHE must be shared by every server
+    process, or a user's next read can go to a process that never saw their
+    pin and read their write back from a replica that doesn't have it yet'''
+    if not settings.REPLICA_DATABASES:
+        return []
+
+    backend = settings.CACHES.get(settings.REPLICA_PIN_CACHE, {}).get('BACKEND')
+    if backend not in PER_PROCESS_CACHES:
+        return []
+    return [Error(
+        f'REPLICA_PIN_CACHE "{settings.REPLICA_PIN_CACHE}" uses {backend}, which is not shared between processes',
+        hint='Point REPLICA_PIN_CACHE at a cache every server process shares, e.g. Redis or Memcached.',
+        id='repairsapi.E001',
+    )]
@@ -0,0 +1,106 @@
+"""SQLite backend tuned for several server processes sharing one file
+
+Set ENGINE to `repairsapi.db.sqlite3` (honeyrae/settings.py does when
+HONEYRAE_SQLITE_PROFILE=production) to get, on top of Django's backend:
+
+* `PRAGMAS` run on every new connection. Override them with a `pragmas`
+  dict in OPTIONS.
+* `BEGIN IMMEDIATE` for atomic blocks, so writers queue for the write lock
+  instead of failing when two transactions try to upgrade at once.
+* Statements that run outside a transaction are retried with exponential
+  backoff when the database is locked. Set the `lock_retries` and
+  `lock_backoff` (seconds) OPTIONS to tune this.
+"""
+import functools
+import random
+import time
+from django.db.backends.sqlite3 import base
+
+
+PRAGMAS = {
+    # Wait up to 5 seconds for a lock before giving up with SQLITE_BUSY.
+    # First, since switching the journal mode needs a lock of its own.
+    'busy_timeout': 5000,
+    # Readers never block the writer or each other
+    'journal_mode': 'WAL',
+    # In WAL mode only checkpoints fsync. A power cut can lose the last
+    # commits but never corrupts the database.
+    'synchronous': 'NORMAL',
+    # 64 MiB page cache per connection (negative values are KiB)
+    'cache_size': -64000,
+    # Read through a 256 MiB memory map instead of read() calls
+    'mmap_size': 268435456,
+}
+
+
+def is_locked(error):
+    '''True if `error` is SQLite reporting lock contention'''
+    return 'locked' in str(error)
+
+
+class RetryingCursorWrapper(base.SQLiteCursorWrapper):
+    """Cursor that retries statements which fail because the database is locked
+
+    Only statements run outside a transaction are retried: they either took
+    effect or didn't, so running them again is safe. That includes the
+    `BEGIN IMMEDIATE` that opens an atomic block. A lock error inside a
+    transaction is raised so the atomic block rolls back.
+    """
+
+    def __init__(self, connection, retries, backoff):
+        super().__init__(connection)
+        self.retries = retries
+        self.backoff = backoff
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._retry(super().executemany, query, param_list)
+
+    def _retry(self, method, *args):
+        attempt = 0
+        while True:
+            try:
+                return method(*args)
+            except base.Database.OperationalError as ex:
+                if attempt == self.retries or self.connection.in_transaction or not is_locked(ex):
+                    raise
+                # Jitter keeps processes that collided from retrying in lockstep
+                time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+                attempt += 1
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Django's SQLite backend with PRAGMAs, immediate transactions and lock retries"""
+
+    # Set from the database's OPTIONS by get_connection_params()
+    pragmas = PRAGMAS
+    lock_retries = 5
+    lock_backoff = 0.05
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **kwargs.pop('pragmas', {})}
+        self.lock_retries = kwargs.pop('lock_retries', 5)
+        self.lock_backoff = kwargs.pop('lock_backoff', 0.05)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def create_cursor(self, name=None):
+        return self.connection.cursor(factory=functools.partial(
+            RetryingCursorWrapper, retries=self.lock_retries, backoff=self.lock_backoff
+        ))
+
+    def _start_transaction_under_autocommit(self):
+        # A deferred transaction that reads and then writes cannot wait for
+        # the write lock. SQLite fails it at once with "database is locked"
+        # to avoid deadlock. Taking the lock up front lets busy_timeout and
+        # the cursor's retries queue writers instead. Read-only atomic
+        # blocks pay for this by serializing with writers.
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,56 @@
+"""Set-based deletes of tickets and customers
+
+Django's `Model.delete()` and `QuerySet.delete()` collect every row to be
+deleted into memory first, because ServiceTicket has signal receivers,
+and then send a post_delete signal per ticket. For a customer with a long
+history that is one model instance and one table version bump per ticket.
+
+Here tickets go in a single DELETE statement, and the status counters,
+table version and full-text index (through its trigger) are updated in
+bulk alongside it. Nor is a /tickets/events `deleted` event published per
+ticket; the caller publishes one event covering the whole set.
+"""
+from django.db import transaction
+from repairsapi.events import publish_event
+from repairsapi.models import ServiceTicket
+from repairsapi.stats import record_ticket_deletions
+from repairsapi.versions import bump_versions
+
+
+def delete_tickets(tickets):
+    '''Delete the tickets in a queryset with one DELETE statement
+
+    Method arguments:
+      tickets -- ServiceTicket queryset to delete
+
+    Returns:
+      int -- Number of tickets deleted
+    '''
+    with transaction.atomic():
+        record_ticket_deletions(tickets)
+
+        # The collector-free delete Django itself uses when no signals or
+        # cascades are involved. Nothing references a ticket, and the
+        # signal receivers' work is done here in bulk.
+        deleted = tickets._raw_delete(tickets.db)  # pylint: disable=protected-access
+        if deleted:
+            bump_versions(ServiceTicket)
+
+    return deleted
+
+
+def delete_customer(customer):
+    '''Delete a customer along with their tickets, user account and token
+
+    The tickets go with `delete_tickets()`, and /tickets/events clients are
+    sent a single `customer_deleted` event telling them to drop all of the
+    customer's tickets. Deleting the user then cascades to the customer and
+    token rows with the usual signals, which is only a handful of rows by then.
+
+    Method arguments:
+      customer -- The Customer to delete
+    '''
+    with transaction.atomic():
+        if delete_tickets(ServiceTicket.objects.filter(customer=customer)):
+            publish_event('customer_deleted', {'customer': customer.id})
+        customer.user.delete()
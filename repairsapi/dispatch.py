@@ -0,0 +1,165 @@
+"""Assignment of every unclaimed ticket in one pass
+
+`plan_dispatch()` decides who gets which ticket entirely in memory, and
+`dispatch_tickets()` reads what it needs with three queries and writes the
+plan with one UPDATE per `batch_size` tickets. /tickets/events clients are
+sent one `updated` event listing every ticket assigned.
+
+A ticket goes to the least loaded employee whose specialty its description
+mentions ("Laptop won't boot" for a "Laptops" specialist), or to the least
+loaded employee overall when no specialty matches. Emergencies are handed
+out first, then the oldest tickets. Load is the number of open tickets an
+employee holds, including the ones assigned so far in the pass, so the
+work spreads evenly instead of piling onto whoever started emptiest.
+"""
+import heapq
+import re
+from django.db import transaction
+from django.db.models import Case, Count, When
+from repairsapi.events import publish_ticket_events
+from repairsapi.models import Employee, ServiceTicket
+from repairsapi.stats import record_ticket_changes, snapshot
+from repairsapi.versions import bump_versions
+
+
+def terms(text):
+    '''Lowercased words of `text` with a plural "s" dropped, so "Routers"
+    and "router" match'''
+    return {word[:-1] if word.endswith('s') and len(word) > 3 else word for word in re.findall(r'\w+', text.lower())}
+
+
+class Workloads:
+    """Min-heaps of (open tickets, employee id), one per specialty and one
+    over every employee
+
+    Taking a ticket makes an employee's entries in the heaps stale. Rather
+    than search the heaps for them, a fresh entry is pushed, and stale
+    ones are dropped as they surface.
+    """
+
+    def __init__(self, employees, loads):
+        self.loads = {employee_id: loads.get(employee_id, 0) for employee_id, _ in employees}
+        self.everyone = [(load, employee_id) for employee_id, load in self.loads.items()]
+        self.by_term = {}
+        self.terms_of = {}
+
+        for employee_id, specialty in employees:
+            self.terms_of[employee_id] = terms(specialty)
+            for term in self.terms_of[employee_id]:
+                self.by_term.setdefault(term, []).append((self.loads[employee_id], employee_id))
+
+        heapq.heapify(self.everyone)
+        for heap in self.by_term.values():
+            heapq.heapify(heap)
+
+    def least_loaded(self, heap):
+        '''Current (load, employee id) at the top of `heap`, or None if it is empty'''
+        while heap:
+            load, employee_id = heap[0]
+            if load == self.loads[employee_id]:
+                return load, employee_id
+            heapq.heappop(heap)
+        return None
+
+    def take(self, ticket_terms):
+        '''Give a ticket with `ticket_terms` to the least loaded matching employee
+
+        Returns:
+          int -- The employee's id, or None if there are no employees
+        '''
+        candidates = [
+            top for top in (self.least_loaded(self.by_term[term]) for term in ticket_terms & self.by_term.keys())
+            if top is not None
+        ]
+        if not candidates:
+            candidates = [top for top in [self.least_loaded(self.everyone)] if top is not None]
+        if not candidates:
+            return None
+
+        load, employee_id = min(candidates)
+        self.loads[employee_id] = load + 1
+        heapq.heappush(self.everyone, (load + 1, employee_id))
+        for term in self.terms_of[employee_id]:
+            heapq.heappush(self.by_term[term], (load + 1, employee_id))
+        return employee_id
+
+
+def plan_dispatch(tickets, employees, loads):
+    '''Decide which employee takes each ticket
+
+    Method arguments:
+      tickets -- (id, description, emergency) of each ticket to assign
+      employees -- (id, specialty) of each employee who can take tickets
+      loads -- Open tickets already held, by employee id
+
+    Returns:
+      dict -- Employee id by ticket id, in the order they were handed out
+    '''
+    workloads = Workloads(employees, loads)
+    plan = {}
+
+    for ticket_id, description, _ in sorted(tickets, key=lambda ticket: (not ticket[2], ticket[0])):
+        employee_id = workloads.take(terms(description))
+        if employee_id is None:
+            break
+        plan[ticket_id] = employee_id
+
+    return plan
+
+
+def dispatch_tickets(batch_size=5000):
+    '''Assign every open, unassigned ticket to an employee
+
+    Returns:
+      dict -- Employee id by ticket id of the tickets assigned
+    '''
+    open_tickets = ServiceTicket.objects.filter(date_completed__isnull=True)
+
+    with transaction.atomic():
+        rows = list(
+            open_tickets
+                .filter(employee__isnull=True)
+                .select_for_update()
+                .values('id', 'customer_id', 'description', 'emergency')
+        )
+        tickets = [(row['id'], row['description'], row['emergency']) for row in rows]
+        employees = list(Employee.objects.filter(user__is_active=True).values_list('id', 'specialty'))
+        loads = dict(
+            open_tickets.filter(employee__isnull=False)
+                .values('employee').annotate(count=Count('id')).values_list('employee', 'count')
+        )
+
+        plan = plan_dispatch(tickets, employees, loads)
+        assigned = list(plan.items())
+
+        for start in range(0, len(assigned), batch_size):
+            by_employee = {}
+            for ticket_id, employee_id in assigned[start:start + batch_size]:
+                by_employee.setdefault(employee_id, []).append(ticket_id)
+
+            ServiceTicket.objects.filter(pk__in=[ticket_id for ids in by_employee.values() for ticket_id in ids]).update(
+                employee_id=Case(*(When(pk__in=ids, then=employee_id) for employee_id, ids in by_employee.items()))
+            )
+
+        if plan:
+            bump_versions(ServiceTicket)
+
+        emergency = {ticket_id: is_emergency for ticket_id, _, is_emergency in tickets}
+        record_ticket_changes(
+            (
+                snapshot({'employee_id': None, 'date_completed': None, 'emergency': emergency[ticket_id]}),
+                snapshot({'employee_id': employee_id, 'date_completed': None, 'emergency': emergency[ticket_id]}),
+            )
+            for ticket_id, employee_id in assigned
+        )
+
+        customers = {row['id']: row['customer_id'] for row in rows}
+        publish_ticket_events('updated', (
+            {
+                'id': ticket_id, 'customer_id': customers[ticket_id], 'employee_id': employee_id,
+                'emergency': emergency[ticket_id], 'date_completed': None,
+            }
+            for ticket_id, employee_id in assigned
+        ))
+
+    return plan
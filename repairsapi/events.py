@@ -0,0 +1,183 @@
+"""Publishing ticket changes for the /tickets/events feed, through the
+database
+
+Every code path that creates, changes or deletes tickets calls
+`publish_ticket_events()` inside its transaction, which adds one event
+listing every ticket it wrote to the TicketEvent table, so a dispatch or
+bulk write of thousands of tickets is still one event. Bulk deletes
+publish a single event for the whole set instead, see `publish_event()`,
+rather than listing the tickets. The events commit or roll back with
+the write, and each client streaming /tickets/events polls the table with
+`follow()`, so the feed is the same whichever server process serves it and
+whichever processes made the writes.
+
+- An event's id is its row id. A client reconnecting with Last-Event-ID is
+  sent the events after it, see `resume_after()`. One that missed events
+  since pruned, or whose id the table never held, gets a `reset` event
+  telling it to reload the ticket list.
+- The table keeps growing until `python manage.py prune_ticket_events`
+  trims it to the newest TICKET_EVENTS_HISTORY events; schedule it (e.g.
+  cron) like reconcile_ticket_stats.
+
+Clients read events in id order, which is the order they committed in
+because SQLite runs one write transaction at a time. On a database with
+concurrent writers an event committed after a higher id was read would be
+skipped.
+"""
+import asyncio
+from django.conf import settings
+from repairsapi.models import TicketEvent
+from repairsapi.renderers import encode_json
+
+
+def ticket_data(ticket):
+    """The fields of a ticket sent in its events
+
+    Accepts a ServiceTicket or a dict of its columns from `values()`.
+    Relations are given as ids, as `?expand=` with no value sends them.
+    """
+    if not isinstance(ticket, dict):
+        ticket = {
+            'id': ticket.id,
+            'customer_id': ticket.customer_id,
+            'employee_id': ticket.employee_id,
+            'emergency': ticket.emergency,
+            'date_completed': ticket.date_completed,
+        }
+
+    date_completed = ticket['date_completed']
+    return {
+        'id': ticket['id'],
+        'emergency': ticket['emergency'],
+        'date_completed': None if date_completed is None else str(date_completed),
+        'employee': ticket['employee_id'],
+        'customer': ticket['customer_id'],
+    }
+
+
+def publish_ticket_events(kind, tickets):
+    '''Add an event for the tickets to the feed, with the current transaction
+
+    The event's data is `{'tickets': [...]}`, with `ticket_data()` of each.
+
+    Method arguments:
+      kind -- 'created', 'updated' or 'deleted'
+      tickets -- ServiceTickets or `values()` dicts with their id,
+                 customer_id, employee_id, emergency and date_completed
+    '''
+    data = [ticket_data(ticket) for ticket in tickets]
+    if data:
+        TicketEvent.objects.create(kind=kind, data={'tickets': data})
+
+
+def publish_event(kind, data):
+    '''Add one event to the feed, with the current transaction
+
+    For changes to a whole set of tickets not worth listing one by one,
+    such as all of a customer's being deleted.
+
+    Method arguments:
+      kind -- The event's name, e.g. 'customer_deleted'
+      data -- Its dict of data, with a 'customer' key naming whose tickets
+              changed so only staff and that customer are sent it
+    '''
+    TicketEvent.objects.create(kind=kind, data=data)
+
+
+def visible_data(event, customer):
+    '''The part of `event`'s data a client for `customer` may see
+
+    Method arguments:
+      event -- The TicketEvent
+      customer -- Id of the client's customer, or None for staff
+
+    Returns:
+      dict -- The data, with only the customer's own tickets in a list of
+              them, or None if the client may see none of it
+    '''
+    if customer is None:
+        return event.data
+    if 'tickets' in event.data:
+        tickets = [ticket for ticket in event.data['tickets'] if ticket['customer'] == customer]
+        return {'tickets': tickets} if tickets else None
+    return event.data if event.data['customer'] == customer else None
+
+
+def encode(event):
+    '''The event as a Server-Sent Events message'''
+    return b'id: %d\nevent: %s\ndata: %s\n\n' % (event.id, event.kind.encode(), encode_json(event.data))
+
+
+async def latest_event_id():
+    '''Id of the most recent event, or 0 if there are none'''
+    return await TicketEvent.objects.order_by('-id').values_list('id', flat=True).afirst() or 0
+
+
+async def resume_after(last_event_id):
+    '''Where a client's feed starts
+
+    Method arguments:
+      last_event_id -- The Last-Event-ID the client reconnected with, or None
+
+    Returns:
+      tuple -- The id of the event to follow on from, and whether every
+               event the client missed is still there to be sent
+    '''
+    latest = await latest_event_id()
+    if last_event_id is None:
+        return latest, True
+    if not last_event_id.isdigit() or int(last_event_id) > latest:
+        return latest, False
+
+    oldest = await TicketEvent.objects.order_by('id').values_list('id', flat=True).afirst()
+    if oldest is not None and int(last_event_id) < oldest - 1:
+        return latest, False
+    return int(last_event_id), True
+
+
+async def follow(after, customer, poll, heartbeat, batch=500):
+    '''Yield the events after `after` that the client may see, as they are
+    committed, or None after `heartbeat` seconds without one. Each event's
+    data is narrowed to `visible_data()`.
+
+    Method arguments:
+      after -- Id of the last event the client has
+      customer -- Id of the customer whose events the client may see,
+                  or None for every event
+      poll -- Seconds between looking for new events
+      heartbeat -- Seconds without an event before yielding None
+      batch -- Most events read at a time
+    '''
+    idle = 0
+    while True:
+        events = [event async for event in TicketEvent.objects.filter(id__gt=after).order_by('id')[:batch]]
+        for event in events:
+            after = event.id
+            event.data = visible_data(event, customer)
+            if event.data is not None:
+                idle = 0
+                yield event
+        if len(events) == batch:
+            continue
+
+        if idle >= heartbeat:
+            idle = 0
+            yield None
+        await asyncio.sleep(poll)
+        idle += poll
+
+
+def prune_ticket_events(keep=None):
+    '''Delete all but the newest `keep` events
+
+    Method arguments:
+      keep -- Events to keep, TICKET_EVENTS_HISTORY by default
+
+    Returns:
+      int -- Number of events deleted
+    '''
+    keep = getattr(settings, 'TICKET_EVENTS_HISTORY', 1000) if keep is None else keep
+    cutoff = TicketEvent.objects.order_by('-id').values_list('id', flat=True)[keep:keep + 1].first()
+    if cutoff is None:
+        return 0
+    return TicketEvent.objects.filter(id__lte=cutoff).delete()[0]
@@ -0,0 +1,112 @@
+"""Sparse fieldsets for the read endpoints
+
+`?fields=id,emergency` limits a response to the named fields, and
+`?expand=` names the relations to render as nested objects. Relations
+that aren't expanded are rendered as their id, so `?expand=` with no
+value collapses them all. Without either parameter every field is sent
+and every relation is expanded, as before.
+
+The fieldset limits the query as well as the output: only the columns
+behind the requested fields are selected, and the tables behind a field
+are only joined when it is sent. Responses are cached and tagged per full
+URL, so each fieldset gets its own cache entry and ETag.
+"""
+from rest_framework import exceptions
+
+
+class Fieldset:
+    """The fields of a resource a request asked for, in the serializer's
+    order, and which of its relations to nest
+
+    Args:
+        fields -- Names of the fields to output
+        expanded -- Names of the relations to render as nested objects
+    """
+
+    def __init__(self, fields, expanded=()):
+        self.fields = tuple(fields)
+        self.expanded = frozenset(expanded)
+
+    def __eq__(self, other):
+        return isinstance(other, Fieldset) and (self.fields, self.expanded) == (other.fields, other.expanded)
+
+    def expands(self, relation):
+        """True if `relation` is sent as a nested object rather than its id"""
+        return relation in self.fields and relation in self.expanded
+
+    def columns(self, columns):
+        """Columns to select for the fields, from a field -> columns mapping"""
+        return [column for field in self.fields for column in columns[field]]
+
+
+def requested_fieldset(request, fields, relations=()):
+    '''Read `?fields=` and `?expand=` from a request
+
+    Method arguments:
+      request -- The DRF request
+      fields -- Every field the resource has, in output order
+      relations -- The fields that are nested objects when expanded
+
+    Returns:
+      Fieldset -- The requested fields, or all of them
+
+    Raises:
+      ValidationError -- A parameter names a field the resource doesn't have
+    '''
+    params = request.query_params
+    names = fields
+    if 'fields' in params:
+        requested = parse_names(params['fields'], 'fields', fields)
+        if not requested:
+            raise exceptions.ValidationError({'fields': ['Name at least one field']})
+        names = [field for field in fields if field in requested]
+
+    expanded = relations
+    if 'expand' in params:
+        expanded = parse_names(params['expand'], 'expand', relations)
+
+    return Fieldset(names, expanded)
+
+
+def parse_names(value, param, allowed):
+    '''Split a comma separated parameter, rejecting names not in `allowed`'''
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = sorted(names - set(allowed))
+    if unknown:
+        raise exceptions.ValidationError({
+            param: [f'Unknown field {", ".join(unknown)}. Choose from {", ".join(allowed) or "none"}.']
+        })
+    return names
+
+
+def only_fieldset(queryset, fieldset, columns):
+    '''Defer every column `fieldset` doesn't need and join only the related
+    tables it reads
+
+    Method arguments:
+      queryset -- Model queryset to limit
+      fieldset -- The requested Fieldset
+      columns -- Mapping of each field to the columns it is built from,
+                 with `relation__column` for columns of a related table
+    '''
+    needed = fieldset.columns(columns)
+    related = {column.split('__')[0] for column in needed if '__' in column}
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+
+    # The primary key is always read, for pagination
+    return queryset.only('id', *needed)
+
+
+class FieldsetSerializerMixin:
+    """Serializer mixin that outputs only a Fieldset's fields
+
+    Pass `fieldset=` when creating the serializer. Fields outside it are
+    dropped before serialization, so they are never read from instances.
+    """
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fieldset is not None:
+            for name in set(self.fields) - set(fieldset.fields):
+                self.fields.pop(name)
@@ -0,0 +1,88 @@
+"""Password hashing in a bounded process pool
+
+PBKDF2 with hundreds of thousands of iterations holds a CPU for a large
+fraction of a second. Running it in a separate process keeps the event
+loop (and the GIL) free to serve other requests while a login or
+registration is being hashed.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+def process_pool(max_workers=None):
+    """A process pool whose workers can hash with the project's settings
+
+    Args:
+        max_workers -- Number of worker processes (None for one per CPU)
+    """
+    # Spawned workers don't inherit the server's threads or open
+    # database connections, only DJANGO_SETTINGS_MODULE
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+class PoolBusy(Exception):
+    """Raised when more hashes are queued than the pool allows"""
+
+
+class HashingPool:
+    """Process pool for `make_password`/`check_password` with a cap on
+    how many hashes may be queued or running at once
+
+    Args:
+        max_workers -- Number of worker processes (None for one per CPU)
+        max_pending -- Hashes allowed in flight before PoolBusy is raised
+    """
+
+    def __init__(self, max_workers, max_pending):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _submit(self, func, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise PoolBusy()
+            self.pending += 1
+
+            if self._executor is None:
+                self._executor = process_pool(self.max_workers)
+
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._release(None)
+            raise
+
+        future.add_done_callback(self._release)
+        return asyncio.wrap_future(future)
+
+    def _release(self, _future):
+        with self._lock:
+            self.pending -= 1
+
+    async def make_password(self, password):
+        """Hash `password` with the configured hasher"""
+        return await self._submit(hashers.make_password, password)
+
+    async def check_password(self, password, encoded):
+        """Return True if `password` matches the `encoded` hash"""
+        return await self._submit(hashers.check_password, password, encoded)
+
+    def shutdown(self):
+        """Stop the worker processes. The pool restarts on next use."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+hashing_pool = HashingPool(
+    max_workers=getattr(settings, 'PASSWORD_HASHING_POOL_SIZE', None),
+    max_pending=getattr(settings, 'PASSWORD_HASHING_MAX_PENDING', 64)
+)
@@ -0,0 +1,288 @@
+"""Load-benchmark the API's main endpoints and report latency percentiles as JSON"""
+import json
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from repairsapi.models import Customer, Employee, ServiceTicket
+from repairsapi.stats import reconcile_ticket_stats
+from repairsapi.versions import bump_versions
+
+
+BENCH_PASSWORD = 'apibench'
+
+
+def staff_tickets(context, _i):
+    return 'GET', '/tickets', None, context['staff_token']
+
+
+def customer_tickets(context, _i):
+    return 'GET', '/tickets', None, context['customer_token']
+
+
+def login(context, _i):
+    return 'POST', '/login', {'email': context['email'], 'password': context['password']}, None
+
+
+def ticket_create(context, i):
+    return 'POST', '/tickets', {'description': f'apibench ticket {i}', 'emergency': i % 10 == 0}, context['customer_token']
+
+
+def ticket_assign(context, i):
+    ticket = context['tickets'][i % len(context['tickets'])]
+    employee = context['employees'][i % len(context['employees'])]
+    return 'PUT', f'/tickets/{ticket}', {'employee': employee}, context['staff_token']
+
+
+# Each scenario turns the request number into (method, path, body, token)
+SCENARIOS = {
+    'staff-tickets': staff_tickets,
+    'customer-tickets': customer_tickets,
+    'login': login,
+    'ticket-create': ticket_create,
+    'ticket-assign': ticket_assign,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Send concurrent requests for each scenario (staff and customer ticket '
+        'lists, login, ticket create and assign) and report p50/p95/p99 latency, '
+        'throughput and, in process, database queries per request, as JSON. '
+        'By default the app runs in process against a scratch database seeded '
+        'with --tickets tickets. Pass --url to target a running server instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server, e.g. http://localhost:8000')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma separated scenarios to run')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=10, help='Requests in flight at once')
+        parser.add_argument('--tickets', type=int, default=1000, help='Tickets to seed the scratch database with')
+        parser.add_argument('--no-response-cache', action='store_true', help='In process: turn the response cache off')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--staff-token', help='With --url: token of a staff user')
+        parser.add_argument('--customer-token', help='With --url: token of a customer')
+        parser.add_argument('--email', help='With --url: email to log in with')
+        parser.add_argument('--password', help='With --url: password to log in with')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'].split(',')
+        unknown = set(scenarios) - SCENARIOS.keys()
+        if unknown:
+            raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}. Choose from {", ".join(SCENARIOS)}.')
+
+        if options['url']:
+            missing = [name for name in ('staff_token', 'customer_token', 'email', 'password') if not options[name]]
+            if missing:
+                raise CommandError(f'--url also needs {", ".join("--" + name.replace("_", "-") for name in missing)}')
+            transport = HttpTransport(options['url'])
+            results = self.run(transport, self.remote_context(transport, options), scenarios, options)
+        else:
+            with scratch_database(), override_settings(**({'RESPONSE_CACHE_ALIAS': None} if options['no_response_cache'] else {})):
+                transport = InProcessTransport()
+                results = self.run(transport, seed(options['tickets']), scenarios, options)
+
+        report = {
+            'started': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': current_commit(),
+            'target': options['url'] or 'in-process',
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'response_cache': None if options['url'] else not options['no_response_cache'],
+            'scenarios': results,
+        }
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+            for name, result in results.items():
+                latency = result['latency_ms']
+                self.stdout.write(
+                    f'{name:<18}{result["throughput"]:>9.1f} req/s  p50 {latency["p50"]:.2f}  '
+                    f'p95 {latency["p95"]:.2f}  p99 {latency["p99"]:.2f} ms  errors {result["errors"]}'
+                )
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+    def run(self, transport, context, scenarios, options):
+        '''Run each scenario in turn
+
+        Returns:
+          dict -- Results keyed by scenario name
+        '''
+        results = {}
+        for name in scenarios:
+            requests = [SCENARIOS[name](context, i) for i in range(options['requests'])]
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                timings = list(executor.map(lambda request: transport.request(*request), requests))
+            elapsed = time.perf_counter() - start
+
+            latencies = sorted(latency * 1000 for latency, _, _ in timings)
+            queries = [count for _, _, count in timings if count is not None]
+            method, path, _, _ = requests[0]
+
+            results[name] = {
+                'method': method,
+                'path': path,
+                'requests': len(requests),
+                'errors': sum(not 200 <= code < 300 for _, code, _ in timings),
+                'seconds': round(elapsed, 3),
+                'throughput': round(len(requests) / elapsed, 1),
+                'latency_ms': {
+                    'p50': round(percentile(latencies, 50), 2),
+                    'p95': round(percentile(latencies, 95), 2),
+                    'p99': round(percentile(latencies, 99), 2),
+                    'mean': round(statistics.fmean(latencies), 2),
+                },
+                'queries_per_request': round(statistics.fmean(queries), 2) if queries else None,
+            }
+        return results
+
+    def remote_context(self, transport, options):
+        '''Look up the tickets and employees to assign on a running server'''
+        context = {
+            'staff_token': options['staff_token'],
+            'customer_token': options['customer_token'],
+            'email': options['email'],
+            'password': options['password'],
+        }
+        context['tickets'] = [ticket['id'] for ticket in transport.get_json('/tickets', context['staff_token'])['results']]
+        context['employees'] = [employee['id'] for employee in transport.get_json('/employees', context['staff_token'])['results']]
+        return context
+
+
+def percentile(ordered, rank):
+    '''The `rank`th percentile of an already sorted list, by nearest rank'''
+    index = max(0, min(len(ordered) - 1, round(rank / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def current_commit():
+    '''The checked out git commit, so results can be compared across commits'''
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class InProcessTransport:
+    """Sends requests through Django's WSGI handler on the calling thread,
+    counting the queries each one makes"""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def request(self, method, path, body, token):
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client()
+
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        send = getattr(self.local.client, method.lower())
+
+        start = time.perf_counter()
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = send(path, json.dumps(body) if body is not None else None, content_type='application/json', headers=headers)
+        return time.perf_counter() - start, response.status_code, len(queries)
+
+
+class HttpTransport:
+    """Sends requests to a running server over HTTP"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, body, token):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(body).encode() if body is not None else None,
+            method=method,
+            headers={'Content-Type': 'application/json', **({'Authorization': f'Token {token}'} if token else {})}
+        )
+
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                code = response.status
+        except urllib.error.HTTPError as ex:
+            code = ex.code
+        return time.perf_counter() - start, code, None
+
+    def get_json(self, path, token):
+        request = urllib.request.Request(self.base_url + path, headers={'Authorization': f'Token {token}'})
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)
+
+
+@contextmanager
+def scratch_database():
+    '''Run the block against a freshly migrated test database
+
+    SQLite gets a temporary file rather than the usual in-memory test
+    database, which several threads can't write to at once.
+    '''
+    connection = connections['default']
+
+    with tempfile.TemporaryDirectory() as directory, \
+            override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = str(Path(directory) / 'apibench.sqlite3')
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed(tickets):
+    '''Create the users, employees and tickets the scenarios need
+
+    Returns:
+      dict -- Tokens, login details and the ids to assign
+    '''
+    password = make_password(BENCH_PASSWORD)
+
+    staff = User.objects.create(username='staff@apibench.test', password=password, is_staff=True)
+    customer_user = User.objects.create(username='customer@apibench.test', password=password)
+    customer = Customer.objects.create(user=customer_user, address='1 Benchmark Way')
+
+    employees = Employee.objects.bulk_create(
+        Employee(user=User.objects.create(username=f'employee{i}@apibench.test', password=password, is_staff=True), specialty='Routers')
+        for i in range(10)
+    )
+    created = ServiceTicket.objects.bulk_create(
+        (ServiceTicket(customer=customer, description=f'Seeded ticket {i}', emergency=i % 10 == 0) for i in range(tickets)),
+        batch_size=500
+    )
+    bump_versions(ServiceTicket)
+    reconcile_ticket_stats()
+
+    return {
+        'staff_token': Token.objects.create(user=staff).key,
+        'customer_token': Token.objects.create(user=customer_user).key,
+        'email': customer_user.username,
+        'password': BENCH_PASSWORD,
+        'tickets': [ticket.id for ticket in created],
+        'employees': [employee.id for employee in employees],
+    }
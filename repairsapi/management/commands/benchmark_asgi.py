@@ -0,0 +1,97 @@
+"""Compare WSGI+sync and ASGI+async throughput for the same endpoint"""
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from rest_framework.authtoken.models import Token
+
+
+class Command(BaseCommand):
+    help = (
+        'Send the same GET to a ViewSet and to its async/ counterpart with many '
+        'requests in flight, and report the throughput and latency of each. '
+        'WSGI requests run on a pool of threads, ASGI requests as tasks on one '
+        'event loop. Both run in process against the configured database, '
+        'with the response cache turned off so every request reaches the view.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/tickets', help='Synchronous endpoint to request, e.g. /tickets?status=done')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests to send to each stack')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once')
+        parser.add_argument('--token', help='Token to authenticate with (default: any staff token)')
+
+    def handle(self, *args, **options):
+        token = options['token'] or Token.objects.filter(user__is_staff=True).values_list('key', flat=True).first()
+        if token is None:
+            raise CommandError('No staff token found. Seed the database or pass --token.')
+
+        headers = {'Authorization': f'Token {token}'}
+        path, total, concurrency = options['path'], options['requests'], options['concurrency']
+
+        with override_settings(RESPONSE_CACHE_ALIAS=None, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            results = [
+                ('WSGI + sync', path, *run_wsgi(path, headers, total, concurrency)),
+                ('ASGI + async', f'/async{path}', *async_to_sync(run_asgi)(f'/async{path}', headers, total, concurrency)),
+            ]
+
+        self.stdout.write(f'{total} requests, {concurrency} concurrent\n')
+        self.stdout.write(f'{"stack":<14}{"path":<32}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"errors":>8}')
+        for stack, url, elapsed, latencies, errors in results:
+            percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            self.stdout.write(
+                f'{stack:<14}{url:<32}{total / elapsed:>10.1f}'
+                f'{percentiles[49] * 1000:>10.2f}{percentiles[94] * 1000:>10.2f}{errors:>8}'
+            )
+
+
+def run_wsgi(path, headers, total, concurrency):
+    '''Send `total` requests through the WSGI handler from `concurrency` threads
+
+    Returns:
+      tuple -- Elapsed seconds, per-request latencies and the number of non-200 responses
+    '''
+    local = threading.local()
+
+    def request(_):
+        if not hasattr(local, 'client'):
+            local.client = Client(headers=headers)
+        start = time.perf_counter()
+        response = local.client.get(path)
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timings = list(executor.map(request, range(total)))
+    elapsed = time.perf_counter() - start
+
+    return elapsed, [latency for latency, _ in timings], sum(code != 200 for _, code in timings)
+
+
+async def run_asgi(path, headers, total, concurrency):
+    '''Send `total` requests through the ASGI handler as tasks, `concurrency` at a time
+
+    Returns:
+      tuple -- Elapsed seconds, per-request latencies and the number of non-200 responses
+    '''
+    # AsyncClient's default headers don't reach the ASGI scope, so they
+    # are sent with each request instead
+    client = AsyncClient()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def request():
+        async with slots:
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    timings = await asyncio.gather(*(request() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+
+    return elapsed, [latency for latency, _ in timings], sum(code != 200 for _, code in timings)
@@ -0,0 +1,77 @@
+"""Time deleting a customer with a long ticket history, Django's way and set-based"""
+import time
+import tracemalloc
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from repairsapi.deletion import delete_customer
+from repairsapi.management.commands.apibench import scratch_database
+from repairsapi.models import Customer, Employee, ServiceTicket
+from repairsapi.stats import reconcile_ticket_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'In a scratch database, give two customers --tickets tickets each, then '
+        'delete one with Model.delete() and the other with '
+        'repairsapi.deletion.delete_customer(), and report the time, queries '
+        'and peak Python memory of each, and how many status counter rows '
+        'each left out of step with the tickets.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=100000, help='Tickets of each customer')
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            employees = [
+                Employee.objects.create(user=User.objects.create(username=f'employee{i}@bench.test', is_staff=True), specialty='Routers')
+                for i in range(10)
+            ]
+            customers = [
+                Customer.objects.create(user=User.objects.create(username=f'customer{i}@bench.test'), address='1 Bench St.')
+                for i in range(2)
+            ]
+            for customer in customers:
+                ServiceTicket.objects.bulk_create((
+                    ServiceTicket(
+                        customer=customer,
+                        employee=employees[i % 10] if i % 3 else None,
+                        description=f'Benchmark ticket {i}',
+                        emergency=i % 10 == 0,
+                        date_completed='2022-05-01' if i % 2 else None,
+                    ) for i in range(options['tickets'])
+                ), batch_size=5000)
+            reconcile_ticket_stats()
+
+            self.stdout.write(f'{options["tickets"]} tickets per customer\n')
+            self.stdout.write(f'{"path":<16}{"seconds":>9}{"queries":>9}{"peak MiB":>10}{"drifted":>9}')
+            for name, delete in (('Model.delete()', lambda customer: customer.delete()), ('set-based', delete_customer)):
+                customer = Customer.objects.select_related('user').get(pk=customers.pop().pk)
+                seconds, queries, peak = measure(delete, customer)
+                drifted = reconcile_ticket_stats()
+                self.stdout.write(f'{name:<16}{seconds:>9.2f}{queries:>9}{peak / 2 ** 20:>10.1f}{drifted:>9}')
+
+
+def measure(delete, customer):
+    '''Run `delete(customer)`
+
+    Returns:
+      tuple -- Seconds taken, queries run and peak traced memory in bytes
+    '''
+    queries = 0
+
+    def count(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    with connection.execute_wrapper(count):
+        delete(customer)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds, queries, peak
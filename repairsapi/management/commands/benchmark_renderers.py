@@ -0,0 +1,66 @@
+"""Time JSONRenderer/JSONParser against the fast renderer and parser on ticket pages"""
+import io
+import random
+import timeit
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+from repairsapi.parsers import FastJSONParser
+from repairsapi.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = (
+        'Render and parse a synthetic ticket list payload shaped like a '
+        '/tickets page, with DRF\'s JSONRenderer and JSONParser and with the '
+        'project\'s FastJSONRenderer and FastJSONParser, and report the best '
+        'time of each. No database is needed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=1000, help='Tickets in the payload')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs, of which the best is reported')
+
+    def handle(self, *args, **options):
+        payload = ticket_page(options['tickets'])
+        body = JSONRenderer().render(payload)
+
+        def best(func):
+            return min(timeit.repeat(func, number=1, repeat=options['repeat'])) * 1000
+
+        timings = [
+            ('render', best(lambda: JSONRenderer().render(payload)), best(lambda: FastJSONRenderer().render(payload))),
+            ('parse', best(lambda: JSONParser().parse(io.BytesIO(body))), best(lambda: FastJSONParser().parse(io.BytesIO(body)))),
+        ]
+
+        self.stdout.write(
+            f'{options["tickets"]} tickets, {len(body) / 1024:.0f} KiB, '
+            f'orjson {orjson.__version__ if orjson else "not installed"}\n'
+        )
+        self.stdout.write(f'{"":<8}{"DRF ms":>10}{"fast ms":>10}{"speedup":>10}')
+        for name, drf, fast in timings:
+            self.stdout.write(f'{name:<8}{drf:>10.2f}{fast:>10.2f}{drf / fast:>9.1f}x')
+
+
+def ticket_page(count):
+    '''A page of `count` tickets as the list endpoint serializes it'''
+    rng = random.Random(0)
+    results = []
+    for i in range(1, count + 1):
+        assigned = rng.random() < 0.67
+        results.append({
+            'id': i,
+            'description': ' '.join(rng.choices(('screen', 'cracked', 'battery', 'wifi', 'drops', 'Écran', 'won\'t', 'boot'), k=12)),
+            'emergency': rng.random() < 0.1,
+            'date_completed': date(2022, 1, 1) + timedelta(days=rng.randrange(365)) if rng.random() < 0.4 else None,
+            'employee': {'id': rng.randrange(1, 50), 'specialty': 'Routers', 'full_name': 'Emily Lemmon'} if assigned else None,
+            'customer': {'id': rng.randrange(1, 1000), 'full_name': 'Ryan Tanay'},
+        })
+
+    return ReturnDict({
+        'next': 'http://localhost:8000/tickets?cursor=cD0xMDA%3D',
+        'previous': None,
+        'results': ReturnList(results, serializer=None),
+    }, serializer=None)
@@ -0,0 +1,139 @@
+"""Measure concurrent ticket writes from several processes on one SQLite file"""
+import multiprocessing
+import os
+import tempfile
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand
+
+# Worker processes import Django and the models only once configure() has
+# pointed the settings at the scratch database
+# pylint: disable=import-outside-toplevel
+
+
+PROFILES = ('default', 'production')
+
+
+class Command(BaseCommand):
+    help = (
+        'Start several processes that each create, assign and delete tickets '
+        'the way ServiceTicketView.create, update and destroy do, all writing '
+        'to one scratch SQLite file, and report the throughput and "database is locked" '
+        'failures for the default and production SQLite profiles.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8, help='Writer processes')
+        parser.add_argument('--tickets', type=int, default=200, help='Tickets each process creates')
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('spawn')
+        processes, tickets = options['processes'], options['tickets']
+
+        self.stdout.write(f'{processes} processes, {tickets} tickets each\n')
+        self.stdout.write(f'{"profile":<12}{"writes/s":>10}{"failed":>8}{"seconds":>10}')
+
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in PROFILES:
+                path = str(Path(directory) / f'{profile}.sqlite3')
+
+                # Build the schema in a process of its own, so this one never
+                # opens the scratch file with the wrong profile
+                setup = context.Process(target=prepare_database, args=(path, profile))
+                setup.start()
+                setup.join()
+
+                start_barrier = context.Barrier(processes)
+                results = context.Queue()
+                workers = [
+                    context.Process(target=write_tickets, args=(path, profile, tickets, start_barrier, results))
+                    for _ in range(processes)
+                ]
+                for worker in workers:
+                    worker.start()
+                outcomes = [results.get() for _ in workers]
+                for worker in workers:
+                    worker.join()
+
+                written = sum(done for done, _, _ in outcomes)
+                failed = sum(failures for _, failures, _ in outcomes)
+                elapsed = max(seconds for _, _, seconds in outcomes)
+                self.stdout.write(f'{profile:<12}{written / elapsed:>10.1f}{failed:>8}{elapsed:>10.2f}')
+
+
+def configure(path, profile):
+    '''Set Django up in a worker process against the scratch database'''
+    if profile == 'production':
+        os.environ['HONEYRAE_SQLITE_PROFILE'] = 'production'
+    else:
+        os.environ.pop('HONEYRAE_SQLITE_PROFILE', None)
+
+    import django
+    from django.conf import settings
+    django.setup()
+
+    # No connection has been opened yet, so this takes effect
+    settings.DATABASES['default']['NAME'] = path
+
+
+def prepare_database(path, profile):
+    '''Migrate the scratch database and add a customer and an employee'''
+    configure(path, profile)
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from repairsapi.models import Customer, Employee
+
+    call_command('migrate', verbosity=0)
+    Customer.objects.create(user=User.objects.create(username='customer@example.com'), address='1 Main St.')
+    Employee.objects.create(user=User.objects.create(username='employee@example.com', is_staff=True), specialty='Routers')
+
+
+def write_tickets(path, profile, count, start_barrier, results):
+    '''Create, assign and delete tickets, counting writes that fail on a lock'''
+    configure(path, profile)
+    from django.db import OperationalError, connection, transaction
+    from repairsapi.models import Customer, Employee, ServiceTicket
+    from repairsapi.stats import record_ticket_change, snapshot
+
+    customer = Customer.objects.get()
+    employee = Employee.objects.get()
+    done = failures = 0
+
+    start_barrier.wait()
+    start = time.perf_counter()
+
+    for i in range(count):
+        try:
+            # ServiceTicketView.create
+            ticket = ServiceTicket(customer=customer, description=f'Ticket {i}', emergency=i % 10 == 0)
+            with transaction.atomic():
+                ticket.save()
+                record_ticket_change(None, snapshot(ticket))
+            done += 1
+
+            # ServiceTicketView.update
+            ticket = ServiceTicket.objects.get(pk=ticket.pk)
+            before = snapshot(ticket)
+            ticket.employee = employee
+            with transaction.atomic():
+                ticket.save()
+                record_ticket_change(before, snapshot(ticket))
+            done += 1
+
+            # ServiceTicketView.destroy, for every other ticket. It reads
+            # before writing inside its transaction, the pattern that makes
+            # a deferred transaction fail at once rather than wait its turn.
+            if i % 2:
+                with transaction.atomic():
+                    ticket = ServiceTicket.objects.get(pk=ticket.pk)
+                    before = snapshot(ticket)
+                    ticket.delete()
+                    record_ticket_change(before, None)
+                done += 1
+        except OperationalError as ex:
+            if 'locked' not in str(ex):
+                raise
+            failures += 1
+
+    results.put((done, failures, time.perf_counter() - start))
+    connection.close()
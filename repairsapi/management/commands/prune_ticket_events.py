@@ -0,0 +1,15 @@
+"""Trim the /tickets/events feed's table to its most recent events"""
+from django.core.management.base import BaseCommand
+from repairsapi.events import prune_ticket_events
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete all but the newest TICKET_EVENTS_HISTORY events behind '
+        '/tickets/events, which otherwise grow with every ticket write. '
+        'Schedule it periodically (e.g. cron).'
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune_ticket_events()
+        self.stdout.write(f'Pruned ticket events, {deleted} row(s) deleted')
@@ -0,0 +1,14 @@
+"""Recompute the ticket status counters from the ticket table"""
+from django.core.management.base import BaseCommand
+from repairsapi.stats import reconcile_ticket_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the ticket status counters behind /tickets/stats from the '
+        'ticket table, correcting any drift. Schedule it periodically (e.g. cron).'
+    )
+
+    def handle(self, *args, **options):
+        drifted = reconcile_ticket_stats()
+        self.stdout.write(f'Reconciled ticket statistics, {drifted} row(s) corrected')
@@ -0,0 +1,154 @@
+"""Fill an empty database with a large, reproducible synthetic data set"""
+import itertools
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+from repairsapi.models import Customer, Employee, ServiceTicket
+from repairsapi.stats import reconcile_ticket_stats
+from repairsapi.versions import bump_versions
+
+
+FIRST_NAMES = (
+    'Ada', 'Ben', 'Cleo', 'Dev', 'Emily', 'Farah', 'Gus', 'Hana', 'Ivan', 'June',
+    'Kai', 'Leah', 'Meg', 'Noor', 'Omar', 'Pia', 'Quinn', 'Ryan', 'Sol', 'Tess',
+)
+LAST_NAMES = (
+    'Alvarez', 'Bird', 'Chen', 'Diaz', 'Evans', 'Fox', 'Gwin', 'Hale', 'Ito', 'Jones',
+    'Khan', 'Lemmon', 'Moss', 'Norris', 'Okafor', 'Park', 'Reyes', 'Solis', 'Tanay', 'Webb',
+)
+STREETS = ('Main St.', 'Oak Ave.', 'Elm St.', 'Maple Dr.', 'Cedar Ln.', 'Pine Ct.', 'Lake Rd.', 'Hill St.')
+SPECIALTIES = ('Routers', 'Laptops', 'Mobile phones', 'Tablets', 'Printers', 'Desktops')
+WORDS = (
+    'screen', 'cracked', 'battery', 'drains', 'fast', 'will', 'not', 'boot', 'keyboard',
+    'sticky', 'keys', 'wifi', 'drops', 'signal', 'overheats', 'fan', 'noisy', 'charger',
+    'broken', 'port', 'loose', 'speaker', 'crackles', 'blue', 'screen', 'after', 'update',
+    'water', 'damage', 'slow', 'freezes', 'randomly', 'hinge', 'snapped', 'lights', 'blinking',
+)
+
+# Fixed so the generated rows don't depend on when the command runs
+EPOCH = datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+
+class Command(BaseCommand):
+    rng = None
+    batch_size = None
+
+    help = (
+        'Fill an empty, migrated database with synthetic customers, employees, '
+        'their users and tokens, and tickets, using batched bulk inserts. Every '
+        'user shares one password hash (see --password), and the same --seed '
+        'always produces the same rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=1000, help='Customers to create')
+        parser.add_argument('--employees', type=int, default=50, help='Employees to create')
+        parser.add_argument('--tickets', type=int, default=10000, help='Tickets to create')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--password', default='honeyrae', help='Password of every generated user')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        if any(model.objects.exists() for model in (User, Customer, Employee, ServiceTicket)):
+            raise CommandError('The database already has data. Run this on a freshly migrated database.')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        # Hash once: at 320k PBKDF2 iterations a hash per user would take
+        # longer than everything else put together
+        password = make_password(options['password'])
+
+        with transaction.atomic():
+            users = self.create_users(options['customers'], options['employees'], password)
+            customer_ids = self.create_customers(users[:options['customers']])
+            employee_ids = self.create_employees(users[options['customers']:])
+            self.create_tokens(users)
+            self.create_tickets(options['tickets'], customer_ids, employee_ids)
+
+            # Bulk inserts skip the save signals that keep these current
+            bump_versions(User, Customer, Employee, ServiceTicket)
+            reconcile_ticket_stats()
+
+    def insert(self, model, rows, count):
+        '''Bulk insert `count` rows from the `rows` iterable, one batch at a time'''
+        start = time.perf_counter()
+        rows = iter(rows)
+        while batch := list(itertools.islice(rows, self.batch_size)):
+            model.objects.bulk_create(batch, batch_size=self.batch_size)
+
+        self.stdout.write(f'{model.__name__}: {count} rows in {time.perf_counter() - start:.1f}s')
+
+    def create_users(self, customers, employees, password):
+        '''Create a user for every customer and employee
+
+        Returns:
+          list -- The new user ids, customers' first
+        '''
+        def rows():
+            for i in range(customers + employees):
+                is_staff = i >= customers
+                first_name = self.rng.choice(FIRST_NAMES)
+                last_name = self.rng.choice(LAST_NAMES)
+                email = f'{"employee" if is_staff else "customer"}{i}@example.com'
+                yield User(
+                    username=email,
+                    email=email,
+                    password=password,
+                    first_name=first_name,
+                    last_name=last_name,
+                    is_staff=is_staff,
+                    date_joined=EPOCH + timedelta(minutes=self.rng.randrange(365 * 24 * 60)),
+                )
+
+        self.insert(User, rows(), customers + employees)
+
+        # The table was empty, so ids follow insertion order. Reading them
+        # back works on every backend, unlike ids returned by bulk_create.
+        return list(User.objects.order_by('id').values_list('id', flat=True))
+
+    def create_customers(self, user_ids):
+        self.insert(Customer, (
+            Customer(user_id=user_id, address=f'{self.rng.randrange(1, 9999)} {self.rng.choice(STREETS)}')
+            for user_id in user_ids
+        ), len(user_ids))
+        return list(Customer.objects.order_by('id').values_list('id', flat=True))
+
+    def create_employees(self, user_ids):
+        self.insert(Employee, (
+            Employee(user_id=user_id, specialty=self.rng.choice(SPECIALTIES))
+            for user_id in user_ids
+        ), len(user_ids))
+        return list(Employee.objects.order_by('id').values_list('id', flat=True))
+
+    def create_tokens(self, user_ids):
+        # Keys come from the seeded generator rather than os.urandom, so
+        # the same seed gives the same tokens to log in with
+        self.insert(Token, (
+            Token(key=f'{self.rng.getrandbits(160):040x}', user_id=user_id)
+            for user_id in user_ids
+        ), len(user_ids))
+
+    def create_tickets(self, count, customer_ids, employee_ids):
+        if count and not customer_ids:
+            raise CommandError('Tickets need at least one customer')
+
+        def rows():
+            for _ in range(count):
+                # Roughly two thirds assigned and two fifths completed
+                employee_id = self.rng.choice(employee_ids) if employee_ids and self.rng.random() < 0.67 else None
+                completed = self.rng.random() < 0.4
+                yield ServiceTicket(
+                    customer_id=self.rng.choice(customer_ids),
+                    employee_id=employee_id,
+                    description=' '.join(self.rng.choices(WORDS, k=self.rng.randrange(4, 16)))[:155].capitalize(),
+                    emergency=self.rng.random() < 0.1,
+                    date_completed=date(2022, 1, 1) + timedelta(days=self.rng.randrange(365)) if completed else None,
+                )
+
+        self.insert(ServiceTicket, rows(), count)
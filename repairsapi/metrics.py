@@ -0,0 +1,206 @@
+"""Per-request timings and the process-wide histograms behind /metrics
+
+ServerTimingMiddleware (repairsapi.middleware) starts a RequestTimings for
+each request and makes it current. Every query run on a database
+connection while it is current is counted and timed by `time_query()`,
+which repairsapi.signals installs on each new connection, and that
+includes queries sent from `sync_to_async` threads, since they share the
+request's context.
+
+The histograms live in process memory, so each server process reports its
+own; Prometheus sums them across the processes it scrapes.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from repairsapi.authentication import token_cache
+
+
+# Prometheus' default buckets, in seconds
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 7.5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    """Where the time in one request went
+
+    The view phase runs from the view being called to it returning, and is
+    reported as `view`. The database time inside it is reported as `db`,
+    and the rest as `serialize`, which for these views is almost all
+    building the response data. `render` is the renderer turning that data
+    into bytes, and `total` the whole request, middleware included.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.view_start = None
+        self.view_end = None
+        self.view_db = 0.0
+        self.render_end = None
+        self.end = None
+
+    def view_called(self):
+        self.view_start = time.perf_counter()
+
+    def view_returned(self):
+        self.view_end = time.perf_counter()
+        self.view_db = self.db
+
+    def rendered(self):
+        self.render_end = time.perf_counter()
+
+    def finish(self):
+        self.end = time.perf_counter()
+        if self.view_start is not None and self.view_end is None:
+            self.view_returned()
+
+    def phases(self):
+        '''Seconds spent in each phase of the finished request
+
+        Returns:
+          dict -- db, serialize, render, view and total
+        '''
+        view = serialize = 0.0
+        if self.view_start is not None:
+            view = self.view_end - self.view_start
+            serialize = max(0.0, view - self.view_db)
+
+        render = 0.0
+        if self.render_end is not None:
+            render = self.render_end - self.view_end
+
+        return {
+            'db': self.db,
+            'serialize': serialize,
+            'render': render,
+            'view': view,
+            'total': self.end - self.start,
+        }
+
+    def server_timing(self):
+        '''The Server-Timing header value, with durations in milliseconds'''
+        phases = self.phases()
+        return ', '.join([
+            f'db;dur={phases["db"] * 1000:.2f};desc="{self.queries} queries"',
+            f'serialize;dur={phases["serialize"] * 1000:.2f}',
+            f'render;dur={phases["render"] * 1000:.2f}',
+            f'view;dur={phases["view"] * 1000:.2f}',
+            f'total;dur={phases["total"] * 1000:.2f}',
+        ])
+
+
+def time_query(execute, sql, params, many, context):
+    '''Database execute wrapper adding each query to the current request's timings'''
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db += time.perf_counter() - start
+        timings.queries += 1
+
+
+class Histogram:
+    """Thread safe Prometheus histogram with a fixed set of label names"""
+
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        '''Count `value` in the series for the `labels` tuple'''
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def exposition(self):
+        '''The histogram in the Prometheus text format
+
+        Returns:
+          list -- Lines of text
+        '''
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                pairs = list(zip(self.label_names, labels))
+                for bound, count in zip(self.buckets, series['buckets']):
+                    lines.append(f'{self.name}_bucket{label_set(pairs + [("le", bound)])} {count}')
+                lines.append(f'{self.name}_bucket{label_set(pairs + [("le", "+Inf")])} {series["count"]}')
+                lines.append(f'{self.name}_sum{label_set(pairs)} {series["sum"]}')
+                lines.append(f'{self.name}_count{label_set(pairs)} {series["count"]}')
+        return lines
+
+
+def label_set(pairs):
+    '''Format (name, value) pairs as a Prometheus label set, escaping the values'''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+request_seconds = Histogram(
+    'honeyrae_request_duration_seconds',
+    'Time spent in each phase of a request (db, serialize, render, view, total).',
+    ('route', 'method', 'phase'),
+    SECONDS_BUCKETS,
+)
+request_queries = Histogram(
+    'honeyrae_request_queries',
+    'Database queries run per request.',
+    ('route', 'method'),
+    QUERY_BUCKETS,
+)
+
+
+def observe_request(route, method, timings):
+    '''Add a finished request's timings to the histograms'''
+    for phase, seconds in timings.phases().items():
+        request_seconds.observe((route, method, phase), seconds)
+    request_queries.observe((route, method), timings.queries)
+
+
+def render_metrics():
+    '''Every metric in the Prometheus text exposition format
+
+    Returns:
+      str -- The body for the /metrics endpoint
+    '''
+    token_stats = token_cache.stats()
+    lines = [
+        *request_seconds.exposition(),
+        *request_queries.exposition(),
+        '# HELP honeyrae_token_cache_hits_total Token lookups answered from the token cache.',
+        '# TYPE honeyrae_token_cache_hits_total counter',
+        f'honeyrae_token_cache_hits_total {token_stats["hits"]}',
+        '# HELP honeyrae_token_cache_misses_total Token lookups that went to the database.',
+        '# TYPE honeyrae_token_cache_misses_total counter',
+        f'honeyrae_token_cache_misses_total {token_stats["misses"]}',
+        '# HELP honeyrae_token_cache_entries Tokens currently cached.',
+        '# TYPE honeyrae_token_cache_entries gauge',
+        f'honeyrae_token_cache_entries {token_stats["size"]}',
+    ]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,206 @@
+"""Middleware for the repairsapi app"""
+import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from repairsapi.metrics import RequestTimings, current_timings, observe_request
+from repairsapi.queries import budget_for, inspect_queries
+from repairsapi.routers import apin_to_primary, pin_to_primary
+
+
+logger = logging.getLogger('repairsapi.queries')
+
+
+class ServerTimingMiddleware:
+    """Time each request's database, serialize and render phases
+
+    The timings are sent back in a `Server-Timing` header, which browser
+    developer tools show alongside the network timings, and added to the
+    per-route histograms served at /metrics. `view` times the view alone
+    and `total` the whole request; place it first in MIDDLEWARE so `total`
+    covers the other middleware too.
+
+    The timings end when the response is returned, so the body of a
+    streamed response (`?stream=1`) is not included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = RequestTimings()
+        reset = current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(reset)
+
+        return self.report(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        reset = current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(reset)
+
+        return self.report(request, response, timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):  # pylint: disable=unused-argument
+        timings = current_timings.get()
+        if timings is not None:
+            timings.view_called()
+
+    def process_template_response(self, request, response):
+        # Called between the view returning and the response being
+        # rendered, which DRF Responses are
+        timings = current_timings.get()
+        if timings is not None:
+            timings.view_returned()
+            response.add_post_render_callback(lambda rendered: timings.rendered())
+        return response
+
+    def report(self, request, response, timings):
+        timings.finish()
+        response['Server-Timing'] = timings.server_timing()
+        observe_request(route_name(request), request.method, timings)
+        return response
+
+
+def route_name(request):
+    '''Low cardinality label for the URL pattern the request matched
+
+    Returns:
+      str -- The URL name (e.g. "ticket-detail"), else the route
+             (e.g. "async/tickets/<int:pk>"), else "unmatched"
+    '''
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name if match.url_name else match.route
+
+
+class ReplicaPinningMiddleware:
+    """Pin a user who has just written to the primary database
+
+    Their reads then skip the replicas until replication has caught up
+    with the write; see repairsapi.routers.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        response = self.get_response(request)
+        user = written_by(request, response)
+        if user is not None:
+            pin_to_primary(user)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        user = written_by(request, response)
+        if user is not None:
+            await apin_to_primary(user)
+        return response
+
+
+def written_by(request, response):
+    '''The user a successful write was made by
+
+    Returns:
+      User -- The user the request's token belongs to, or None for reads,
+              failed writes and requests without a token
+    '''
+    if request.method in ('GET', 'HEAD', 'OPTIONS') or response.status_code >= 400:
+        return None
+
+    # DRF and the async views set `request.auth` once they have authenticated
+    # the token. Going through it rather than `request.user` never loads a
+    # session, which would be a blocking query under ASGI.
+    token = getattr(request, 'auth', None)
+    return None if token is None else token.user
+
+
+class QueryInspectionMiddleware:
+    """Development aid that logs N+1 query patterns and blown query budgets
+
+    Logs a warning to the `repairsapi.queries` logger for each query shape
+    a request runs N_PLUS_ONE_THRESHOLD or more times, with the stack of
+    project code that ran it, and for each request that runs more queries
+    than its view's `@query_budget`. It is only enabled when DEBUG is on;
+    see HONEYRAE_INSPECT_QUERIES in honeyrae/settings.py.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with inspect_queries() as inspector:
+            response = self.get_response(request)
+        self.report(request, inspector)
+        return response
+
+    async def __acall__(self, request):
+        with inspect_queries() as inspector:
+            response = await self.get_response(request)
+        self.report(request, inspector)
+        return response
+
+    def report(self, request, inspector):
+        for shape, count, stack in inspector.repeated():
+            logger.warning(
+                'Possible N+1: %s %s ran %d queries of the shape\n  %s\nfirst repeated at\n%s',
+                request.method, logged_path(request), count, shape, stack
+            )
+
+        match = getattr(request, 'resolver_match', None)
+        budget = budget_for(match.func, request.method) if match is not None else None
+        if budget is not None and inspector.total > budget:
+            logger.warning(
+                'Query budget exceeded: %s %s ran %d queries, over its budget of %d',
+                request.method, logged_path(request), inspector.total, budget
+            )
+
+
+def logged_path(request):
+    '''The request's path and query string for logs, with any `?token=`
+    redacted
+
+    The query string is kept because `?fields=`, `?expand=` and the like
+    change which queries a request runs. /tickets/events accepts the API
+    token as `?token=`, which must not end up in the logs.
+    '''
+    params = request.GET.copy()
+    if 'token' in params:
+        params.setlist('token', ['REDACTED'])
+    return f'{request.path}?{params.urlencode(safe=",")}' if params else request.path
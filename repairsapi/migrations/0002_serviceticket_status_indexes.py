@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repairsapi', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='serviceticket',
+            index=models.Index(condition=models.Q(('date_completed__isnull', False)), fields=['id'], name='ticket_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceticket',
+            index=models.Index(condition=models.Q(('date_completed__isnull', False), ('employee__isnull', False)), fields=['id'], name='ticket_done_assigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceticket',
+            index=models.Index(condition=models.Q(('date_completed__isnull', False), ('employee__isnull', True)), fields=['id'], name='ticket_done_unassigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceticket',
+            index=models.Index(condition=models.Q(('date_completed__isnull', True), ('employee__isnull', True)), fields=['id'], name='ticket_open_unassigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceticket',
+            index=models.Index(fields=['customer', 'id'], name='ticket_customer_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:22
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+def count_existing_tickets(apps, schema_editor):
+    """Start the counters from the tickets already in the database"""
+    ServiceTicket = apps.get_model('repairsapi', 'ServiceTicket')
+    TicketStatistic = apps.get_model('repairsapi', 'TicketStatistic')
+    db_alias = schema_editor.connection.alias
+
+    aggregates = {
+        'total': models.Count('id'),
+        'done': models.Count('id', filter=models.Q(date_completed__isnull=False)),
+        'unclaimed': models.Count('id', filter=models.Q(date_completed__isnull=False, employee__isnull=False)),
+        'inprogress': models.Count('id', filter=models.Q(date_completed__isnull=False, employee__isnull=True)),
+        'emergency': models.Count('id', filter=models.Q(emergency=True)),
+    }
+
+    tickets = ServiceTicket.objects.using(db_alias)
+    TicketStatistic.objects.using(db_alias).create(employee=None, **tickets.aggregate(**aggregates))
+    for row in tickets.filter(employee__isnull=False).values('employee').annotate(**aggregates):
+        TicketStatistic.objects.using(db_alias).create(employee_id=row.pop('employee'), **row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repairsapi', '0002_serviceticket_status_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0)),
+                ('done', models.IntegerField(default=0)),
+                ('unclaimed', models.IntegerField(default=0)),
+                ('inprogress', models.IntegerField(default=0)),
+                ('emergency', models.IntegerField(default=0)),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ticket_statistics', to='repairsapi.employee')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('employee', models.Value(0)), name='ticket_statistic_scope_unique')],
+            },
+        ),
+        migrations.RunPython(count_existing_tickets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repairsapi', '0003_ticketstatistic'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('table', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
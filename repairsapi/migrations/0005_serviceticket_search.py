@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:43
+
+import django.db.models.deletion
+import repairsapi.models.ticket_search
+from django.db import migrations, models
+
+
+# An external content FTS5 table: it stores only the index and reads
+# descriptions from repairsapi_serviceticket, and the triggers keep the
+# index in step with every insert, update and delete, including raw SQL
+# and bulk writes that skip Django's signals. Anything that rebuilds the
+# serviceticket table (an ALTER that SQLite can't do in place) drops the
+# triggers along with it, so such a migration must create them again.
+FTS_SQL = (
+    """
+    CREATE VIRTUAL TABLE repairsapi_serviceticket_fts USING fts5(
+        description,
+        content='repairsapi_serviceticket',
+        content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER repairsapi_serviceticket_fts_insert AFTER INSERT ON repairsapi_serviceticket BEGIN
+        INSERT INTO repairsapi_serviceticket_fts (rowid, description) VALUES (new.id, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER repairsapi_serviceticket_fts_delete AFTER DELETE ON repairsapi_serviceticket BEGIN
+        INSERT INTO repairsapi_serviceticket_fts (repairsapi_serviceticket_fts, rowid, description)
+        VALUES ('delete', old.id, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER repairsapi_serviceticket_fts_update AFTER UPDATE OF description ON repairsapi_serviceticket BEGIN
+        INSERT INTO repairsapi_serviceticket_fts (repairsapi_serviceticket_fts, rowid, description)
+        VALUES ('delete', old.id, old.description);
+        INSERT INTO repairsapi_serviceticket_fts (rowid, description) VALUES (new.id, new.description);
+    END
+    """,
+    # Index the tickets that already exist
+    "INSERT INTO repairsapi_serviceticket_fts (repairsapi_serviceticket_fts) VALUES ('rebuild')",
+)
+
+DROP_FTS_SQL = (
+    "DROP TRIGGER IF EXISTS repairsapi_serviceticket_fts_insert",
+    "DROP TRIGGER IF EXISTS repairsapi_serviceticket_fts_delete",
+    "DROP TRIGGER IF EXISTS repairsapi_serviceticket_fts_update",
+    "DROP TABLE IF EXISTS repairsapi_serviceticket_fts",
+)
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):  # pylint: disable=unused-argument
+        # Other backends fall back to a LIKE search, see repairsapi/search.py
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repairsapi', '0004_tableversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketSearch',
+            fields=[
+                ('ticket', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='repairsapi.serviceticket')),
+                ('description', repairsapi.models.ticket_search.FullTextField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'repairsapi_serviceticket_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(run_on_sqlite(FTS_SQL), run_on_sqlite(DROP_FTS_SQL)),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:42
+
+from django.db import migrations, models
+
+
+def recount_status_buckets(apps, schema_editor):
+    """Recount `unclaimed` and `inprogress`, which used to count completed tickets"""
+    ServiceTicket = apps.get_model('repairsapi', 'ServiceTicket')
+    TicketStatistic = apps.get_model('repairsapi', 'TicketStatistic')
+    db_alias = schema_editor.connection.alias
+
+    tickets = ServiceTicket.objects.using(db_alias)
+    statistics = TicketStatistic.objects.using(db_alias)
+    statistics.filter(employee__isnull=True).update(
+        unclaimed=tickets.filter(employee__isnull=True).count(),
+        inprogress=tickets.filter(employee__isnull=False, date_completed__isnull=True).count(),
+    )
+
+    inprogress = dict(
+        tickets.filter(employee__isnull=False, date_completed__isnull=True)
+            .values('employee').annotate(count=models.Count('id')).values_list('employee', 'count')
+    )
+    statistics.filter(employee__isnull=False).update(unclaimed=0, inprogress=0)
+    for employee_id, count in inprogress.items():
+        statistics.filter(employee_id=employee_id).update(inprogress=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repairsapi', '0005_serviceticket_search'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='serviceticket',
+            name='ticket_done_assigned_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='serviceticket',
+            name='ticket_done_unassigned_idx',
+        ),
+        migrations.AddIndex(
+            model_name='serviceticket',
+            index=models.Index(condition=models.Q(('employee__isnull', True)), fields=['id'], name='ticket_unclaimed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceticket',
+            index=models.Index(condition=models.Q(('date_completed__isnull', True), ('employee__isnull', False)), fields=['id'], name='ticket_inprogress_idx'),
+        ),
+        migrations.RunPython(recount_status_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repairsapi', '0006_ticket_status_buckets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('data', models.JSONField()),
+            ],
+        ),
+    ]
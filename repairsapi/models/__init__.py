@@ -1,3 +1,7 @@
 from .customer import Customer
 from .employee import Employee
-from .service_ticket import ServiceTicket
\ No newline at end of file
+from .service_ticket import ServiceTicket
+from .ticket_statistic import TicketStatistic
+from .table_version import TableVersion
+from .ticket_search import TicketSearch
+from .ticket_event import TicketEvent
@@ -7,3 +7,28 @@ class ServiceTicket(models.Model):
     description = models.CharField(max_length=155)
     emergency = models.BooleanField(default=False)
     date_completed = models.DateField(null=True, blank=True, auto_now=False, auto_now_add=False)
+
+    class Meta:
+        # The list endpoint pages through tickets in id order, so each index
+        # ends in `id` to serve both the filter and the ORDER BY/keyset seek.
+        # Partial indexes cover only the rows a status filter can return
+        # (backends without partial index support skip them).
+        indexes = [
+            models.Index(
+                fields=['id'], name='ticket_done_idx',
+                condition=models.Q(date_completed__isnull=False)
+            ),
+            models.Index(
+                fields=['id'], name='ticket_unclaimed_idx',
+                condition=models.Q(employee__isnull=True)
+            ),
+            models.Index(
+                fields=['id'], name='ticket_inprogress_idx',
+                condition=models.Q(employee__isnull=False, date_completed__isnull=True)
+            ),
+            models.Index(
+                fields=['id'], name='ticket_open_unassigned_idx',
+                condition=models.Q(date_completed__isnull=True, employee__isnull=True)
+            ),
+            models.Index(fields=['customer', 'id'], name='ticket_customer_idx'),
+        ]
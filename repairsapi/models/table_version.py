@@ -0,0 +1,11 @@
+from django.db import models
+
+
+class TableVersion(models.Model):
+    """Counter bumped whenever rows of a table are written
+
+    Comparing versions is a cheap way to tell whether anything read from
+    that table could have changed (see repairsapi.versions).
+    """
+    table = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
@@ -0,0 +1,13 @@
+from django.db import models
+
+
+class TicketEvent(models.Model):
+    """A ticket change sent on the /tickets/events feed
+
+    Rows are written in the same transaction as the change they describe,
+    and every process serving the feed reads them back in id order, so each
+    client sees the committed writes of every server process. See
+    repairsapi.events.
+    """
+    kind = models.CharField(max_length=20)
+    data = models.JSONField()
@@ -0,0 +1,34 @@
+from django.db import models
+
+
+class FullTextField(models.TextField):
+    """Column of a full text index, queried with the `match` lookup"""
+
+
+@FullTextField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class TicketSearch(models.Model):
+    """SQLite FTS5 index of ticket descriptions
+
+    The virtual table and the triggers that keep it in step with
+    ServiceTicket are created by migration 0005, so Django doesn't manage
+    the table. `rank` is FTS5's hidden bm25 column: lower is more relevant.
+    """
+    ticket = models.OneToOneField(
+        "ServiceTicket", primary_key=True, db_column='rowid',
+        on_delete=models.DO_NOTHING, related_name='search'
+    )
+    description = FullTextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'repairsapi_serviceticket_fts'
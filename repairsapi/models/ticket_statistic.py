@@ -0,0 +1,23 @@
+from django.db import models
+from django.db.models.functions import Coalesce
+
+
+class TicketStatistic(models.Model):
+    """Running ticket counts by status
+
+    The row without an employee holds the counts for every ticket, and each
+    other row holds the counts for the tickets assigned to one employee.
+    The counts are kept current by repairsapi.stats as tickets change.
+    """
+    employee = models.ForeignKey("Employee", null=True, blank=True, on_delete=models.CASCADE, related_name='ticket_statistics')
+    total = models.IntegerField(default=0)
+    done = models.IntegerField(default=0)
+    unclaimed = models.IntegerField(default=0)
+    inprogress = models.IntegerField(default=0)
+    emergency = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # One row per employee, and only one overall row
+            models.UniqueConstraint(Coalesce('employee', models.Value(0)), name='ticket_statistic_scope_unique'),
+        ]
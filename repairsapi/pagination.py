@@ -0,0 +1,60 @@
+"""Pagination classes for the repairsapi viewsets"""
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination over the primary key
+
+    Each page is fetched with `WHERE id > <cursor> ORDER BY id LIMIT n`, so
+    the database seeks straight to the page instead of scanning past skipped
+    rows, and rows inserted mid-traversal never shift earlier pages. The
+    cursor itself is opaque to clients, who follow the `next`/`previous` links.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async counterpart of `paginate_queryset()`
+
+        CursorPagination reads the database in one place, in the middle of
+        `paginate_queryset()`. That runs twice here over a PageQuery: once
+        to build the page's query, which is then fetched with the async
+        ORM, and again to work out the page and its cursors from the rows.
+        """
+        page_query = PageQuery(queryset)
+        super().paginate_queryset(page_query, request, view)
+        if not self.page_size:
+            return None
+
+        rows = [row async for row in page_query.queryset]
+        return super().paginate_queryset(PageQuery(queryset, rows), request, view)
+
+
+class PageQuery:
+    """Stand-in for a queryset passed to CursorPagination.paginate_queryset()
+
+    Applies the ordering and cursor filter to the real queryset, and keeps
+    the page slice taken from it in `queryset` rather than evaluating it.
+    The slice evaluates to `rows` instead.
+
+    Args:
+        queryset -- The queryset to paginate
+        rows -- Rows already fetched for the page
+    """
+
+    def __init__(self, queryset, rows=()):
+        self.queryset = queryset
+        self.rows = list(rows)
+
+    def order_by(self, *fields):
+        self.queryset = self.queryset.order_by(*fields)
+        return self
+
+    def filter(self, *args, **kwargs):
+        self.queryset = self.queryset.filter(*args, **kwargs)
+        return self
+
+    def __getitem__(self, page):
+        self.queryset = self.queryset[page]
+        return self.rows
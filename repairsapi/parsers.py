@@ -0,0 +1,31 @@
+"""JSON parser for the repairsapi views"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.settings import api_settings
+from repairsapi.renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser that decodes with orjson when it is installed
+
+    orjson rejects NaN and Infinity just as JSONParser does with the
+    default STRICT_JSON setting. Bodies in other encodings than UTF-8 are
+    decoded to text first.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or not api_settings.STRICT_JSON:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            body = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                body = body.decode(encoding)
+            return orjson.loads(body)
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}') from exc
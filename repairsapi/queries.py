@@ -0,0 +1,141 @@
+"""Query budgets for views, and detection of repeated queries in a request
+
+A view action declares the most queries a request to it may run with
+`@query_budget(n)`. The budgets are enforced by the tests (see
+repairsapi.testing) and, in development, reported by
+QueryInspectionMiddleware along with any N+1 patterns: the same query
+shape run over and over within one request, typically a related object
+fetched once per row, like `Customer.full_name` reading `customer.user`
+on a queryset without `select_related('user')`.
+"""
+import re
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+
+
+current_inspection = ContextVar('current_inspection', default=None)
+
+# Literal values vary from one query of a shape to the next
+IN_LIST = re.compile(r'\bIN \((?:%s, )*%s\)')
+NUMBER = re.compile(r'\b\d+\b')
+STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def query_budget(num):
+    '''Declare the most queries one request to a view action may run
+
+    Put it above the action's other decorators. For function views, put
+    it above `@api_view`.
+
+    Method arguments:
+      num -- The budget, counting the token lookup of a cold token cache
+    '''
+    def decorator(action):
+        action.query_budget = num
+        return action
+    return decorator
+
+
+def budget_for(view, method):
+    '''The budget of the action that `view` dispatches `method` to
+
+    Method arguments:
+      view -- A resolved URL's view function, i.e. `resolve(path).func`
+      method -- The HTTP method, e.g. "GET"
+
+    Returns:
+      int -- The action's budget, or None if it has none
+    '''
+    if hasattr(view, 'query_budget'):
+        return view.query_budget
+
+    view_class = getattr(view, 'cls', None) or getattr(view, 'view_class', None)
+    action = getattr(view, 'actions', None) or {}
+    handler = getattr(view_class, action.get(method.lower(), method.lower()), None)
+    return getattr(handler, 'query_budget', None)
+
+
+def query_shape(sql):
+    '''The query with literals and IN list lengths taken out, so the same
+    query for different rows has the same shape'''
+    sql = IN_LIST.sub('IN (...)', sql)
+    sql = STRING.sub('?', sql)
+    return NUMBER.sub('?', sql)
+
+
+class QueryInspector:
+    """Counts the queries of each shape run while it is current, and keeps
+    where in the code a shape was run once it starts repeating"""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.total = 0
+        self.counts = {}
+        self.stacks = {}
+
+    def record(self, sql):
+        shape = query_shape(sql)
+        self.total += 1
+        self.counts[shape] = self.counts.get(shape, 0) + 1
+        if self.counts[shape] == self.threshold:
+            self.stacks[shape] = project_stack()
+
+    def repeated(self):
+        '''Each shape run at least `threshold` times
+
+        Returns:
+          list -- (shape, count, stack) tuples, most repeated first
+        '''
+        return sorted(
+            ((shape, self.counts[shape], stack) for shape, stack in self.stacks.items()),
+            key=lambda repeat: -repeat[1]
+        )
+
+
+def inspect_query(execute, sql, params, many, context):
+    '''Database execute wrapper counting each query for the current QueryInspector'''
+    inspector = current_inspection.get()
+    if inspector is not None:
+        inspector.record(sql)
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def inspect_queries(threshold=None):
+    '''Inspect the queries run in the block
+
+    Method arguments:
+      threshold -- Runs of one shape that count as repeated, by default
+                   the N_PLUS_ONE_THRESHOLD setting
+
+    Returns:
+      QueryInspector -- Holds the counts once the block ends
+    '''
+    if threshold is None:
+        threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', 3)
+
+    inspector = QueryInspector(threshold)
+    reset = current_inspection.set(inspector)
+    try:
+        yield inspector
+    finally:
+        current_inspection.reset(reset)
+
+
+def project_stack():
+    '''The calling frames from this project's own code, skipping Django,
+    DRF and this module
+
+    Returns:
+      str -- Formatted frames, innermost last
+    '''
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()[:-1]
+        if frame.filename.startswith(base_dir)
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+    return ''.join(traceback.format_list(frames))
@@ -0,0 +1,66 @@
+"""JSON renderer for the repairsapi views
+
+Uses orjson, when it is installed, to encode responses several times
+faster than the stdlib `json` module that DRF's JSONRenderer uses. For
+the types the serializers send (strings, integers, booleans, None, dates
+and times, and Decimals) the output is byte for byte what JSONRenderer
+would produce, and anything orjson can't encode falls back to
+JSONRenderer itself. Floats differ:
+
+- Exponents can be written differently, e.g. `1.5e-7` rather than
+  `1.5e-07`, depending on the orjson version. They parse to the same values.
+- NaN and Infinity are written as `null`, where JSONRenderer refuses to
+  encode them under the default STRICT_JSON setting.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# DRF's own encoder, for the types orjson is told to hand back (dates and
+# times, so their formatting matches) or doesn't know (Decimal, lazy strings)
+_encoder = encoders.JSONEncoder()
+
+
+def encode_json(data):
+    """Compact UTF-8 JSON, formatted the way JSONRenderer formats it by
+    default, floats aside (see above)
+
+    Returns:
+        bytes -- The encoded data
+    """
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(
+                data, default=_encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits
+            pass
+        else:
+            # JSONRenderer escapes these so the output is also valid JavaScript
+            return encoded.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+    return JSONRenderer().render(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with `encode_json()`
+
+    Indented output (the browsable API, or `Accept: application/json;
+    indent=4`) and non-default UNICODE_JSON/COMPACT_JSON settings are left
+    to JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if self.ensure_ascii or not self.compact or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return encode_json(data)
@@ -0,0 +1,70 @@
+"""Cache of rendered API responses keyed on table versions
+
+Responses are stored under `repairsapi.versions.versioned_key()`, which
+covers the URL, negotiated format, user scope and the versions of every
+table the response was built from. Any write that bumps one of those
+versions therefore moves readers on to a new key, and the stale entry is
+never read again; the cache backend's own eviction reclaims it.
+
+The backend is the Django cache named by the RESPONSE_CACHE_ALIAS setting
+(None disables caching). With LocMemCache, MAX_ENTRIES bounds the number
+of entries and least recently used ones are culled first, while
+RESPONSE_CACHE_MAX_ENTRY_BYTES keeps oversized responses out entirely.
+
+LocMemCache lives in one process. Under gunicorn each worker fills and
+holds its own copy, so memory use grows with the worker count and a
+response is rendered once per worker. Nothing has to tell the other
+workers about a write: every request reads the table versions from the
+shared database, so all of them move on to the new key together. Swap in
+Redis or Memcached to share entries between workers.
+
+That only holds while versions never go back. Rolling back a transaction
+that bumped them (as every TestCase does) or restoring a backup reuses old
+version numbers for different rows, so clear the cache afterwards.
+"""
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+from repairsapi.versions import versioned_key
+
+
+def cache_response(*models):
+    """Decorate a ViewSet action to serve repeat requests from the cache
+
+    Args:
+        models -- Every model whose table the response is built from
+    """
+    def decorator(action):
+        @wraps(action)
+        def wrapper(view, request, *args, **kwargs):
+            alias = getattr(settings, 'RESPONSE_CACHE_ALIAS', None)
+            if alias is None:
+                return action(view, request, *args, **kwargs)
+
+            cache = caches[alias]
+            key = f'response:{versioned_key(request, models)}'
+
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = action(view, request, *args, **kwargs)
+
+            if isinstance(response, Response) and response.status_code == status.HTTP_200_OK:
+                max_bytes = getattr(settings, 'RESPONSE_CACHE_MAX_ENTRY_BYTES', 1024 * 1024)
+
+                def store(rendered):
+                    if len(rendered.content) <= max_bytes:
+                        cache.set(key, (rendered.content, rendered['Content-Type']))
+
+                response.add_post_render_callback(store)
+
+            return response
+
+        return wrapper
+
+    return decorator
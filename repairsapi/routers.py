@@ -0,0 +1,84 @@
+"""Database router sending the read-only ViewSet actions to read replicas
+
+Only actions decorated with `@reads_from_replica` read from a replica; all
+other queries, including token authentication and every write, use the
+primary ("default"). Replicas are the aliases in the REPLICA_DATABASES
+setting, and with none configured everything stays on the primary.
+
+Replicas lag the primary, so a client that has just written would read
+its old data back. After a successful write ReplicaPinningMiddleware pins
+the user to the primary for REPLICA_PIN_SECONDS, a window that should
+cover the replication lag. The pins are kept in the REPLICA_PIN_CACHE
+cache, which repairsapi.checks requires to be shared between processes.
+"""
+import random
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+
+# The replica the current read-only action reads from, if any
+current_replica = ContextVar('current_replica', default=None)
+
+
+class ReplicaRouter:
+    """Reads inside `@reads_from_replica` actions go to that action's
+    replica, and everything else to the primary"""
+
+    def db_for_read(self, model, **hints):  # pylint: disable=unused-argument
+        # None leaves it to Django: the database of a related instance, if
+        # given, else the primary
+        return current_replica.get()
+
+    def db_for_write(self, model, **hints):  # pylint: disable=unused-argument
+        # Explicit, or Django would write a row back to the replica it was read from
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):  # pylint: disable=unused-argument
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:  # pylint: disable=protected-access
+            return True
+        return None
+
+
+def reads_from_replica(action):
+    '''Decorate a read-only ViewSet action to run its queries on a replica
+
+    Put it above `@conditional_on` and `@cache_response`, so the table
+    versions behind the ETag and cache key come from the same database as
+    the data. One replica is picked per request for the same reason.
+    '''
+    @wraps(action)
+    def wrapper(view, request, *args, **kwargs):
+        if not settings.REPLICA_DATABASES or is_pinned(request.user):
+            return action(view, request, *args, **kwargs)
+
+        reset = current_replica.set(random.choice(settings.REPLICA_DATABASES))
+        try:
+            return action(view, request, *args, **kwargs)
+        finally:
+            current_replica.reset(reset)
+
+    return wrapper
+
+
+def pin_key(user):
+    return f'replica-pin:{user.pk}'
+
+
+def pin_to_primary(user):
+    '''Send `user`'s reads to the primary for the next REPLICA_PIN_SECONDS'''
+    caches[settings.REPLICA_PIN_CACHE].set(pin_key(user), True, settings.REPLICA_PIN_SECONDS)
+
+
+async def apin_to_primary(user):
+    '''Async counterpart of `pin_to_primary()`'''
+    await caches[settings.REPLICA_PIN_CACHE].aset(pin_key(user), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    '''Whether `user` wrote recently enough to still read from the primary'''
+    return user.is_authenticated and caches[settings.REPLICA_PIN_CACHE].get(pin_key(user), False)
@@ -0,0 +1,47 @@
+"""Full-text search over ticket descriptions
+
+On SQLite the search runs against the FTS5 index created by migration
+0005 (see repairsapi.models.TicketSearch) and matches are ranked by bm25.
+Other backends match every word with a case-insensitive LIKE, unranked.
+"""
+import re
+from django.db import connection
+from django.db.models import F
+
+
+def search_tickets(service_tickets, query):
+    '''Narrow `service_tickets` to those whose description has every word in `query`
+
+    Each word also matches as a prefix, so "batt" finds "battery", and
+    FTS5's porter stemmer makes "crack" find "cracked". Query syntax is not
+    passed through: punctuation is dropped and each word is quoted.
+
+    Method arguments:
+      service_tickets -- ServiceTicket queryset to search within
+      query -- The words to look for
+
+    Returns:
+      QuerySet -- Matching tickets, annotated with `rank` when it is ranked
+    '''
+    words = re.findall(r'\w+', query)
+
+    if not is_ranked():
+        for word in words:
+            service_tickets = service_tickets.filter(description__icontains=word)
+        return service_tickets if words else service_tickets.none()
+
+    service_tickets = service_tickets.annotate(rank=F('search__rank'))
+    if not words:
+        return service_tickets.none()
+
+    match = ' '.join(f'"{word}"*' for word in words)
+    return service_tickets.filter(search__description__match=match)
+
+
+def is_ranked():
+    '''Whether `search_tickets()` results have a `rank` to order by
+
+    Returns:
+      bool -- True where the FTS5 index exists
+    '''
+    return connection.vendor == 'sqlite'
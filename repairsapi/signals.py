@@ -0,0 +1,40 @@
+"""Signal receivers for the repairsapi app"""
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from repairsapi.authentication import token_cache
+from repairsapi.metrics import time_query
+from repairsapi.queries import inspect_query
+from repairsapi.models import Customer, Employee, ServiceTicket
+from repairsapi.versions import bump_versions
+
+
+@receiver([post_save, post_delete], sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Forget a token that was changed or revoked"""
+    token_cache.invalidate(instance.key)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user_tokens(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Forget the tokens of a user who was changed (e.g. deactivated) or deleted"""
+    token_cache.invalidate_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=Customer)
+@receiver([post_save, post_delete], sender=Employee)
+@receiver([post_save, post_delete], sender=ServiceTicket)
+def bump_table_version(sender, **kwargs):
+    """Invalidate ETags of responses built from the changed table"""
+    bump_versions(sender)
+
+
+@receiver(connection_created)
+def install_query_wrappers(sender, connection, **kwargs):  # pylint: disable=unused-argument
+    """Time and inspect this connection's queries for the middleware"""
+    for wrapper in (time_query, inspect_query):
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
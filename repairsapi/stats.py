@@ -0,0 +1,197 @@
+"""Incrementally maintained ticket status counts
+
+Every code path that creates, changes or deletes tickets reports the change
+with `record_ticket_changes()`, which adjusts the TicketStatistic rows in
+place. `reconcile_ticket_stats()` recomputes them from the ticket table to
+correct any drift, and is run by the `reconcile_ticket_stats` command.
+
+The statuses mirror the `status=` filters of ServiceTicketView.list.
+"""
+from collections import defaultdict
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from repairsapi.models import ServiceTicket, TicketStatistic
+
+
+COUNTERS = ('total', 'done', 'unclaimed', 'inprogress', 'emergency')
+
+# Conditions matching the tickets each counter counts
+COUNTER_FILTERS = {
+    'total': Q(),
+    'done': Q(date_completed__isnull=False),
+    'unclaimed': Q(employee__isnull=True),
+    'inprogress': Q(employee__isnull=False, date_completed__isnull=True),
+    'emergency': Q(emergency=True),
+}
+
+
+def snapshot(ticket):
+    """Capture the fields of a ticket that the counters depend on
+
+    Accepts a ServiceTicket or a dict with the same field names, so
+    set-based writes can snapshot rows fetched with `values()`.
+    """
+    if isinstance(ticket, dict):
+        return (ticket['employee_id'], ticket['date_completed'] is not None, ticket['emergency'])
+    return (ticket.employee_id, ticket.date_completed is not None, ticket.emergency)
+
+
+def _counts(state):
+    employee_id, completed, emergency = state
+    return {
+        'total': 1,
+        'done': int(completed),
+        'unclaimed': int(employee_id is None),
+        'inprogress': int(employee_id is not None and not completed),
+        'emergency': int(emergency),
+    }
+
+
+def record_ticket_changes(changes):
+    """Apply ticket changes to the counters
+
+    Args:
+        changes -- Iterable of (before, after) snapshots, using None for
+                   the before of a created ticket or after of a deleted one
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+    for before, after in changes:
+        for state, sign in ((before, -1), (after, 1)):
+            if state is None:
+                continue
+            for counter, value in _counts(state).items():
+                deltas[None][counter] += sign * value
+                if state[0] is not None:
+                    deltas[state[0]][counter] += sign * value
+
+    _apply_all({
+        employee_id: {counter: value for counter, value in delta.items() if value}
+        for employee_id, delta in deltas.items()
+    })
+
+
+def record_ticket_change(before, after):
+    """Apply a single ticket change to the counters"""
+    record_ticket_changes([(before, after)])
+
+
+def record_ticket_deletions(tickets):
+    """Take every ticket in a queryset off the counters
+
+    For set-based deletes, which have no per-ticket snapshots. Counts the
+    tickets with two aggregate queries rather than loading them, so call it
+    in the same transaction, just before the delete.
+
+    Args:
+        tickets -- ServiceTicket queryset about to be deleted
+    """
+    aggregates = {counter: Count('id', filter=condition) for counter, condition in COUNTER_FILTERS.items()}
+
+    counts = {None: tickets.aggregate(**aggregates)}
+    for row in tickets.filter(employee__isnull=False).values('employee').annotate(**aggregates):
+        counts[row.pop('employee')] = row
+
+    _apply_all({
+        employee_id: {counter: -value for counter, value in employee_counts.items() if value}
+        for employee_id, employee_counts in counts.items()
+    })
+
+
+def _apply_all(deltas):
+    '''Add each employee's delta to their counters with one UPDATE, however
+    many employees there are, creating the rows of any who have none yet
+
+    Method arguments:
+      deltas -- Mapping of employee id, or None for the overall row, to a
+                dict of the nonzero changes to its counters
+    '''
+    deltas = {employee_id: delta for employee_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    changes = {}
+    for counter in COUNTERS:
+        whens = [
+            When(employee_id=employee_id, then=Value(delta[counter]))
+            for employee_id, delta in deltas.items() if counter in delta
+        ]
+        if whens:
+            changes[counter] = F(counter) + Case(*whens, default=Value(0))
+
+    rows = TicketStatistic.objects.filter(_employees(deltas))
+    with transaction.atomic(savepoint=False):
+        updated = rows.update(**changes)
+        if updated == len(deltas):
+            return
+
+        # First tickets for some of the employees
+        existing = set(rows.values_list('employee_id', flat=True)) if updated else set()
+        missing = [employee_id for employee_id in deltas if employee_id not in existing]
+        try:
+            with transaction.atomic():
+                TicketStatistic.objects.bulk_create([
+                    TicketStatistic(employee_id=employee_id, **deltas[employee_id]) for employee_id in missing
+                ])
+        except IntegrityError:
+            # A concurrent request created some of them in the meantime
+            for employee_id in missing:
+                _apply(employee_id, deltas[employee_id])
+
+
+def _employees(employee_ids):
+    # `__in` skips None, which is the overall row
+    condition = Q(employee_id__in=[employee_id for employee_id in employee_ids if employee_id is not None])
+    if None in employee_ids:
+        condition |= Q(employee__isnull=True)
+    return condition
+
+
+def _apply(employee_id, delta):
+    rows = TicketStatistic.objects.filter(employee_id=employee_id)
+    if rows.update(**{counter: F(counter) + value for counter, value in delta.items()}):
+        return
+
+    # First ticket for this employee. A concurrent request may have created
+    # the row in the meantime, in which case add to theirs instead.
+    try:
+        with transaction.atomic():
+            TicketStatistic.objects.create(employee_id=employee_id, **delta)
+    except IntegrityError:
+        rows.update(**{counter: F(counter) + value for counter, value in delta.items()})
+
+
+def reconcile_ticket_stats():
+    """Recompute every counter from the ticket table
+
+    Returns:
+        int -- Number of TicketStatistic rows that had drifted
+    """
+    aggregates = {counter: Count('id', filter=condition) for counter, condition in COUNTER_FILTERS.items()}
+    drifted = 0
+
+    with transaction.atomic():
+        # Lock the counters before counting, so increments from tickets
+        # written while we count wait and then apply on top of our totals
+        current = {
+            row.employee_id: row for row in TicketStatistic.objects.select_for_update()
+        }
+
+        expected = {None: ServiceTicket.objects.aggregate(**aggregates)}
+        for row in ServiceTicket.objects.filter(employee__isnull=False).values('employee').annotate(**aggregates):
+            expected[row.pop('employee')] = row
+
+        # Employees whose tickets have all been reassigned or deleted
+        for employee_id in current.keys() - expected.keys():
+            expected[employee_id] = dict.fromkeys(COUNTERS, 0)
+
+        for employee_id, counts in expected.items():
+            row = current.get(employee_id)
+            if row is None:
+                TicketStatistic.objects.create(employee_id=employee_id, **counts)
+                drifted += 1
+            elif any(getattr(row, counter) != value for counter, value in counts.items()):
+                TicketStatistic.objects.filter(pk=row.pk).update(**counts)
+                drifted += 1
+
+    return drifted
@@ -0,0 +1,56 @@
+"""Test helpers for the repairsapi app"""
+from urllib.parse import urlsplit
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve
+from repairsapi.queries import budget_for
+
+
+class QueryBudgetMixin:
+    """Test case mixin that checks requests against their view's `@query_budget`"""
+
+    def request_within_budget(self, method, url, data=None):
+        '''Send a request with `self.client` and fail if it runs more
+        queries than the budget of the view action that handles it
+
+        Returns:
+          Response -- The response, for further checks
+        '''
+        view = resolve(urlsplit(url).path).func
+        budget = budget_for(view, method)
+        if budget is None:
+            self.fail(f'{method} {url} is handled by an action with no @query_budget')
+
+        send = getattr(self.client, method.lower())
+        with CaptureQueriesContext(connection) as queries:
+            response = send(url, data, format='json') if data is not None else send(url)
+
+        if len(queries) > budget:
+            self.fail(
+                f'{method} {url} ran {len(queries)} queries, over its budget of {budget}:\n' +
+                '\n'.join(f'{i}. {query["sql"]}' for i, query in enumerate(queries.captured_queries, start=1))
+            )
+        return response
+
+
+class TestRunner(DiscoverRunner):
+    """Test runner that turns the response cache off
+
+    Cached responses are keyed on table versions, which each TestCase rolls
+    back at its end. The next test then writes the same version numbers
+    over different rows and would be served responses cached by the last.
+    Tests of the cache turn it back on with
+    `@override_settings(RESPONSE_CACHE_ALIAS='responses')` and clear it in
+    setUp.
+    """
+
+    no_response_cache = override_settings(RESPONSE_CACHE_ALIAS=None)
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.no_response_cache.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.no_response_cache.disable()
+        super().teardown_test_environment(**kwargs)
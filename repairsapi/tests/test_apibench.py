@@ -0,0 +1,22 @@
+"""Tests for the apibench management command"""
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+from repairsapi.management.commands.apibench import percentile
+
+
+class ApibenchTests(SimpleTestCase):
+
+    def test_percentile(self):
+        latencies = list(range(1, 101))
+        self.assertEqual(percentile(latencies, 50), 50)
+        self.assertEqual(percentile(latencies, 95), 95)
+        self.assertEqual(percentile(latencies, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+
+    def test_unknown_scenario(self):
+        with self.assertRaisesRegex(CommandError, 'Unknown scenarios: bogus'):
+            call_command('apibench', scenarios='staff-tickets,bogus')
+
+    def test_url_needs_credentials(self):
+        with self.assertRaisesRegex(CommandError, '--customer-token, --email, --password'):
+            call_command('apibench', url='http://localhost:8000', staff_token='abc')
@@ -0,0 +1,77 @@
+"""Tests for the async login and registration views"""
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from repairsapi.hashing import hashing_pool
+from repairsapi.models import Customer, Employee
+
+
+class AsyncAuthTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        hashing_pool.shutdown()
+        super().tearDownClass()
+
+    async def register(self, **fields):
+        data = {
+            'account_type': 'customer',
+            'email': 'pat@example.com',
+            'password': 'hunter22',
+            'first_name': 'Pat',
+            'last_name': 'Doe',
+            'address': '1 Main St.',
+        }
+        data.update(fields)
+        return await self.async_client.post('/async/register', data, content_type='application/json')
+
+    async def test_register_and_login(self):
+        response = await self.register()
+        self.assertEqual(response.status_code, 200)
+        registered = response.json()
+        self.assertFalse(registered['staff'])
+
+        user = await User.objects.aget(username='pat@example.com')
+        self.assertTrue(user.check_password('hunter22'))
+        self.assertTrue(await Customer.objects.filter(user=user, address='1 Main St.').aexists())
+
+        response = await self.async_client.post(
+            '/async/login', {'email': 'pat@example.com', 'password': 'hunter22'}, content_type='application/json'
+        )
+        self.assertEqual(response.json(), {'valid': True, 'token': registered['token'], 'staff': False})
+
+    async def test_register_employee(self):
+        response = await self.register(account_type='employee', specialty='Routers', address=None)
+        self.assertTrue(response.json()['staff'])
+        self.assertTrue(await Employee.objects.filter(user__username='pat@example.com').aexists())
+
+    async def test_wrong_password_and_unknown_email(self):
+        await self.register()
+        for email, password in (('pat@example.com', 'wrong'), ('nobody@example.com', 'hunter22')):
+            response = await self.async_client.post(
+                '/async/login', {'email': email, 'password': password}, content_type='application/json'
+            )
+            self.assertEqual(response.json(), {'valid': False})
+
+    async def test_duplicate_email(self):
+        await self.register()
+        response = await self.register()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(await Token.objects.acount(), 1)
+
+    async def test_validation_matches_register_user(self):
+        response = await self.register(address=None)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message': 'You must provide an address for a customer'})
+
+    async def test_full_queue_is_rejected(self):
+        with mock.patch.object(hashing_pool, 'max_pending', 0):
+            response = await self.register()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(hashing_pool.pending, 0)
+
+    async def test_only_post(self):
+        response = await self.async_client.get('/async/login')
+        self.assertEqual(response.status_code, 405)
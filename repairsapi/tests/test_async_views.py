@@ -0,0 +1,136 @@
+"""Tests for the async ticket, customer and employee views"""
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from repairsapi.authentication import token_cache
+from repairsapi.models import Customer, ServiceTicket, TicketStatistic
+from repairsapi.stats import reconcile_ticket_stats
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+CUSTOMER_TOKEN = '0be249c88238743e5b4a7ac370b5145730c28e20'
+OTHER_CUSTOMER = 'ec7ddcc665035a3adeaa80ed8f812bfe3ef5b5f4'
+
+
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class AsyncViewTests(TestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        token_cache.clear()
+        reconcile_ticket_stats()
+
+    def headers(self, token):
+        return {'Authorization': f'Token {token}'}
+
+    async def assertSameAsSync(self, url, token):
+        """The async view at `async/<url>` returns what the ViewSet does"""
+        response = await self.async_client.get(f'/async{url}', headers=self.headers(token))
+        self.assertEqual(response.status_code, 200)
+
+        # Identical apart from the cursor links pointing back at the async view
+        expected = await self.async_client.get(url, headers=self.headers(token))
+        self.assertEqual(response.content.replace(b'/async/', b'/'), expected.content)
+        return response.json()
+
+    async def test_reads_match_viewsets(self):
+        for url in ('/tickets', '/tickets?status=done', '/tickets/9', '/customers', '/customers/1', '/employees', '/employees/2'):
+            with self.subTest(url=url):
+                await self.assertSameAsSync(url, STAFF_TOKEN)
+
+        tickets = await self.assertSameAsSync('/tickets', CUSTOMER_TOKEN)
+        self.assertEqual([ticket['id'] for ticket in tickets['results']], [2, 5, 8])
+
+    async def test_search_and_fieldsets_match_viewsets(self):
+        once = await ServiceTicket.objects.acreate(customer_id=1, description='qwerty keys stick')
+        twice = await ServiceTicket.objects.acreate(customer_id=1, description='qwerty qwerty qwerty')
+
+        tickets = await self.assertSameAsSync('/tickets?q=qwerty', STAFF_TOKEN)
+        self.assertEqual([ticket['id'] for ticket in tickets['results']], [twice.id, once.id])
+
+        for url in ('/tickets?fields=id,employee&expand=', '/tickets?expand=customer', '/tickets/9?fields=id,customer'):
+            with self.subTest(url=url):
+                await self.assertSameAsSync(url, STAFF_TOKEN)
+
+        response = await self.async_client.get('/async/tickets', {'fields': 'id,secret'}, headers=self.headers(STAFF_TOKEN))
+        expected = await self.async_client.get('/tickets', {'fields': 'id,secret'}, headers=self.headers(STAFF_TOKEN))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), expected.json())
+
+    async def test_pagination(self):
+        first = await self.assertSameAsSync('/tickets?page_size=4', STAFF_TOKEN)
+        self.assertEqual([ticket['id'] for ticket in first['results']], [1, 2, 3, 4])
+        self.assertIsNone(first['previous'])
+
+        # Follow the async view's own cursor forwards and back again
+        response = await self.async_client.get(first['next'], headers=self.headers(STAFF_TOKEN))
+        second = response.json()
+        self.assertEqual([ticket['id'] for ticket in second['results']], [5, 6, 7, 8])
+
+        response = await self.async_client.get(second['previous'], headers=self.headers(STAFF_TOKEN))
+        self.assertEqual([ticket['id'] for ticket in response.json()['results']], [1, 2, 3, 4])
+
+    async def test_authentication(self):
+        response = await self.async_client.get('/async/tickets')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+        response = await self.async_client.get('/async/tickets', headers=self.headers('bogus'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'detail': 'Invalid token.'})
+
+    async def test_not_found(self):
+        response = await self.async_client.get('/async/tickets/999', headers=self.headers(STAFF_TOKEN))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_ticket_writes_update_counters(self):
+        response = await self.async_client.post(
+            '/async/tickets',
+            {'description': 'Cracked screen', 'emergency': True},
+            content_type='application/json',
+            headers=self.headers(CUSTOMER_TOKEN)
+        )
+        self.assertEqual(response.status_code, 201)
+        created = response.json()
+        self.assertEqual(created['customer']['id'], 1)
+        emergencies = (await TicketStatistic.objects.aget(employee_id=2)).emergency
+
+        response = await self.async_client.put(
+            f'/async/tickets/{created["id"]}',
+            {'employee': 2},
+            content_type='application/json',
+            headers=self.headers(STAFF_TOKEN)
+        )
+        self.assertEqual(response.status_code, 204)
+        ticket = await ServiceTicket.objects.aget(pk=created['id'])
+        self.assertEqual(ticket.employee_id, 2)
+        self.assertEqual((await TicketStatistic.objects.aget(employee_id=2)).emergency, emergencies + 1)
+
+        response = await self.async_client.delete(f'/async/tickets/{created["id"]}', headers=self.headers(STAFF_TOKEN))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(await ServiceTicket.objects.filter(pk=created['id']).aexists())
+
+        # Every change was counted incrementally, so nothing has drifted
+        self.assertEqual(await sync_to_async(reconcile_ticket_stats)(), 0)
+
+    async def test_customer_update(self):
+        response = await self.async_client.put(
+            '/async/customers/1',
+            {'address': '100 Infinity Way'},
+            content_type='application/json',
+            headers=self.headers(CUSTOMER_TOKEN)
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual((await Customer.objects.aget(pk=1)).address, '100 Infinity Way')
+
+        response = await self.async_client.put(
+            '/async/customers/1',
+            {'address': 'Elsewhere'},
+            content_type='application/json',
+            headers=self.headers(OTHER_CUSTOMER)
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_unsupported_method(self):
+        response = await self.async_client.post('/async/employees', {}, content_type='application/json', headers=self.headers(STAFF_TOKEN))
+        self.assertEqual(response.status_code, 405)
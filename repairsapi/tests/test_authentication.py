@@ -0,0 +1,110 @@
+"""Tests for the cached token authentication"""
+from unittest import mock
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APITestCase
+from repairsapi.authentication import CachedTokenAuthentication, TokenCache, token_cache
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+
+
+class TokenCacheTests(SimpleTestCase):
+
+    def token(self, user_id):
+        return mock.Mock(user_id=user_id)
+
+    def test_hits_and_misses(self):
+        cache = TokenCache(max_size=10, ttl=60)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', self.token(1))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertEqual(cache.stats(), {'size': 1, 'max_size': 10, 'hits': 1, 'misses': 1})
+
+    def test_evicts_least_recently_used(self):
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set('a', self.token(1))
+        cache.set('b', self.token(2))
+        cache.get('a')
+        cache.set('c', self.token(3))
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_entries_expire(self):
+        cache = TokenCache(max_size=10, ttl=60)
+        with mock.patch('repairsapi.authentication.time.monotonic', return_value=100):
+            cache.set('a', self.token(1))
+        with mock.patch('repairsapi.authentication.time.monotonic', return_value=159):
+            self.assertIsNotNone(cache.get('a'))
+        with mock.patch('repairsapi.authentication.time.monotonic', return_value=160):
+            self.assertIsNone(cache.get('a'))
+
+    def test_invalidate_user(self):
+        cache = TokenCache(max_size=10, ttl=60)
+        cache.set('a', self.token(1))
+        cache.set('b', self.token(2))
+        cache.invalidate_user(1)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('b'))
+
+
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class CachedTokenAuthenticationTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        token_cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+
+    def test_second_request_skips_token_query(self):
+        with self.assertNumQueries(3):
+            self.client.get('/employees/1')
+        with self.assertNumQueries(2):
+            self.client.get('/employees/1')
+        self.assertEqual(token_cache.hits, 1)
+        self.assertEqual(token_cache.misses, 1)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get('/employees/1')
+        Token.objects.get(key=STAFF_TOKEN).delete()
+
+        response = self.client.get('/employees/1')
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get('/employees/1')
+        user = Token.objects.get(key=STAFF_TOKEN).user
+        user.is_active = False
+        user.save()
+
+        response = self.client.get('/employees/1')
+        self.assertEqual(response.status_code, 401)
+
+    def test_user_changes_are_seen(self):
+        self.client.get('/tickets')
+        user = Token.objects.get(key=STAFF_TOKEN).user
+        user.is_staff = False
+        user.save()
+
+        response = self.client.get('/tickets')
+        self.assertEqual(response.data['results'], [])
+
+    def test_invalid_token_is_not_cached(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token nope')
+        self.assertEqual(self.client.get('/employees').status_code, 401)
+        self.assertEqual(token_cache.stats()['size'], 0)
+
+    async def test_async_failures_keep_their_cause(self):
+        with self.assertRaises(AuthenticationFailed) as raised:
+            await CachedTokenAuthentication().aauthenticate_credentials('nope')
+        self.assertIsInstance(raised.exception.__cause__, Token.DoesNotExist)
+
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=b'Token \xff')
+        with self.assertRaises(AuthenticationFailed) as raised:
+            await CachedTokenAuthentication().aauthenticate(request)
+        self.assertIsInstance(raised.exception.__cause__, UnicodeError)
@@ -0,0 +1,151 @@
+"""Tests for the bulk ticket create and assign endpoints"""
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from repairsapi.authentication import token_cache
+from repairsapi.models import Customer, Employee, ServiceTicket
+from repairsapi.stats import reconcile_ticket_stats
+from repairsapi.testing import QueryBudgetMixin
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+CUSTOMER_TOKEN = '0be249c88238743e5b4a7ac370b5145730c28e20'
+
+
+class BulkCreateTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        reconcile_ticket_stats()
+        token_cache.clear()
+
+    def test_customer_creates_own_tickets(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        tickets = [{'description': f'Ticket {i}', 'emergency': i == 0} for i in range(50)]
+
+        response = self.client.post('/tickets/bulk', tickets, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 50)
+        self.assertEqual(response.data[0]['customer'], {'id': 1, 'full_name': 'Ryan Tanay'})
+        self.assertTrue(response.data[0]['emergency'])
+        self.assertEqual(ServiceTicket.objects.filter(customer_id=1).count(), 53)
+        self.assertEqual(reconcile_ticket_stats(), 0)
+
+    def test_constant_queries(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        self.client.get('/tickets')
+
+        # Customer lookup, then inside a savepoint one insert, the table
+        # version bump, the overall counter update and the events insert
+        with self.assertNumQueries(7):
+            self.client.post('/tickets/bulk', [{'description': 'x'}] * 150, format='json')
+
+    def test_per_item_errors(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        tickets = [{'description': 'Fine'}, {'emergency': True}, 'nonsense', {'description': 'x' * 200}]
+
+        response = self.client.post('/tickets/bulk', tickets, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data[0]['description'], 'Fine')
+        self.assertIn('description', response.data[1]['errors'])
+        self.assertIn('non_field_errors', response.data[2]['errors'])
+        self.assertIn('description', response.data[3]['errors'])
+        self.assertEqual(ServiceTicket.objects.count(), 10)
+
+    def test_staff_names_customers(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+        tickets = [{'description': 'A', 'customer': 2}, {'description': 'B', 'customer': 99}, {'description': 'C'}]
+
+        response = self.client.post('/tickets/bulk', tickets, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data[0]['customer']['id'], 2)
+        self.assertIn('customer', response.data[1]['errors'])
+        self.assertIn('customer', response.data[2]['errors'])
+
+    def test_nothing_valid(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        response = self.client.post('/tickets/bulk', [{}], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_array(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        response = self.client.post('/tickets/bulk', {'description': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkAssignTests(QueryBudgetMixin, APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        reconcile_ticket_stats()
+        token_cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+
+    def test_assigns_everything(self):
+        pairs = [{'ticket': pk, 'employee': 3} for pk in range(1, 10)]
+
+        response = self.client.put('/tickets/assign', pairs, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, pairs)
+        self.assertEqual(ServiceTicket.objects.filter(employee_id=3).count(), 9)
+        self.assertEqual(reconcile_ticket_stats(), 0)
+
+    def test_one_update_for_every_employee(self):
+        self.client.get('/tickets')
+        pairs = [{'ticket': pk, 'employee': 1 + pk % 2} for pk in range(1, 10)]
+
+        # Ticket and employee lookups, then inside a savepoint one UPDATE
+        # of the tickets, the table version bump, one of the counters and
+        # the events insert
+        with self.assertNumQueries(8):
+            self.client.put('/tickets/assign', pairs, format='json')
+
+        self.assertEqual(reconcile_ticket_stats(), 0)
+
+    def test_many_employees_within_budget(self):
+        customer = Customer.objects.first()
+        employees = Employee.objects.bulk_create([
+            Employee(user=User.objects.create(username=f'tech{i}@example.com', is_staff=True), specialty='Laptops')
+            for i in range(30)
+        ])
+        tickets = ServiceTicket.objects.bulk_create([
+            ServiceTicket(customer=customer, description=f'Ticket {i}') for i in range(30)
+        ])
+        reconcile_ticket_stats()
+
+        pairs = [{'ticket': ticket.id, 'employee': employee.id} for ticket, employee in zip(tickets, employees)]
+        response = self.request_within_budget('PUT', '/tickets/assign', pairs)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ServiceTicket.objects.get(pk=tickets[-1].id).employee_id, employees[-1].id)
+        self.assertEqual(reconcile_ticket_stats(), 0)
+
+    def test_per_item_errors(self):
+        pairs = [
+            {'ticket': 9, 'employee': 1},
+            {'ticket': 99, 'employee': 1},
+            {'ticket': 1, 'employee': 99},
+            {'ticket': 9, 'employee': 2},
+            {'ticket': 'x'},
+        ]
+
+        response = self.client.put('/tickets/assign', pairs, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data[0], {'ticket': 9, 'employee': 1})
+        self.assertIn('ticket', response.data[1]['errors'])
+        self.assertIn('employee', response.data[2]['errors'])
+        self.assertIn('ticket', response.data[3]['errors'])
+        self.assertIn('employee', response.data[4]['errors'])
+        self.assertEqual(ServiceTicket.objects.get(pk=9).employee_id, 1)
+        self.assertEqual(ServiceTicket.objects.get(pk=1).employee_id, 1)
+
+    def test_staff_only(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        response = self.client.put('/tickets/assign', [{'ticket': 9, 'employee': 1}], format='json')
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,79 @@
+"""Tests for ETags and conditional GET on the list and detail endpoints"""
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from repairsapi.authentication import token_cache
+from repairsapi.models import Customer, ServiceTicket
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+OTHER_STAFF_TOKEN = '8b44b69d17de6e7e81bede339e8fd997369f8819'
+CUSTOMER_TOKEN = '0be249c88238743e5b4a7ac370b5145730c28e20'
+OTHER_CUSTOMER_TOKEN = 'ec7ddcc665035a3adeaa80ed8f812bfe3ef5b5f4'
+
+URLS = ('/tickets', '/tickets/1', '/tickets?status=done', '/customers', '/customers/1', '/employees', '/employees/1')
+
+
+class ConditionalGetTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        token_cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified(self):
+        for url in URLS:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                self.assertTrue(etag)
+
+                response = self.revalidate(url, etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_not_modified_skips_the_view(self):
+        etag = self.client.get('/tickets')['ETag']
+
+        # Only the version lookup runs
+        with self.assertNumQueries(1):
+            self.revalidate('/tickets', etag)
+
+    def test_etag_differs_by_url(self):
+        etags = {self.client.get(url)['ETag'] for url in URLS}
+        self.assertEqual(len(etags), len(URLS))
+
+    def test_ticket_write_changes_etag(self):
+        etag = self.client.get('/tickets')['ETag']
+        ServiceTicket.objects.filter(pk=1).first().save()
+        self.assertEqual(self.revalidate('/tickets', etag).status_code, 200)
+
+    def test_bulk_write_changes_etag(self):
+        etag = self.client.get('/tickets')['ETag']
+        self.client.put('/tickets/assign', [{'ticket': 9, 'employee': 1}], format='json')
+        self.assertEqual(self.revalidate('/tickets', etag).status_code, 200)
+
+    def test_name_change_changes_etag(self):
+        etag = self.client.get('/customers')['ETag']
+        User.objects.filter(pk=1).first().save()
+        self.assertEqual(self.revalidate('/customers', etag).status_code, 200)
+
+    def test_unrelated_write_keeps_etag(self):
+        etag = self.client.get('/employees')['ETag']
+        Customer.objects.filter(pk=1).first().save()
+        self.assertEqual(self.revalidate('/employees', etag).status_code, 304)
+
+    def test_scoped_to_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        etag = self.client.get('/tickets')['ETag']
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {OTHER_CUSTOMER_TOKEN}')
+        self.assertEqual(self.revalidate('/tickets', etag).status_code, 200)
+
+    def test_staff_share_etags(self):
+        etag = self.client.get('/tickets')['ETag']
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {OTHER_STAFF_TOKEN}')
+        self.assertEqual(self.revalidate('/tickets', etag).status_code, 304)
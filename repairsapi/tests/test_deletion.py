@@ -0,0 +1,104 @@
+"""Tests for the set-based customer and ticket deletes"""
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from repairsapi.authentication import token_cache
+from repairsapi.deletion import delete_tickets
+from repairsapi.models import Customer, ServiceTicket, TicketSearch
+from repairsapi.stats import reconcile_ticket_stats
+from repairsapi.versions import get_versions
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+CUSTOMER_TOKEN = '0be249c88238743e5b4a7ac370b5145730c28e20'
+
+
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class CustomerDeleteTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        reconcile_ticket_stats()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+
+    def add_tickets(self, customer, count):
+        ServiceTicket.objects.bulk_create(
+            ServiceTicket(customer=customer, employee_id=i % 3 + 1 if i % 2 else None, description=f'Old ticket {i}')
+            for i in range(count)
+        )
+        reconcile_ticket_stats()
+
+    def test_deletes_customer_tickets_user_and_token(self):
+        customer = Customer.objects.get(pk=1)
+        user_id = customer.user_id
+        ticket_ids = list(customer.submitted_tickets.values_list('id', flat=True))
+
+        response = self.client.delete('/customers/1')
+        self.assertEqual(response.status_code, 204)
+
+        self.assertFalse(Customer.objects.filter(pk=1).exists())
+        self.assertFalse(ServiceTicket.objects.filter(pk__in=ticket_ids).exists())
+        self.assertFalse(User.objects.filter(pk=user_id).exists())
+        self.assertFalse(Token.objects.filter(user_id=user_id).exists())
+        self.assertTrue(ServiceTicket.objects.exclude(customer_id=1).exists())
+
+        # Everything kept in step with the tickets
+        self.assertEqual(reconcile_ticket_stats(), 0)
+        if connection.vendor == 'sqlite':
+            self.assertFalse(TicketSearch.objects.filter(ticket_id__in=ticket_ids).exists())
+
+    def test_deleted_customer_token_stops_working(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        self.assertEqual(self.client.get('/tickets').status_code, 200)
+        self.assertIsNotNone(token_cache.get(CUSTOMER_TOKEN))
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+        self.client.delete('/customers/1')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        self.assertEqual(self.client.get('/tickets').status_code, 401)
+
+    def test_queries_do_not_grow_with_tickets(self):
+        # Both customers have tickets with every employee, so the same
+        # counter rows change
+        customers = list(Customer.objects.select_related('user').order_by('id')[:2])
+        self.add_tickets(customers[0], 6)
+        self.add_tickets(customers[1], 600)
+
+        counts = []
+        for customer in customers:
+            with CaptureQueriesContext(connection) as queries:
+                self.client.delete(f'/customers/{customer.pk}')
+            counts.append(len(queries))
+
+        self.assertEqual(counts[1], counts[0])
+
+    def test_missing_customer(self):
+        with self.assertRaises(Customer.DoesNotExist):
+            self.client.delete('/customers/99')
+
+    def test_async(self):
+        response = self.client.delete('/async/customers/2')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(ServiceTicket.objects.filter(customer_id=2).exists())
+        self.assertEqual(reconcile_ticket_stats(), 0)
+
+
+class DeleteTicketsTests(APITestCase):
+
+    fixtures = ['users', 'customers', 'employees', 'tickets']
+
+    def test_counts_and_versions(self):
+        reconcile_ticket_stats()
+        (version,) = get_versions(ServiceTicket)
+
+        self.assertEqual(delete_tickets(ServiceTicket.objects.filter(emergency=True)), 2)
+        self.assertEqual(reconcile_ticket_stats(), 0)
+        self.assertEqual(get_versions(ServiceTicket), (version + 1,))
+
+        self.assertEqual(delete_tickets(ServiceTicket.objects.filter(emergency=True)), 0)
+        self.assertEqual(get_versions(ServiceTicket), (version + 1,))
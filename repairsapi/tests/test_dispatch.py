@@ -0,0 +1,116 @@
+"""Tests for assigning every unclaimed ticket with /tickets/dispatch"""
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from repairsapi.dispatch import plan_dispatch
+from repairsapi.models import Customer, Employee, ServiceTicket
+from repairsapi.stats import reconcile_ticket_stats
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+CUSTOMER_TOKEN = '0be249c88238743e5b4a7ac370b5145730c28e20'
+
+EMPLOYEES = [(1, 'Routers'), (2, 'Laptops'), (3, 'Mobile phones')]
+
+
+class PlanDispatchTests(SimpleTestCase):
+
+    def test_matches_specialty(self):
+        plan = plan_dispatch([
+            (1, 'Laptop fan is loud', False),
+            (2, 'Router keeps rebooting', False),
+            (3, 'PHONE screen cracked', False),
+        ], EMPLOYEES, {})
+        self.assertEqual(plan, {1: 2, 2: 1, 3: 3})
+
+    def test_least_loaded_first(self):
+        plan = plan_dispatch([(1, 'Printer jammed', False), (2, 'Scanner dead', False)], EMPLOYEES, {1: 4, 2: 0, 3: 1})
+        self.assertEqual(plan, {1: 2, 2: 2})
+
+        # A specialist keeps taking matching tickets however loaded they are
+        plan = plan_dispatch([(1, 'Router lights off', False)], EMPLOYEES, {1: 9})
+        self.assertEqual(plan, {1: 1})
+
+    def test_spreads_load(self):
+        tickets = [(i, 'Printer jammed', False) for i in range(1, 31)]
+        plan = plan_dispatch(tickets, EMPLOYEES, {1: 5})
+
+        counts = {employee_id: list(plan.values()).count(employee_id) for employee_id, _ in EMPLOYEES}
+        self.assertEqual(counts, {1: 7, 2: 12, 3: 11})
+
+    def test_emergencies_first(self):
+        plan = plan_dispatch([
+            (1, 'Router slow', False),
+            (2, 'Router on fire', True),
+            (3, 'Router flickers', False),
+        ], [(1, 'Routers')], {})
+        self.assertEqual(list(plan), [2, 1, 3])
+
+    def test_no_employees(self):
+        self.assertEqual(plan_dispatch([(1, 'Router slow', False)], [], {}), {})
+
+
+class DispatchViewTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        reconcile_ticket_stats()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+
+    def test_assigns_backlog(self):
+        customer = Customer.objects.get(pk=1)
+        ServiceTicket.objects.bulk_create(
+            ServiceTicket(customer=customer, description=description, emergency=i % 7 == 0)
+            for i, description in enumerate(['Router drops wifi', 'Laptop hinge broke', 'Phone will not charge', 'Printer jammed'] * 250)
+        )
+        reconcile_ticket_stats()
+        backlog = set(ServiceTicket.objects.filter(employee__isnull=True, date_completed__isnull=True).values_list('id', flat=True))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/tickets/dispatch')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['assigned'], len(backlog))
+        self.assertEqual({pair['ticket'] for pair in response.data['assignments']}, backlog)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "repairsapi_serviceticket"') for query in queries), 1)
+
+        self.assertFalse(ServiceTicket.objects.filter(employee__isnull=True, date_completed__isnull=True).exists())
+        self.assertEqual(ServiceTicket.objects.filter(description__startswith='Laptop').exclude(employee__specialty='Laptops').count(), 0)
+
+        # The status counters were kept up to date
+        self.assertEqual(reconcile_ticket_stats(), 0)
+
+    def test_leaves_assigned_and_completed_tickets(self):
+        before = dict(ServiceTicket.objects.filter(employee__isnull=False).values_list('id', 'employee'))
+        completed = ServiceTicket.objects.create(customer_id=1, description='Done already', date_completed='2022-05-01')
+
+        self.client.post('/tickets/dispatch')
+
+        after = dict(ServiceTicket.objects.filter(pk__in=before).values_list('id', 'employee'))
+        self.assertEqual(after, before)
+        completed.refresh_from_db()
+        self.assertIsNone(completed.employee_id)
+
+    def test_nothing_to_assign(self):
+        self.client.post('/tickets/dispatch')
+        response = self.client.post('/tickets/dispatch')
+        self.assertEqual(response.data, {'assigned': 0, 'assignments': []})
+
+    def test_staff_only(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        response = self.client.post('/tickets/dispatch')
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(ServiceTicket.objects.filter(pk=9, employee__isnull=True).exists())
+
+    def test_skips_inactive_employees(self):
+        user = Employee.objects.select_related('user').get(pk=2).user
+        user.is_active = False
+        user.save()
+        for i in range(6):
+            ServiceTicket.objects.create(customer_id=1, description=f'Laptop problem {i}')
+
+        response = self.client.post('/tickets/dispatch')
+        self.assertEqual(response.data['assigned'], 7)
+        self.assertNotIn(2, {pair['employee'] for pair in response.data['assignments']})
@@ -0,0 +1,89 @@
+"""Tests for sparse fieldsets with `?fields=` and `?expand=`"""
+import json
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from repairsapi.models import ServiceTicket
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+
+
+class FieldsetTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        caches['responses'].clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+
+    def get(self, url, **params):
+        '''GET `url` and return its JSON and the SQL of its last query'''
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return json.loads(response.content), queries.captured_queries[-1]['sql']
+
+    def test_ticket_fields(self):
+        data, sql = self.get('/tickets', fields='id,emergency,date_completed')
+
+        ticket = ServiceTicket.objects.get(pk=data['results'][0]['id'])
+        self.assertEqual(data['results'][0], {
+            'id': ticket.id,
+            'emergency': ticket.emergency,
+            'date_completed': ticket.date_completed and ticket.date_completed.isoformat(),
+        })
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('description', sql)
+
+    def test_collapsed_relations(self):
+        data, sql = self.get('/tickets/1', expand='')
+        ticket = ServiceTicket.objects.get(pk=1)
+
+        self.assertEqual(list(data), ['id', 'description', 'emergency', 'date_completed', 'employee', 'customer'])
+        self.assertEqual((data['employee'], data['customer']), (ticket.employee_id, ticket.customer_id))
+        self.assertNotIn('JOIN', sql)
+
+    def test_expanded_relation(self):
+        data, sql = self.get('/tickets/1', fields='customer,employee', expand='customer')
+
+        self.assertEqual(list(data), ['employee', 'customer'])
+        customer = ServiceTicket.objects.get(pk=1).customer
+        self.assertEqual(data['customer'], {'id': customer.id, 'full_name': customer.full_name})
+        self.assertNotIn('repairsapi_employee', sql)
+
+    def test_defaults_unchanged(self):
+        every_field = 'id,description,emergency,date_completed,employee,customer'
+        self.assertEqual(self.get('/tickets')[0], self.get('/tickets', fields=every_field, expand='employee,customer')[0])
+
+    def test_stream(self):
+        response = self.client.get('/tickets', {'stream': 'ndjson', 'fields': 'id,customer', 'expand': ''})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+        self.assertEqual(rows[0], {'id': 1, 'customer': ServiceTicket.objects.get(pk=1).customer_id})
+        self.assertEqual(len(rows), ServiceTicket.objects.count())
+
+    def test_customer_and_employee_fields(self):
+        data, sql = self.get('/customers', fields='id,address')
+        self.assertEqual(set(data['results'][0]), {'id', 'address'})
+        self.assertNotIn('auth_user', sql)
+
+        data, sql = self.get('/employees/2', fields='full_name')
+        self.assertEqual(data, {'full_name': 'Emily Lemmon'})
+        self.assertNotIn('"auth_user"."password"', sql)
+
+    @override_settings(RESPONSE_CACHE_ALIAS='responses')
+    def test_fieldsets_are_cached_separately(self):
+        self.assertEqual(set(self.get('/customers/1', fields='id')[0]), {'id'})
+        self.assertEqual(set(self.get('/customers/1')[0]), {'id', 'address', 'full_name'})
+
+    def test_unknown_fields(self):
+        for params in ({'fields': 'id,secret'}, {'fields': ''}, {'expand': 'user'}):
+            with self.subTest(params=params):
+                response = self.client.get('/tickets', params)
+                self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/employees', {'expand': 'user'})
+        self.assertEqual(response.json(), {'expand': ['Unknown field user. Choose from none.']})
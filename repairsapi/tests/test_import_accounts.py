@@ -0,0 +1,137 @@
+"""Tests for bulk account imports and the import_accounts command"""
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from repairsapi import accounts
+from repairsapi.accounts import DUPLICATE_EMAIL, import_accounts, read_accounts
+from repairsapi.models import Customer, Employee, TableVersion
+
+
+CSV = '''email,password,first_name,last_name,account_type,address,specialty
+ana@example.com,secret1,Ana,Lee,customer,1 Main St.,
+bo@example.com,secret2,Bo,Ray,employee,,Laptops
+cy@example.com,secret3,Cy,Fox,customer,,
+'''
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportAccountsTests(TestCase):
+
+    fixtures = ['users', 'customers', 'employees']
+
+    def row(self, email, **fields):
+        data = {
+            'email': email, 'password': 'secret', 'first_name': 'Pat',
+            'last_name': 'Doe', 'account_type': 'customer', 'address': '1 Main St.',
+        }
+        data.update(fields)
+        return data
+
+    def test_csv(self):
+        created, errors = import_accounts(read_accounts(io.StringIO(CSV), 'csv'))
+
+        self.assertEqual(created, 2)
+        self.assertEqual(errors, [
+            {'row': 4, 'email': 'cy@example.com', 'message': 'You must provide an address for a customer'},
+        ])
+
+        ana = User.objects.get(username='ana@example.com')
+        self.assertTrue(ana.check_password('secret1'))
+        self.assertEqual(ana.customer.address, '1 Main St.')
+        self.assertTrue(Token.objects.filter(user=ana).exists())
+
+        bo = User.objects.get(username='bo@example.com')
+        self.assertTrue(bo.is_staff)
+        self.assertEqual(Employee.objects.get(user=bo).specialty, 'Laptops')
+        self.assertEqual(len(Token.objects.get(user=bo).key), 40)
+
+    def test_ndjson(self):
+        lines = [json.dumps(self.row('ana@example.com')), '', '[1, 2]', '{"email": ']
+        created, errors = import_accounts(read_accounts(io.StringIO('\n'.join(lines)), file_format='ndjson'))
+
+        self.assertEqual(created, 1)
+        self.assertEqual([(error['row'], error['message']) for error in errors], [
+            (3, 'Not a JSON object'), (4, 'Not a JSON object'),
+        ])
+
+    def test_duplicate_emails_are_reported_per_row(self):
+        existing = User.objects.filter(customer__isnull=False).first().username
+        rows = enumerate([
+            self.row('new@example.com'),
+            self.row(existing),
+            self.row('new@example.com'),
+            self.row('other@example.com'),
+        ], start=1)
+
+        created, errors = import_accounts(rows, batch_size=2)
+
+        self.assertEqual(created, 2)
+        self.assertEqual(errors, [
+            {'row': 2, 'email': existing, 'message': DUPLICATE_EMAIL},
+            {'row': 3, 'email': 'new@example.com', 'message': DUPLICATE_EMAIL},
+        ])
+        self.assertEqual(User.objects.filter(username='new@example.com').count(), 1)
+
+    def test_race_falls_back_to_one_account_at_a_time(self):
+        # An email taken between the duplicate check and the bulk insert
+        User.objects.create(username='late@example.com')
+
+        with mock.patch.object(accounts, 'registered', return_value=set()):
+            created, errors = import_accounts(
+                enumerate([self.row('fresh@example.com'), self.row('late@example.com')], start=1)
+            )
+
+        self.assertEqual(created, 1)
+        self.assertEqual(errors, [{'row': 2, 'email': 'late@example.com', 'message': DUPLICATE_EMAIL}])
+        self.assertTrue(Customer.objects.filter(user__username='fresh@example.com').exists())
+
+    def test_one_batch_per_transaction(self):
+        rows = enumerate([self.row(f'user{i}@example.com') for i in range(10)], start=1)
+        # Per batch: the duplicate check, a savepoint and its release, three
+        # inserts, reading back the user ids and three table version bumps
+        with self.assertNumQueries(4 * 10):
+            created, _ = import_accounts(rows, batch_size=3)
+        self.assertEqual(created, 10)
+
+    def test_bumps_table_versions(self):
+        import_accounts(enumerate([self.row('pat@example.com')], start=1))
+        self.assertTrue(TableVersion.objects.filter(table=Customer._meta.db_table, version__gt=0).exists())
+
+
+class ImportAccountsCommandTests(TestCase):
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'accounts.csv')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(CSV)
+
+            stdout, stderr = io.StringIO(), io.StringIO()
+            call_command('import_accounts', path, workers=2, stdout=stdout, stderr=stderr)
+
+        self.assertIn('Created 2 accounts, skipped 1 rows', stdout.getvalue())
+        self.assertEqual(json.loads(stderr.getvalue())['row'], 4)
+        self.assertTrue(User.objects.get(username='ana@example.com').check_password('secret1'))
+
+    def test_unknown_format(self):
+        with self.assertRaises(CommandError):
+            call_command('import_accounts', 'accounts.txt')
+
+    def test_missing_file(self):
+        with self.assertRaises(CommandError) as raised:
+            call_command('import_accounts', 'missing.csv')
+        self.assertIsInstance(raised.exception.__cause__, FileNotFoundError)
+
+    def test_leaves_stdin_open(self):
+        stdin = io.StringIO(CSV)
+        with mock.patch('sys.stdin', stdin):
+            call_command('import_accounts', '-', format='csv', workers=1, stdout=io.StringIO(), stderr=io.StringIO())
+
+        self.assertFalse(stdin.closed)
+        self.assertTrue(User.objects.filter(username='bo@example.com').exists())
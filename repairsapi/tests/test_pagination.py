@@ -0,0 +1,88 @@
+"""Tests for cursor pagination of the list endpoints"""
+from urllib.parse import parse_qs, urlsplit
+from rest_framework.test import APITestCase
+from repairsapi.models import Customer, ServiceTicket
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+
+
+class CursorPaginationTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+
+    def collect_ids(self, url):
+        """Follow `next` links from `url` and return every id seen"""
+        ids = []
+        while url is not None:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_page_shape(self):
+        response = self.client.get('/tickets?page_size=4')
+        self.assertEqual(set(response.data), {'next', 'previous', 'results'})
+        self.assertEqual([t['id'] for t in response.data['results']], [1, 2, 3, 4])
+        self.assertIsNone(response.data['previous'])
+        self.assertIn('cursor=', response.data['next'])
+
+    def test_walks_every_row_once(self):
+        self.assertEqual(self.collect_ids('/tickets?page_size=2'), list(range(1, 10)))
+        self.assertEqual(self.collect_ids('/customers?page_size=2'), [1, 2, 3])
+        self.assertEqual(self.collect_ids('/employees?page_size=2'), [1, 2, 3])
+
+    def test_previous_link(self):
+        first = self.client.get('/tickets?page_size=3')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def test_stable_while_inserting(self):
+        first = self.client.get('/tickets?page_size=5')
+        ServiceTicket.objects.create(customer=Customer.objects.get(pk=1), description='New')
+
+        second = self.client.get(first.data['next'])
+        ids = [t['id'] for t in first.data['results'] + second.data['results']]
+        self.assertEqual(ids, list(range(1, 11)))
+
+    def test_page_size_is_capped(self):
+        response = self.client.get('/tickets?page_size=100000')
+        self.assertEqual(len(response.data['results']), 9)
+
+    def test_filtered_list_is_paginated(self):
+        response = self.client.get('/tickets?status=done&page_size=2')
+        self.assertEqual([t['id'] for t in response.data['results']], [2, 3])
+        self.assertEqual(self.collect_ids(response.data['next']), [6, 8])
+
+    def test_unknown_status_is_empty(self):
+        response = self.client.get('/tickets?status=bogus')
+        self.assertEqual(response.data['results'], [])
+
+    async def test_async_pages_match(self):
+        # apaginate_queryset() runs CursorPagination's own algorithm, so the
+        # async view pages exactly as the ViewSet does, forwards and back
+        headers = {'Authorization': f'Token {STAFF_TOKEN}'}
+
+        def cursor(link):
+            return link and parse_qs(urlsplit(link).query)['cursor'][0]
+
+        query, pages = 'page_size=2', []
+        for _ in range(7):
+            page = (await self.async_client.get(f'/tickets?{query}', headers=headers)).json()
+            async_page = (await self.async_client.get(f'/async/tickets?{query}', headers=headers)).json()
+            self.assertEqual(async_page['results'], page['results'])
+            self.assertEqual(
+                (cursor(async_page['next']), cursor(async_page['previous'])), (cursor(page['next']), cursor(page['previous']))
+            )
+            pages.append([ticket['id'] for ticket in page['results']])
+
+            # Five pages forwards, then back from the last one
+            link = page['next'] if len(pages) < 5 else page['previous']
+            query = urlsplit(link).query
+
+        self.assertEqual(pages, [[1, 2], [3, 4], [5, 6], [7, 8], [9], [7, 8], [5, 6]])
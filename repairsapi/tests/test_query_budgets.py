@@ -0,0 +1,151 @@
+"""Tests for the view query budgets and the N+1 query detection"""
+from unittest import mock
+from django.conf import settings
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+from honeyrae.urls import router
+from repairsapi.authentication import token_cache
+from repairsapi.models import Customer, Employee
+from repairsapi.queries import inspect_queries, query_shape
+from repairsapi.testing import QueryBudgetMixin
+from repairsapi.views import CustomerView, customer_view
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+CUSTOMER_TOKEN = '0be249c88238743e5b4a7ac370b5145730c28e20'
+
+
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Each action's budget counts a cold token cache, so every request
+    here starts with one"""
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def request(self, token, method, url, data=None):
+        token_cache.clear()
+        if token is None:
+            self.client.credentials()
+        else:
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+        response = self.request_within_budget(method, url, data)
+        self.assertLess(response.status_code, 500)
+
+    def test_every_action_has_a_budget(self):
+        for _, viewset, _ in router.registry:
+            actions = [name for name in ('list', 'retrieve', 'create', 'update', 'destroy') if hasattr(viewset, name)]
+            actions += [extra.__name__ for extra in viewset.get_extra_actions()]
+            for name in actions:
+                with self.subTest(view=viewset.__name__, action=name):
+                    self.assertTrue(hasattr(getattr(viewset, name), 'query_budget'))
+
+    def test_tickets(self):
+        self.request(STAFF_TOKEN, 'GET', '/tickets')
+        self.request(STAFF_TOKEN, 'GET', '/tickets?status=done')
+        self.request(CUSTOMER_TOKEN, 'GET', '/tickets')
+        self.request(STAFF_TOKEN, 'GET', '/tickets/1')
+        self.request(STAFF_TOKEN, 'GET', '/tickets/stats')
+        self.request(CUSTOMER_TOKEN, 'POST', '/tickets', {'description': 'Fan rattles', 'emergency': False})
+        self.request(STAFF_TOKEN, 'PUT', '/tickets/9', {'employee': 1})
+        self.request(STAFF_TOKEN, 'DELETE', '/tickets/3')
+
+    def test_bulk_tickets(self):
+        self.request(STAFF_TOKEN, 'POST', '/tickets/bulk', [
+            {'description': 'Fan rattles', 'customer': 1},
+            {'description': 'Hinge loose', 'customer': 2},
+        ])
+        self.request(STAFF_TOKEN, 'PUT', '/tickets/assign', [
+            {'ticket': 1, 'employee': 2},
+            {'ticket': 2, 'employee': 3},
+        ])
+        self.request(STAFF_TOKEN, 'POST', '/tickets/dispatch')
+
+    def test_customers(self):
+        self.request(STAFF_TOKEN, 'GET', '/customers')
+        self.request(STAFF_TOKEN, 'GET', '/customers/1')
+        self.request(CUSTOMER_TOKEN, 'PUT', '/customers/1', {'address': '1 New St.'})
+        self.request(STAFF_TOKEN, 'DELETE', '/customers/3')
+
+    def test_employees(self):
+        self.request(STAFF_TOKEN, 'GET', '/employees')
+        self.request(STAFF_TOKEN, 'GET', '/employees/1')
+        self.request(STAFF_TOKEN, 'PUT', '/employees/1', {})
+
+    def test_auth(self):
+        self.request(None, 'POST', '/register', {
+            'account_type': 'employee', 'email': 'new@example.com', 'password': 'secret',
+            'first_name': 'New', 'last_name': 'Hire', 'specialty': 'Routers',
+        })
+        self.request(None, 'POST', '/login', {'email': 'new@example.com', 'password': 'secret'})
+
+    def test_fails_over_budget(self):
+        with mock.patch.object(CustomerView.list, 'query_budget', 1):
+            with self.assertRaisesRegex(AssertionError, r'GET /customers ran 3 queries, over its budget of 1'):
+                self.request(STAFF_TOKEN, 'GET', '/customers')
+
+
+class QueryInspectionTests(TestCase):
+
+    fixtures = ['users', 'customers', 'employees']
+
+    def test_query_shape(self):
+        self.assertEqual(
+            query_shape('SELECT "a" FROM "t" WHERE "id" IN (%s, %s, %s) AND "b" = \'it\'\'s\' LIMIT 21'),
+            query_shape('SELECT "a" FROM "t" WHERE "id" IN (%s) AND "b" = \'x\' LIMIT 1'),
+        )
+
+    def test_detects_per_row_queries(self):
+        with inspect_queries(threshold=3) as inspector:
+            names = [customer.full_name for customer in Customer.objects.all()]
+
+        self.assertEqual(len(names), 3)
+        ((shape, count, stack),) = inspector.repeated()
+        self.assertIn('FROM "auth_user"', shape)
+        self.assertEqual(count, 3)
+        self.assertIn('test_query_budgets.py', stack)
+
+    def test_ignores_joined_queries(self):
+        with inspect_queries(threshold=3) as inspector:
+            names = [customer.full_name for customer in Customer.objects.select_related('user')]
+            names += [employee.full_name for employee in Employee.objects.select_related('user')]
+
+        self.assertEqual(len(names), 3 + Employee.objects.count())
+        self.assertEqual(inspector.repeated(), [])
+
+
+@override_settings(
+    DEBUG=True,
+    RESPONSE_CACHE_ALIAS=None,
+    MIDDLEWARE=[*settings.MIDDLEWARE, 'repairsapi.middleware.QueryInspectionMiddleware'],
+)
+class QueryInspectionMiddlewareTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees']
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+
+    def test_logs_n_plus_one(self):
+        # Lose the join that keeps `full_name` from querying per customer
+        with mock.patch.object(customer_view, 'only_fieldset', lambda queryset, *args: queryset), \
+                self.assertLogs('repairsapi.queries', 'WARNING') as logs:
+            self.client.get('/customers')
+
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('Possible N+1: GET /customers ran 3 queries', logs.output[0])
+        self.assertIn('customer_view.py', logs.output[0])
+        self.assertIn('Query budget exceeded: GET /customers ran 6 queries, over its budget of 3', logs.output[1])
+
+    def test_redacts_query_tokens(self):
+        with mock.patch.object(customer_view, 'only_fieldset', lambda queryset, *args: queryset), \
+                self.assertLogs('repairsapi.queries', 'WARNING') as logs:
+            self.client.get('/customers', {'fields': 'id,full_name', 'token': STAFF_TOKEN})
+
+        self.assertIn('GET /customers?fields=id,full_name&token=REDACTED ran', logs.output[0])
+        self.assertNotIn(STAFF_TOKEN, ''.join(logs.output))
+
+    def test_quiet_for_clean_requests(self):
+        with self.assertNoLogs('repairsapi.queries'):
+            self.client.get('/customers')
+            self.client.get('/tickets')
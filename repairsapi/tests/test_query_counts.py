@@ -0,0 +1,94 @@
+"""Query count regression tests for the repairsapi viewsets"""
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from repairsapi.authentication import token_cache
+from repairsapi.models import Customer, Employee, ServiceTicket
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+CUSTOMER_TOKEN = '0be249c88238743e5b4a7ac370b5145730c28e20'
+
+
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class QueryCountTests(APITestCase):
+    """Every endpoint should cost the same number of queries no matter
+    how many rows it returns. With the response cache off and the token
+    cached by the first request, a request only queries for the table
+    versions behind its ETag and for the data itself."""
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        token_cache.clear()
+
+    def add_rows(self, count):
+        """Create `count` extra customers and employees, each with a ticket"""
+        for i in range(count):
+            customer = Customer.objects.create(
+                user=User.objects.create(username=f'customer{i}@example.com'),
+                address=f'{i} Main St.'
+            )
+            employee = Employee.objects.create(
+                user=User.objects.create(username=f'employee{i}@example.com', is_staff=True),
+                specialty='Routers'
+            )
+            ServiceTicket.objects.create(
+                customer=customer,
+                employee=employee,
+                description=f'Ticket {i}',
+                date_completed='2022-05-01' if i % 2 else None
+            )
+
+    def assertConstantQueries(self, url, token, num):
+        """Request `url` before and after adding rows, expecting `num` queries both times"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        self.client.get(url)
+
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        self.add_rows(10)
+
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_cold_token_lookup(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+        with self.assertNumQueries(3):
+            self.client.get('/tickets')
+
+    def test_staff_ticket_list(self):
+        self.assertConstantQueries('/tickets', STAFF_TOKEN, 2)
+
+    def test_customer_ticket_list(self):
+        self.assertConstantQueries('/tickets', CUSTOMER_TOKEN, 2)
+
+    def test_ticket_list_by_status(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+        self.client.get('/tickets')
+
+        for ticket_status in ('done', 'unclaimed', 'inprogress', 'all'):
+            with self.subTest(status=ticket_status):
+                with self.assertNumQueries(2):
+                    self.client.get(f'/tickets?status={ticket_status}')
+
+    def test_ticket_retrieve(self):
+        self.assertConstantQueries('/tickets/1', STAFF_TOKEN, 2)
+
+    def test_unassigned_ticket_retrieve(self):
+        self.assertConstantQueries('/tickets/9', STAFF_TOKEN, 2)
+
+    def test_customer_list(self):
+        self.assertConstantQueries('/customers', STAFF_TOKEN, 2)
+
+    def test_customer_retrieve(self):
+        self.assertConstantQueries('/customers/1', STAFF_TOKEN, 2)
+
+    def test_employee_list(self):
+        self.assertConstantQueries('/employees', STAFF_TOKEN, 2)
+
+    def test_employee_retrieve(self):
+        self.assertConstantQueries('/employees/1', STAFF_TOKEN, 2)
@@ -0,0 +1,87 @@
+"""Query plan tests for the ticket list filters
+
+Each `status=` branch of ServiceTicketView.list is requested through the
+API, and the ticket query it ran is EXPLAINed. A plan that reads the whole
+ticket table instead of an index fails the test.
+"""
+import re
+import unittest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APITestCase
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+CUSTOMER_TOKEN = '0be249c88238743e5b4a7ac370b5145730c28e20'
+
+# Plan lines that mean the ticket table is read row by row
+FULL_SCANS = {
+    'sqlite': re.compile(r'\bSCAN repairsapi_serviceticket\b(?! USING (COVERING )?INDEX)'),
+    'postgresql': re.compile(r'\bSeq Scan on repairsapi_serviceticket\b'),
+}
+
+
+@unittest.skipUnless(connection.vendor in FULL_SCANS, 'No plan check for this database')
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class TicketQueryPlanTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def explain_ticket_query(self, url, token):
+        """Request `url` and return the plan of the paged ticket query it ran"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        ticket_queries = [
+            query['sql'] for query in context.captured_queries
+            if 'FROM "repairsapi_serviceticket"' in query['sql']
+        ]
+        self.assertEqual(len(ticket_queries), 1)
+
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {ticket_queries[0]}')
+                return '\n'.join(row[-1] for row in cursor.fetchall())
+
+            # Without statistics for the tiny fixture tables the planner
+            # would rightly prefer a sequential scan
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {ticket_queries[0]}')
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, url, token=STAFF_TOKEN):
+        plan = self.explain_ticket_query(url, token)
+        self.assertNotRegex(plan, FULL_SCANS[connection.vendor], f'{url} scans the ticket table:\n{plan}')
+
+    def test_done(self):
+        self.assertUsesIndex('/tickets?status=done')
+
+    def test_unclaimed(self):
+        self.assertUsesIndex('/tickets?status=unclaimed')
+
+    def test_inprogress(self):
+        self.assertUsesIndex('/tickets?status=inprogress')
+
+    def test_customer_tickets(self):
+        self.assertUsesIndex('/tickets', CUSTOMER_TOKEN)
+
+    def test_later_pages(self):
+        for ticket_status in ('done', 'inprogress'):
+            with self.subTest(status=ticket_status):
+                self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+                first = self.client.get(f'/tickets?status={ticket_status}&page_size=1')
+                self.assertUsesIndex(first.data['next'])
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'Other databases search without an index')
+    def test_search(self):
+        self.assertUsesIndex('/tickets?q=screen')
+        self.assertUsesIndex('/tickets?q=screen&status=done')
+
+    def test_detects_full_scan(self):
+        # Listing every ticket has no filter to index, which makes it a
+        # handy check that the detection itself works
+        plan = self.explain_ticket_query('/tickets?status=all', STAFF_TOKEN)
+        self.assertRegex(plan, FULL_SCANS[connection.vendor])
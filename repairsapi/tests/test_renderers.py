@@ -0,0 +1,93 @@
+"""Tests for the fast JSON renderer and parser"""
+import io
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest import mock, skipIf
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+from repairsapi import parsers, renderers
+from repairsapi.parsers import FastJSONParser
+from repairsapi.renderers import FastJSONRenderer
+
+
+PAYLOAD = ReturnDict({
+    'next': None,
+    'results': ReturnList([
+        {
+            'id': 1,
+            'description': 'Écran fissuré \u2028\u2029 "quoted" \\ 🙁',
+            'emergency': True,
+            'date_completed': date(2022, 5, 1),
+            'employee': None,
+            'customer': {'id': 3, 'full_name': 'Zoë Example'},
+        },
+    ], serializer=None),
+    'created': datetime(2022, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+    'price': Decimal('12.50'),
+    'ratio': 0.1,
+    'label': gettext_lazy('Not found.'),
+    7: 'int key',
+}, serializer=None)
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def assertRendersLikeDrf(self, data, **kwargs):
+        self.assertEqual(FastJSONRenderer().render(data, **kwargs), JSONRenderer().render(data, **kwargs))
+
+    def test_matches_json_renderer(self):
+        self.assertRendersLikeDrf(PAYLOAD)
+        self.assertRendersLikeDrf([PAYLOAD, PAYLOAD])
+        self.assertRendersLikeDrf(None)
+
+    def test_floats(self):
+        floats = [0.1, -0.0, 123456789.125, 1e16, 1.5e-7, 2.5e-300, 1e300]
+        self.assertEqual(json.loads(FastJSONRenderer().render(floats)), json.loads(JSONRenderer().render(floats)))
+
+    @skipIf(renderers.orjson is None, 'orjson is not installed')
+    def test_orjson_floats(self):
+        # Exponents without JSONRenderer's zero padding
+        self.assertEqual(FastJSONRenderer().render([1.5e-7]), b'[1.5e-7]')
+
+        # JSONRenderer refuses NaN and Infinity under STRICT_JSON
+        self.assertEqual(FastJSONRenderer().render([float('nan'), float('inf')]), b'[null,null]')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render([float('nan')])
+
+    def test_indented(self):
+        self.assertRendersLikeDrf(PAYLOAD, accepted_media_type='application/json; indent=4')
+
+    def test_falls_back_for_values_orjson_rejects(self):
+        self.assertRendersLikeDrf({'huge': 2 ** 70})
+
+    def test_without_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertRendersLikeDrf(PAYLOAD)
+
+
+class FastJSONParserTests(SimpleTestCase):
+
+    def parse(self, parser, body, **context):
+        return parser.parse(io.BytesIO(body), parser_context=context)
+
+    def test_matches_json_parser(self):
+        body = '{"description": "Écran 🙁", "emergency": true, "employee": null, "ids": [1, 2.5]}'.encode()
+        self.assertEqual(self.parse(FastJSONParser(), body), self.parse(JSONParser(), body))
+
+        latin1 = '{"address": "Été"}'.encode('latin-1')
+        self.assertEqual(self.parse(FastJSONParser(), latin1, encoding='latin-1'), {'address': 'Été'})
+
+    def test_errors(self):
+        for body in (b'{"description": ', b'{"value": NaN}', b'\xff'):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    self.parse(FastJSONParser(), body)
+
+    def test_without_orjson(self):
+        with mock.patch.object(parsers, 'orjson', None):
+            self.assertEqual(self.parse(FastJSONParser(), b'{"ids": [1, 2]}'), {'ids': [1, 2]})
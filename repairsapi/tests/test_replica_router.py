@@ -0,0 +1,117 @@
+"""Tests for sending read-only actions to a read replica
+
+`replica1` is a second, separately migrated test database standing in for
+a replica. Its rows start out as copies of the fixtures, and then differ
+from the primary's where a test needs to tell which database was read.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIHandler
+from django.test import SimpleTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from repairsapi.authentication import token_cache
+from repairsapi.checks import check_replica_pin_cache
+from repairsapi.models import Customer, ServiceTicket
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+CUSTOMER_TOKEN = '0be249c88238743e5b4a7ac370b5145730c28e20'
+
+
+@override_settings(REPLICA_DATABASES=['replica1'], RESPONSE_CACHE_ALIAS=None)
+class ReplicaRouterTests(APITestCase):
+
+    databases = {'default', 'replica1'}
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        token_cache.clear()
+        caches['default'].clear()
+        Customer.objects.using('replica1').filter(pk=1).update(address='1 Replica Rd.')
+        ServiceTicket.objects.using('replica1').filter(pk=1).update(description='Read from the replica')
+
+    def get(self, url, token=STAFF_TOKEN):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_reads_from_replica(self):
+        self.assertEqual(self.get('/customers/1')['address'], '1 Replica Rd.')
+        self.assertEqual(self.get('/tickets/1')['description'], 'Read from the replica')
+        self.assertIn('Read from the replica', [ticket['description'] for ticket in self.get('/tickets')['results']])
+        self.assertIn('1 Replica Rd.', [customer['address'] for customer in self.get('/customers')['results']])
+
+    def test_writes_go_to_primary(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+        response = self.client.put('/tickets/9', {'employee': 1}, format='json')
+        self.assertEqual(response.status_code, 204)
+
+        self.assertEqual(ServiceTicket.objects.using('default').get(pk=9).employee_id, 1)
+        self.assertIsNone(ServiceTicket.objects.using('replica1').get(pk=9).employee_id)
+
+    def test_authenticates_against_primary(self):
+        # A token too new to have reached the replica
+        user = User.objects.create(username='new@example.com', is_staff=True)
+        token = Token.objects.create(user=user)
+
+        self.assertFalse(Token.objects.using('replica1').filter(key=token.key).exists())
+        self.assertEqual(self.get('/customers/1', token.key)['address'], '1 Replica Rd.')
+
+    def test_reads_own_writes(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        response = self.client.put('/customers/1', {'address': '2 Primary Pl.'}, format='json')
+        self.assertEqual(response.status_code, 204)
+
+        # The writer reads the primary, everyone else the replica
+        self.assertEqual(self.get('/customers/1', CUSTOMER_TOKEN)['address'], '2 Primary Pl.')
+        self.assertEqual(self.get('/customers/1', STAFF_TOKEN)['address'], '1 Replica Rd.')
+
+        # Until the pin runs out
+        caches['default'].clear()
+        self.assertEqual(self.get('/customers/1', CUSTOMER_TOKEN)['address'], '1 Replica Rd.')
+
+    def test_failed_writes_do_not_pin(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+        response = self.client.put('/customers/1', {'address': 'Not theirs'}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+        self.assertEqual(self.get('/customers/1')['address'], '1 Replica Rd.')
+
+    async def test_reads_own_writes_under_asgi(self):
+        # Every middleware runs as a coroutine, none adapted to sync
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+
+        response = await self.async_client.put(
+            '/customers/1', {'address': '2 Primary Pl.'}, content_type='application/json',
+            headers={'Authorization': f'Token {CUSTOMER_TOKEN}'}
+        )
+        self.assertEqual(response.status_code, 204)
+
+        response = await self.async_client.get('/customers/1', headers={'Authorization': f'Token {CUSTOMER_TOKEN}'})
+        self.assertEqual(response.json()['address'], '2 Primary Pl.')
+        response = await self.async_client.get('/customers/1', headers={'Authorization': f'Token {STAFF_TOKEN}'})
+        self.assertEqual(response.json()['address'], '1 Replica Rd.')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_without_replicas(self):
+        self.assertEqual(self.get('/customers/1')['address'], '404 Unknown Way')
+
+
+class ReplicaPinCacheCheckTests(SimpleTestCase):
+
+    @override_settings(REPLICA_DATABASES=['replica1'])
+    def test_per_process_cache(self):
+        self.assertEqual([error.id for error in check_replica_pin_cache(None)], ['repairsapi.E001'])
+
+    @override_settings(
+        REPLICA_DATABASES=['replica1'], REPLICA_PIN_CACHE='pins',
+        CACHES={'pins': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+    )
+    def test_shared_cache(self):
+        self.assertEqual(check_replica_pin_cache(None), [])
+
+    def test_without_replicas(self):
+        self.assertEqual(check_replica_pin_cache(None), [])
@@ -0,0 +1,95 @@
+"""Tests for the versioned response cache"""
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from repairsapi.authentication import token_cache
+from repairsapi.models import Customer, Employee, ServiceTicket
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+OTHER_STAFF_TOKEN = '8b44b69d17de6e7e81bede339e8fd997369f8819'
+CUSTOMER_TOKEN = '0be249c88238743e5b4a7ac370b5145730c28e20'
+OTHER_CUSTOMER_TOKEN = 'ec7ddcc665035a3adeaa80ed8f812bfe3ef5b5f4'
+
+
+@override_settings(RESPONSE_CACHE_ALIAS='responses')
+class ResponseCacheTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        caches['responses'].clear()
+        token_cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+
+    def test_hit_skips_data_query(self):
+        first = self.client.get('/employees')
+
+        # Only the version lookup runs
+        with self.assertNumQueries(1):
+            second = self.client.get('/employees')
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_write_invalidates(self):
+        self.client.get('/employees')
+        employee = Employee.objects.get(pk=1)
+        employee.specialty = 'Toasters'
+        employee.save()
+
+        response = self.client.get('/employees')
+        self.assertEqual(response.json()['results'][0]['specialty'], 'Toasters')
+
+    def test_user_write_invalidates(self):
+        self.client.get('/customers/1')
+        user = Customer.objects.get(pk=1).user
+        user.first_name = 'Bryan'
+        user.save()
+
+        self.assertEqual(self.client.get('/customers/1').json()['full_name'], 'Bryan Tanay')
+
+    def test_bulk_write_invalidates(self):
+        self.client.get('/tickets/9')
+        self.client.put('/tickets/assign', [{'ticket': 9, 'employee': 1}], format='json')
+        self.assertEqual(self.client.get('/tickets/9').json()['employee']['id'], 1)
+
+    def test_customers_get_their_own_entries(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        mine = self.client.get('/tickets').json()['results']
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {OTHER_CUSTOMER_TOKEN}')
+        theirs = self.client.get('/tickets').json()['results']
+
+        self.assertNotEqual(mine, theirs)
+        self.assertTrue(all(ticket['customer']['id'] == 2 for ticket in theirs))
+
+    def test_staff_share_entries(self):
+        self.client.get('/tickets')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {OTHER_STAFF_TOKEN}')
+        self.client.get('/tickets')
+
+        with self.assertNumQueries(1):
+            self.client.get('/tickets')
+
+    def test_streams_are_not_cached(self):
+        self.client.get('/tickets?stream=1')
+        self.assertEqual(ServiceTicket.objects.count(), 9)
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/tickets?stream=1')
+            b''.join(response.streaming_content)
+
+    @override_settings(RESPONSE_CACHE_MAX_ENTRY_BYTES=100)
+    def test_large_responses_are_not_cached(self):
+        self.client.get('/tickets')
+        with self.assertNumQueries(2):
+            self.client.get('/tickets')
+
+    @override_settings(RESPONSE_CACHE_ALIAS=None)
+    def test_can_be_disabled(self):
+        self.client.get('/employees')
+        with self.assertNumQueries(2):
+            self.client.get('/employees')
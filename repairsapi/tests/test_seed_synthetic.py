@@ -0,0 +1,59 @@
+"""Tests for the seed_synthetic management command"""
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from repairsapi.models import Customer, Employee, ServiceTicket, TableVersion, TicketStatistic
+
+
+class SeedSyntheticTests(TestCase):
+
+    def seed(self, **options):
+        call_command('seed_synthetic', customers=20, employees=5, tickets=300, batch_size=64, stdout=StringIO(), **options)
+
+    def snapshot(self):
+        """Everything the seed controls, for comparing two runs"""
+        return (
+            list(User.objects.order_by('id').values_list('username', 'first_name', 'last_name', 'is_staff', 'date_joined')),
+            list(Token.objects.order_by('user_id').values_list('key', flat=True)),
+            list(ServiceTicket.objects.order_by('id').values_list('description', 'emergency', 'date_completed')),
+        )
+
+    def clear(self):
+        User.objects.all().delete()
+        TableVersion.objects.all().delete()
+        TicketStatistic.objects.all().delete()
+
+    def test_counts(self):
+        self.seed(password='secret')
+
+        self.assertEqual(User.objects.count(), 25)
+        self.assertEqual(Customer.objects.count(), 20)
+        self.assertEqual(Employee.objects.count(), 5)
+        self.assertEqual(Token.objects.count(), 25)
+        self.assertEqual(ServiceTicket.objects.count(), 300)
+        self.assertFalse(Customer.objects.filter(user__is_staff=True).exists())
+        self.assertFalse(Employee.objects.filter(user__is_staff=False).exists())
+        self.assertTrue(User.objects.get(username='customer0@example.com').check_password('secret'))
+
+        # Counters and table versions are ready for the API
+        self.assertEqual(TicketStatistic.objects.get(employee=None).total, 300)
+        self.assertTrue(TableVersion.objects.filter(table=ServiceTicket._meta.db_table, version__gt=0).exists())
+
+    def test_reproducible(self):
+        self.seed(seed=7)
+        first = self.snapshot()
+
+        self.clear()
+        self.seed(seed=7)
+        self.assertEqual(self.snapshot(), first)
+
+        self.clear()
+        self.seed(seed=8)
+        self.assertNotEqual(self.snapshot()[1], first[1])
+
+    def test_refuses_existing_data(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
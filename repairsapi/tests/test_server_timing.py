@@ -0,0 +1,88 @@
+"""Tests for ServerTimingMiddleware and the /metrics endpoint"""
+import re
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from repairsapi.metrics import Histogram, request_queries, request_seconds
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+
+SERVER_TIMING = re.compile(
+    r'^db;dur=(?P<db>[\d.]+);desc="(?P<queries>\d+) queries", serialize;dur=[\d.]+, '
+    r'render;dur=[\d.]+, view;dur=(?P<view>[\d.]+), total;dur=(?P<total>[\d.]+)$'
+)
+
+
+@override_settings(RESPONSE_CACHE_ALIAS=None)
+class ServerTimingTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        request_seconds.clear()
+        request_queries.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+
+    def test_header(self):
+        for url in ('/tickets', '/tickets/1', '/async/tickets', '/customers'):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+
+                timing = SERVER_TIMING.match(response['Server-Timing'])
+                self.assertIsNotNone(timing, response['Server-Timing'])
+                self.assertEqual(int(timing['queries']), len(queries))
+                self.assertLessEqual(float(timing['db']), float(timing['view']))
+                self.assertLessEqual(float(timing['view']), float(timing['total']))
+
+    def test_metrics(self):
+        self.client.get('/tickets')
+        self.client.get('/tickets')
+        self.client.get('/async/tickets/1')
+        self.client.get('/nowhere')
+
+        # Scrapers send the metrics token rather than an API token
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer scrape-me')
+        with self.settings(METRICS_TOKEN='scrape-me'):
+            response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+        body = response.content.decode()
+        self.assertIn('honeyrae_request_duration_seconds_count{route="ticket-list",method="GET",phase="total"} 2', body)
+        self.assertIn('honeyrae_request_duration_seconds_count{route="async/tickets/<int:pk>",method="GET",phase="db"} 1', body)
+        self.assertIn('honeyrae_request_queries_count{route="unmatched",method="GET"} 1', body)
+        self.assertIn('# TYPE honeyrae_token_cache_hits_total counter', body)
+        self.assertIn('honeyrae_request_duration_seconds_count{route="ticket-list",method="GET",phase="view"} 2', body)
+
+    def test_metrics_require_the_metrics_token(self):
+        with self.settings(METRICS_TOKEN='scrape-me'):
+            for authorization in (None, 'Bearer wrong', f'Token {STAFF_TOKEN}', 'scrape-me'):
+                with self.subTest(authorization=authorization):
+                    self.client.credentials(**({'HTTP_AUTHORIZATION': authorization} if authorization else {}))
+                    self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+        # Refused to everyone until a token is configured
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ')
+        with self.settings(METRICS_TOKEN=None):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+
+class HistogramTests(SimpleTestCase):
+
+    def test_exposition(self):
+        histogram = Histogram('test_seconds', 'Test.', ('route',), (0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(('say "hi"\\',), value)
+
+        self.assertEqual(histogram.exposition(), [
+            '# HELP test_seconds Test.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{route="say \\"hi\\"\\\\",le="0.1"} 1',
+            'test_seconds_bucket{route="say \\"hi\\"\\\\",le="1"} 2',
+            'test_seconds_bucket{route="say \\"hi\\"\\\\",le="+Inf"} 3',
+            'test_seconds_sum{route="say \\"hi\\"\\\\"} 5.55',
+            'test_seconds_count{route="say \\"hi\\"\\\\"} 3',
+        ])
@@ -0,0 +1,77 @@
+"""Tests for the production SQLite backend"""
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+from repairsapi.db.sqlite3.base import DatabaseWrapper
+
+
+class SqliteBackendTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.path = str(Path(directory.name) / 'test.sqlite3')
+
+        # Another process holding the database, which never waits for locks
+        self.other = sqlite3.connect(self.path, timeout=0, isolation_level=None, check_same_thread=False)
+        self.other.execute('CREATE TABLE item (name TEXT)')
+        self.addCleanup(self.other.close)
+
+    def connect(self, **options):
+        """A connection through the backend, configured like settings.DATABASES"""
+        settings_dict = ConnectionHandler({
+            'default': {'ENGINE': 'repairsapi.db.sqlite3', 'NAME': self.path, 'OPTIONS': options}
+        }).settings['default']
+
+        # Under an alias of its own, which SimpleTestCase doesn't guard
+        connection = DatabaseWrapper(settings_dict, alias='scratch')
+        self.addCleanup(connection.close)
+        return connection
+
+    def test_pragmas(self):
+        with self.connect().cursor() as cursor:
+            for pragma, value in (('journal_mode', 'wal'), ('synchronous', 1), ('busy_timeout', 5000)):
+                cursor.execute(f'PRAGMA {pragma}')
+                self.assertEqual(cursor.fetchone()[0], value)
+
+        with self.connect(pragmas={'busy_timeout': 250}).cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 250)
+
+    def test_atomic_blocks_take_the_write_lock(self):
+        connection = self.connect()
+        connection.ensure_connection()
+        connection._start_transaction_under_autocommit()  # pylint: disable=protected-access
+
+        with self.assertRaisesRegex(sqlite3.OperationalError, 'locked'):
+            self.other.execute('BEGIN IMMEDIATE')
+
+        connection.connection.rollback()
+
+    def test_retries_while_locked(self):
+        connection = self.connect(pragmas={'busy_timeout': 0}, lock_retries=8, lock_backoff=0.01)
+        connection.ensure_connection()
+
+        self.other.execute('BEGIN IMMEDIATE')
+        self.other.execute("INSERT INTO item VALUES ('first')")
+        threading.Timer(0.1, self.other.commit).start()
+
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO item VALUES ('second')")
+            cursor.execute('SELECT name FROM item ORDER BY rowid')
+            self.assertEqual(cursor.fetchall(), [('first',), ('second',)])
+
+    def test_gives_up_after_retries(self):
+        connection = self.connect(pragmas={'busy_timeout': 0}, lock_retries=2, lock_backoff=0.01)
+        connection.ensure_connection()
+
+        self.other.execute('BEGIN IMMEDIATE')
+        self.addCleanup(self.other.rollback)
+
+        with self.assertRaisesRegex(OperationalError, 'locked'):
+            with connection.cursor() as cursor:
+                cursor.execute("INSERT INTO item VALUES ('never')")
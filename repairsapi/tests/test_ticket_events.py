@@ -0,0 +1,242 @@
+"""Tests for the ticket event table and the /tickets/events feed"""
+import asyncio
+import contextlib
+import io
+import json
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from rest_framework.test import APITestCase
+from repairsapi.events import encode, follow, publish_event, publish_ticket_events, resume_after
+from repairsapi.models import ServiceTicket, TicketEvent
+from repairsapi.views import TicketEventView
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+CUSTOMER_TOKEN = '0be249c88238743e5b4a7ac370b5145730c28e20'
+
+
+def ticket(pk, customer=1):
+    return {'id': pk, 'emergency': False, 'date_completed': None, 'employee': None, 'customer': customer}
+
+
+def columns(pk, customer=1):
+    '''The `values()` dict of a ticket that publishes as `ticket(pk, customer)`'''
+    return {'id': pk, 'emergency': False, 'date_completed': None, 'employee_id': None, 'customer_id': customer}
+
+
+publish = sync_to_async(publish_ticket_events)
+
+
+async def take(events, count):
+    '''The next `count` items from `follow()`, or fail'''
+    return [await asyncio.wait_for(anext(events), 1) for _ in range(count)]
+
+
+class TicketEventTests(TestCase):
+
+    async def test_follow_sends_visible_events_in_order(self):
+        await publish('created', [columns(1), columns(2, customer=2)])
+        await publish('updated', [columns(1)])
+
+        await publish('updated', [columns(2, customer=2)])
+        await publish('deleted', [columns(3)])
+
+        # Other customers' tickets are left out, and events with none of
+        # the customer's skipped
+        events = await take(follow(0, 1, 0.01, 1), 3)
+        self.assertEqual([(event.kind, event.data) for event in events], [
+            ('created', {'tickets': [ticket(1)]}),
+            ('updated', {'tickets': [ticket(1)]}),
+            ('deleted', {'tickets': [ticket(3)]}),
+        ])
+        self.assertEqual(encode(events[1]), (
+            f'id: {events[1].id}\nevent: updated\n'
+            'data: {"tickets":[{"id":1,"emergency":false,"date_completed":null,"employee":null,"customer":1}]}\n\n'
+        ).encode())
+
+    async def test_follow_waits_for_new_events(self):
+        events = follow(0, None, 0.01, 0.01)
+        self.assertEqual(await take(events, 1), [None])
+
+        await publish('created', [columns(1)])
+        event = next(event for event in await take(events, 2) if event is not None)
+        self.assertEqual(event.data, {'tickets': [ticket(1)]})
+
+    async def test_resume_after(self):
+        self.assertEqual(await resume_after(None), (0, True))
+
+        for pk in (1, 2, 3):
+            await publish('created', [columns(pk)])
+        first, second, last = [event.id async for event in TicketEvent.objects.order_by('id')]
+        self.assertEqual(await resume_after(None), (last, True))
+        self.assertEqual(await resume_after(str(first)), (first, True))
+
+        for last_event_id in (str(last + 1), 'junk', '1-2'):
+            with self.subTest(last_event_id=last_event_id):
+                self.assertEqual(await resume_after(last_event_id), (last, False))
+
+        # With only the last two kept, resuming from the first still misses
+        # nothing, but from before it does
+        with self.settings(TICKET_EVENTS_HISTORY=2):
+            await sync_to_async(call_command)('prune_ticket_events', stdout=io.StringIO())
+        self.assertEqual(await resume_after(str(first)), (first, True))
+        self.assertEqual(await resume_after(str(first - 1)), (last, False))
+        self.assertEqual(await resume_after(str(second)), (second, True))
+
+    def test_prune(self):
+        for pk in range(1, 6):
+            publish_ticket_events('created', [columns(pk)])
+        out = io.StringIO()
+        with self.settings(TICKET_EVENTS_HISTORY=2):
+            call_command('prune_ticket_events', stdout=out)
+        self.assertEqual(out.getvalue(), 'Pruned ticket events, 3 row(s) deleted\n')
+        self.assertEqual([event.data['tickets'][0]['id'] for event in TicketEvent.objects.order_by('id')], [4, 5])
+
+
+class TicketEventViewTests(TestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    @contextlib.asynccontextmanager
+    async def connect(self, *args, **kwargs):
+        response = await self.async_client.get('/tickets/events', *args, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        try:
+            yield response.streaming_content
+        finally:
+            await response.streaming_content.aclose()
+
+    async def read(self, stream, count=1):
+        return [await asyncio.wait_for(anext(stream), 1) for _ in range(count)]
+
+    def setUp(self):
+        patcher = mock.patch.object(TicketEventView, 'poll', 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_staff_see_every_ticket(self):
+        async with self.connect(headers={'Authorization': f'Token {STAFF_TOKEN}'}) as stream:
+            self.assertEqual(await self.read(stream), [b'retry: 3000\n\n'])
+
+            await publish('created', [columns(1, customer=2)])
+            frame = (await self.read(stream))[0].decode()
+
+        self.assertIn('event: created\n', frame)
+        self.assertEqual(json.loads(frame.split('data: ')[1]), {'tickets': [ticket(1, customer=2)]})
+
+    async def test_customers_see_their_own_tickets(self):
+        async with self.connect({'token': CUSTOMER_TOKEN}) as stream:
+            await self.read(stream)
+
+            await publish('updated', [columns(1, customer=2), columns(2, customer=1)])
+            frame = (await self.read(stream))[0].decode()
+
+        self.assertEqual(json.loads(frame.split('data: ')[1]), {'tickets': [ticket(2)]})
+
+    async def test_resume_and_reset(self):
+        await publish('created', [columns(1)])
+        await publish('created', [columns(2)])
+        first, last = [event.id async for event in TicketEvent.objects.order_by('id')]
+
+        async with self.connect(headers={'Authorization': f'Token {STAFF_TOKEN}', 'Last-Event-ID': str(first)}) as stream:
+            frames = await self.read(stream, 2)
+        self.assertIn(f'id: {last}\n', frames[1].decode())
+
+        async with self.connect(headers={'Authorization': f'Token {STAFF_TOKEN}', 'Last-Event-ID': 'stale-1'}) as stream:
+            frames = await self.read(stream, 2)
+        self.assertEqual(frames[1], f'id: {last}\nevent: reset\ndata: {{}}\n\n'.encode())
+
+    async def test_heartbeat(self):
+        TicketEventView.heartbeat = 0.01
+        self.addCleanup(setattr, TicketEventView, 'heartbeat', 15)
+
+        async with self.connect(headers={'Authorization': f'Token {STAFF_TOKEN}'}) as stream:
+            self.assertEqual(await self.read(stream, 2), [b'retry: 3000\n\n', b': keepalive\n\n'])
+
+    async def test_customer_delete_is_one_event(self):
+        def delete_customer():
+            response = self.client.delete('/customers/3', HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+            self.assertEqual(response.status_code, 204)
+
+        async with self.connect(headers={'Authorization': f'Token {STAFF_TOKEN}'}) as stream:
+            await self.read(stream)
+
+            await sync_to_async(delete_customer)()
+            frame = (await self.read(stream))[0].decode()
+            self.assertEqual(await TicketEvent.objects.acount(), 1)
+
+        self.assertIn('event: customer_deleted\ndata: {"customer":3}\n', frame)
+
+    async def test_requires_token(self):
+        response = await self.async_client.get('/tickets/events', {'token': 'nope'})
+        self.assertEqual(response.status_code, 401)
+
+
+class TicketWritesPublishTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+
+    def published(self, method, url, data=None):
+        '''Send a request and return the (kind, data) of the events it published'''
+        last = TicketEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 300, response.content)
+        return list(TicketEvent.objects.filter(id__gt=last).order_by('id').values_list('kind', 'data'))
+
+    def test_ticket_endpoints(self):
+        self.assertEqual(self.published('put', '/tickets/9', {'employee': 2}), [
+            ('updated', {'tickets': [{**ticket(9, customer=ServiceTicket.objects.get(pk=9).customer_id), 'employee': 2}]}),
+        ])
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        events = self.published('post', '/tickets', {'description': 'Fan noise', 'emergency': True})
+        self.assertEqual(events, [
+            ('created', {'tickets': [{**ticket(ServiceTicket.objects.latest('id').id), 'emergency': True}]}),
+        ])
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+        self.assertEqual([kind for kind, data in self.published('delete', '/tickets/9')], ['deleted'])
+
+    def test_bulk_endpoints_publish_one_event(self):
+        events = self.published('put', '/tickets/assign', [
+            {'ticket': 4, 'employee': 1}, {'ticket': 5, 'employee': 3}, {'ticket': 7, 'employee': 3},
+        ])
+        self.assertEqual([kind for kind, data in events], ['updated'])
+        self.assertEqual([(data['id'], data['employee']) for data in events[0][1]['tickets']], [(4, 1), (5, 3), (7, 3)])
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        events = self.published('post', '/tickets/bulk', [{'description': 'A'}, {'description': 'B'}, {'description': 'C'}])
+        self.assertEqual([kind for kind, data in events], ['created'])
+        self.assertEqual(len(events[0][1]['tickets']), 3)
+
+    def test_dispatch_and_customer_delete(self):
+        for description in ('Laptop fan', 'Router drops', 'Printer jam'):
+            ServiceTicket.objects.create(customer_id=2, description=description)
+        unclaimed = list(ServiceTicket.objects.filter(employee=None, date_completed=None).values_list('id', flat=True))
+        events = self.published('post', '/tickets/dispatch')
+
+        # One event however many tickets were assigned
+        self.assertEqual([kind for kind, data in events], ['updated'])
+        self.assertEqual(sorted(data['id'] for data in events[0][1]['tickets']), sorted(unclaimed))
+        self.assertTrue(all(data['employee'] for data in events[0][1]['tickets']))
+
+        self.assertEqual(self.published('delete', '/customers/3'), [('customer_deleted', {'customer': 3})])
+
+    def test_rolled_back_writes_publish_nothing(self):
+        with transaction.atomic():
+            self.client.put('/tickets/9', {'employee': 2}, format='json')
+            self.assertEqual(TicketEvent.objects.count(), 1)
+            transaction.set_rollback(True)
+        self.assertFalse(TicketEvent.objects.exists())
+
+    def test_publish_event(self):
+        publish_event('customer_deleted', {'customer': 3})
+        self.assertEqual(list(TicketEvent.objects.values_list('kind', 'data')), [('customer_deleted', {'customer': 3})])
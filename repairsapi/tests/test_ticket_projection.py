@@ -0,0 +1,32 @@
+"""Tests for the flat ticket projection behind the read endpoints"""
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from repairsapi.models import Customer, Employee, ServiceTicket
+from repairsapi.views.ticket_view import ServiceTicketSerializer, ticket_row_data, ticket_rows
+
+
+class TicketProjectionTests(TestCase):
+    """`ticket_row_data(ticket_rows(...))` must render to exactly the bytes
+    ServiceTicketSerializer does"""
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def assertSameJson(self, tickets):
+        expected = ServiceTicketSerializer(tickets.select_related('customer__user', 'employee__user'), many=True).data
+        projected = [ticket_row_data(row) for row in ticket_rows(tickets)]
+        self.assertEqual(JSONRenderer().render(projected), JSONRenderer().render(expected))
+
+    def test_fixture_tickets(self):
+        self.assertSameJson(ServiceTicket.objects.order_by('id'))
+
+    def test_unusual_values(self):
+        customer = Customer.objects.create(
+            user=User.objects.create(username='zoë@example.com', first_name='Zoë', last_name=''),
+            address='1 Rue Été'
+        )
+        employee = Employee.objects.create(user=User.objects.create(username='nameless@example.com'), specialty='')
+        ServiceTicket.objects.create(customer=customer, description='Écran "fissuré" \\ 🙁', emergency=True)
+        ServiceTicket.objects.create(customer=customer, employee=employee, description='', date_completed='2022-12-31')
+
+        self.assertSameJson(ServiceTicket.objects.filter(customer=customer).order_by('id'))
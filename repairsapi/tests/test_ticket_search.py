@@ -0,0 +1,90 @@
+"""Tests for full-text search of tickets with `?q=`"""
+from django.db import connection
+from rest_framework.test import APITestCase
+from repairsapi.models import Customer, ServiceTicket, TicketSearch
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+CUSTOMER_TOKEN = '0be249c88238743e5b4a7ac370b5145730c28e20'
+
+
+class TicketSearchTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+        self.customer = Customer.objects.get(pk=1)
+
+    def search(self, query):
+        response = self.client.get('/tickets', {'q': query, 'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        return [ticket['id'] for ticket in response.data['results']]
+
+    def create(self, description, **fields):
+        return ServiceTicket.objects.create(customer=self.customer, description=description, emergency=False, **fields).id
+
+    def test_matches_every_word_and_prefixes(self):
+        cracked = self.create('Zyxphone screen cracked after a fall')
+        battery = self.create('Zyxphone battery drains overnight')
+
+        self.assertEqual(sorted(self.search('zyxphone')), [cracked, battery])
+        self.assertEqual(self.search('zyxphone batt'), [battery])
+        self.assertEqual(self.search('ZYXPHONE, "screen"!'), [cracked])
+        self.assertEqual(self.search('zyxphone keyboard'), [])
+        self.assertEqual(self.search('  !! '), [])
+
+    def test_most_relevant_first(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Results are only ranked by the SQLite FTS5 index')
+
+        once = self.create('Qwerty laptop hinge is loose and the lid wobbles when typing on the qwerty keys')
+        twice = self.create('Qwerty qwerty qwerty')
+        self.assertEqual(self.search('qwerty'), [twice, once])
+
+    def test_combines_with_status(self):
+        done = self.create('Plinko router reboots', date_completed='2022-05-01')
+        self.create('Plinko router overheats')
+
+        response = self.client.get('/tickets', {'q': 'plinko', 'status': 'done'})
+        self.assertEqual([ticket['id'] for ticket in response.data['results']], [done])
+
+    def test_customers_only_search_their_own_tickets(self):
+        own = self.create('Gizmo will not charge')
+        ServiceTicket.objects.create(customer_id=2, description='Gizmo will not charge either', emergency=False)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        self.assertEqual(self.search('gizmo'), [own])
+
+    def test_pages_through_ranked_results(self):
+        ids = {self.create('Fizzbin ' * (i % 4 + 1) + f'ticket {i}') for i in range(25)}
+
+        seen = []
+        url = '/tickets?q=fizzbin&page_size=4'
+        while url is not None:
+            response = self.client.get(url)
+            seen.extend(ticket['id'] for ticket in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(len(seen), len(ids))
+        self.assertEqual(set(seen), ids)
+
+    def test_index_follows_writes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('The FTS5 index only exists on SQLite')
+
+        ticket = ServiceTicket.objects.get(pk=self.create('Wobbly monitor stand'))
+        self.assertEqual(self.search('wobbly'), [ticket.id])
+
+        ticket.description = 'Flickering monitor'
+        ticket.save()
+        self.assertEqual(self.search('wobbly'), [])
+        self.assertEqual(self.search('flickering'), [ticket.id])
+
+        ticket.delete()
+        self.assertEqual(self.search('flickering'), [])
+
+        # The index holds exactly the current tickets
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO repairsapi_serviceticket_fts (repairsapi_serviceticket_fts, rank) VALUES ('integrity-check', 1)")
+        self.assertEqual(TicketSearch.objects.filter(description__match='monitor').count(), 0)
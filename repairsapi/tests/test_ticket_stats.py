@@ -0,0 +1,141 @@
+"""Tests for the incrementally maintained ticket counters"""
+from datetime import date
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from repairsapi.models import Customer, Employee, ServiceTicket, TicketStatistic
+from repairsapi.stats import reconcile_ticket_stats
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+CUSTOMER_TOKEN = '0be249c88238743e5b4a7ac370b5145730c28e20'
+
+
+class TicketStatsTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        # Fixtures are loaded after the migration that seeds the counters
+        reconcile_ticket_stats()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+
+    def listed_count(self, ticket_status):
+        response = self.client.get(f'/tickets?status={ticket_status}&page_size=1000')
+        return len(response.data['results'])
+
+    def assertInSync(self):
+        self.assertEqual(reconcile_ticket_stats(), 0)
+
+    def test_counts_match_list_filters(self):
+        response = self.client.get('/tickets/stats')
+        self.assertEqual(response.status_code, 200)
+
+        for ticket_status in ('done', 'unclaimed', 'inprogress'):
+            self.assertEqual(response.data[ticket_status], self.listed_count(ticket_status))
+        self.assertEqual(response.data['total'], self.listed_count('all'))
+        self.assertEqual(response.data['emergency'], 2)
+
+    def test_status_buckets(self):
+        customer = Customer.objects.first()
+        employee = Employee.objects.first()
+        ServiceTicket.objects.all().delete()
+        TicketStatistic.objects.all().delete()
+        ServiceTicket.objects.bulk_create([
+            # Unclaimed: nobody is assigned, whether or not it was completed
+            ServiceTicket(customer=customer, description='New'),
+            ServiceTicket(customer=customer, description='Closed unassigned', date_completed=date(2022, 1, 1)),
+            # In progress: assigned and still open
+            ServiceTicket(customer=customer, employee=employee, description='Working', emergency=True),
+            # Done: assigned and completed
+            ServiceTicket(customer=customer, employee=employee, description='Fixed', date_completed=date(2022, 1, 2)),
+        ])
+        reconcile_ticket_stats()
+
+        response = self.client.get('/tickets/stats')
+        expected = {'total': 4, 'done': 2, 'unclaimed': 2, 'inprogress': 1, 'emergency': 1}
+        self.assertEqual({counter: response.data[counter] for counter in expected}, expected)
+        self.assertEqual(response.data['employees'], [{
+            'id': employee.id, 'full_name': employee.full_name,
+            'total': 2, 'done': 1, 'unclaimed': 0, 'inprogress': 1, 'emergency': 1,
+        }])
+
+        descriptions = {
+            ticket_status: sorted(ticket['description'] for ticket in self.client.get(
+                f'/tickets?status={ticket_status}&page_size=1000'
+            ).data['results'])
+            for ticket_status in ('done', 'unclaimed', 'inprogress')
+        }
+        self.assertEqual(descriptions, {
+            'done': ['Closed unassigned', 'Fixed'],
+            'unclaimed': ['Closed unassigned', 'New'],
+            'inprogress': ['Working'],
+        })
+
+    def test_per_employee_counts(self):
+        response = self.client.get('/tickets/stats')
+        employees = {row['id']: row for row in response.data['employees']}
+
+        self.assertEqual(employees[2], {
+            'id': 2, 'full_name': 'Emily Lemmon', 'total': 5, 'done': 3,
+            'unclaimed': 0, 'inprogress': 2, 'emergency': 1
+        })
+
+    def test_single_query(self):
+        self.client.get('/tickets/stats')
+        with self.assertNumQueries(1):
+            self.client.get('/tickets/stats')
+
+    def test_staff_only(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        self.assertEqual(self.client.get('/tickets/stats').status_code, 403)
+
+    def test_create_update_destroy_keep_counts(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        response = self.client.post('/tickets', {'description': 'Broken', 'emergency': True}, format='json')
+        ticket_id = response.data['id']
+        self.assertInSync()
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+        self.client.put(f'/tickets/{ticket_id}', {'employee': 1}, format='json')
+        self.assertInSync()
+        self.client.put(f'/tickets/{ticket_id}', {'employee': 3}, format='json')
+        self.assertInSync()
+        self.client.put('/tickets/2', {'employee': 1}, format='json')
+        self.assertInSync()
+
+        self.client.delete(f'/tickets/{ticket_id}')
+        self.assertInSync()
+
+        response = self.client.get('/tickets/stats')
+        self.assertEqual(response.data['total'], 9)
+
+    def test_first_ticket_for_employee_creates_row(self):
+        TicketStatistic.objects.filter(employee_id=1).delete()
+        self.client.put('/tickets/9', {'employee': 1}, format='json')
+
+        row = TicketStatistic.objects.get(employee_id=1)
+        self.assertEqual(row.total, 1)
+
+    def test_changes_for_new_and_existing_rows(self):
+        # Counters for three employees, one of whom has no row yet
+        employee = Employee.objects.create(user=User.objects.create(username='new@example.com'), specialty='Laptops')
+        self.client.put('/tickets/assign', [
+            {'ticket': 9, 'employee': 1}, {'ticket': 1, 'employee': employee.id}, {'ticket': 2, 'employee': 2},
+        ], format='json')
+
+        self.assertEqual(TicketStatistic.objects.get(employee=employee).total, 1)
+        self.assertInSync()
+
+    def test_reconcile_corrects_drift(self):
+        TicketStatistic.objects.filter(employee__isnull=True).update(total=100)
+        TicketStatistic.objects.filter(employee_id=3).delete()
+
+        out = StringIO()
+        call_command('reconcile_ticket_stats', stdout=out)
+        self.assertIn('2 row(s) corrected', out.getvalue())
+
+        response = self.client.get('/tickets/stats')
+        self.assertEqual(response.data['total'], 9)
+        self.assertIn(3, [row['id'] for row in response.data['employees']])
@@ -0,0 +1,80 @@
+"""Tests for the streamed ticket export"""
+import json
+from django.http import StreamingHttpResponse
+from rest_framework.test import APITestCase
+from repairsapi.views.ticket_view import ServiceTicketView
+
+
+STAFF_TOKEN = 'd74b97fbe905134520bb236b0016703f50380dcf'
+CUSTOMER_TOKEN = '0be249c88238743e5b4a7ac370b5145730c28e20'
+
+
+class TicketStreamTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'customers', 'employees', 'tickets']
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {STAFF_TOKEN}')
+        self.chunk_size = ServiceTicketView.stream_chunk_size
+        ServiceTicketView.stream_chunk_size = 4
+
+    def tearDown(self):
+        ServiceTicketView.stream_chunk_size = self.chunk_size
+
+    def test_json_array_matches_list(self):
+        listed = self.client.get('/tickets?page_size=100').json()['results']
+
+        response = self.client.get('/tickets?stream=1')
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertFalse(response.is_async)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), listed)
+
+    async def test_async_iterator_under_asgi(self):
+        listed = (await self.async_client.get(
+            '/tickets?page_size=100', headers={'Authorization': f'Token {STAFF_TOKEN}'}
+        )).json()['results']
+
+        for stream, parse in (('1', json.loads), ('ndjson', lambda body: [json.loads(line) for line in body.splitlines()])):
+            with self.subTest(stream=stream):
+                response = await self.async_client.get(
+                    '/tickets', {'stream': stream}, headers={'Authorization': f'Token {STAFF_TOKEN}'}
+                )
+                self.assertTrue(response.is_async)
+
+                # A chunk per stream_chunk_size rows, rather than one body
+                chunks = [chunk async for chunk in response.streaming_content]
+                self.assertGreaterEqual(len(chunks), len(listed) // ServiceTicketView.stream_chunk_size)
+                self.assertEqual(parse(b''.join(chunks)), listed)
+
+    def test_ndjson(self):
+        listed = self.client.get('/tickets?page_size=100').json()['results']
+
+        response = self.client.get('/tickets?stream=ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], listed)
+
+    def test_respects_filters(self):
+        response = self.client.get('/tickets?stream=1&status=done')
+        tickets = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([t['id'] for t in tickets], [2, 3, 6, 8])
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {CUSTOMER_TOKEN}')
+        response = self.client.get('/tickets?stream=1')
+        tickets = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([t['id'] for t in tickets], [2, 5, 8])
+
+    def test_empty_result(self):
+        response = self.client.get('/tickets?stream=1&status=bogus')
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), [])
+
+        response = self.client.get('/tickets?stream=ndjson&status=bogus')
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+    def test_falsy_values_send_a_page(self):
+        for value in ('0', 'false', 'no', ''):
+            with self.subTest(stream=value):
+                response = self.client.get('/tickets', {'stream': value})
+                self.assertNotIsInstance(response, StreamingHttpResponse)
+                self.assertIn('results', response.json())
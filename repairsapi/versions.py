@@ -0,0 +1,77 @@
+"""Per-table version counters and conditional GET support
+
+Writes to a model bump its TableVersion row: saves and deletes through the
+signal receivers in repairsapi.signals, and set-based writes (bulk_create,
+queryset update/delete) by calling `bump_versions()` themselves. A response
+built from some tables can then be identified by their versions alone,
+without rendering or hashing its body.
+"""
+import hashlib
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from repairsapi.models import TableVersion
+
+
+def bump_versions(*models):
+    """Record that rows of each model's table were written"""
+    for model in models:
+        versions = TableVersion.objects.filter(table=model._meta.db_table)
+        if versions.update(version=F('version') + 1):
+            continue
+
+        try:
+            with transaction.atomic():
+                TableVersion.objects.create(table=model._meta.db_table, version=1)
+        except IntegrityError:
+            versions.update(version=F('version') + 1)
+
+
+def get_versions(*models):
+    """Current version of each model's table, in the order given"""
+    tables = [model._meta.db_table for model in models]
+    versions = dict(TableVersion.objects.filter(table__in=tables).values_list('table', 'version'))
+    return tuple(versions.get(table, 0) for table in tables)
+
+
+def user_scope(request):
+    """Identify the set of rows a user may see
+
+    Staff all see the same data, while each customer only sees their own.
+    """
+    if request.user.is_staff:
+        return 'staff'
+    return f'user:{request.user.pk}'
+
+
+def versioned_key(request, models):
+    """A key that changes whenever the response to `request` could change
+
+    Combines the requested URL, negotiated format and user scope with the
+    versions of every table the response is built from.
+    """
+    versions = getattr(request, '_table_versions', None)
+    if versions is None:
+        # Cached on the request so several layers can share one query
+        versions = request._table_versions = get_versions(*models)
+
+    parts = (
+        request.get_full_path(),
+        request.accepted_renderer.format,
+        user_scope(request),
+        ','.join(str(version) for version in versions),
+    )
+    return hashlib.md5('|'.join(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def conditional_on(*models):
+    """Decorate a ViewSet action with an ETag built from table versions
+
+    A request whose If-None-Match matches gets a 304 without the action
+    running at all.
+    """
+    def etag(request, *args, **kwargs):
+        return versioned_key(request, models)
+
+    return method_decorator(condition(etag_func=etag))
@@ -1,4 +1,7 @@
 from .auth import login_user, register_user
+from .async_auth import async_login_user, async_register_user
+from .async_views import AsyncCustomerView, AsyncEmployeeView, AsyncServiceTicketView, TicketEventView
 from .customer_view import CustomerView
 from .employee_view import EmployeeView
+from .metrics_view import metrics
 from .ticket_view import ServiceTicketView
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""Async login and registration views
+
+These mirror `login_user` and `register_user`, but run the password hash
+in `repairsapi.hashing.hashing_pool` instead of on the request thread.
+Served through honeyrae/asgi.py, a burst of logins only occupies pool
+processes while the event loop keeps answering other requests.
+"""
+import json
+from asgiref.sync import sync_to_async
+from django.contrib.auth import hashers
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from repairsapi.hashing import PoolBusy, hashing_pool
+from repairsapi.accounts import DUPLICATE_EMAIL, create_account, registration_error
+
+
+def parse_body(request):
+    '''Returns the JSON or form encoded body of the request as a dict'''
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST.dict()
+
+
+def pool_busy_response():
+    '''Response for when the hashing pool queue is full'''
+    response = JsonResponse(
+        {'message': 'Too many logins in progress, try again shortly'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+    response['Retry-After'] = '1'
+    return response
+
+
+@csrf_exempt
+@require_POST
+async def async_login_user(request):
+    '''Handles the authentication of a user without blocking the event loop
+
+    Method arguments:
+      request -- The full HTTP request object
+    '''
+    data = parse_body(request)
+    if data is None or 'email' not in data or 'password' not in data:
+        return JsonResponse({'message': 'You must provide email and password'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        try:
+            user = await User.objects.aget(username=data['email'])
+        except User.DoesNotExist:
+            # Hash anyway so unknown emails take as long as wrong passwords,
+            # the same defence ModelBackend.authenticate() uses
+            await hashing_pool.make_password(data['password'])
+            return JsonResponse({'valid': False})
+
+        valid = await hashing_pool.check_password(data['password'], user.password)
+
+        # Re-hash passwords stored with an outdated hasher or iteration
+        # count, as check_password's setter does for authenticate()
+        if valid and hashers.identify_hasher(user.password).must_update(user.password):
+            user.password = await hashing_pool.make_password(data['password'])
+            await User.objects.filter(pk=user.pk).aupdate(password=user.password)
+    except PoolBusy:
+        return pool_busy_response()
+
+    if not valid or not user.is_active:
+        return JsonResponse({'valid': False})
+
+    token = await Token.objects.aget(user=user)
+    return JsonResponse({
+        'valid': True,
+        'token': token.key,
+        'staff': user.is_staff
+    })
+
+
+@csrf_exempt
+@require_POST
+async def async_register_user(request):
+    '''Handles the creation of a new user without blocking the event loop
+
+    Method arguments:
+      request -- The full HTTP request object
+    '''
+    data = parse_body(request)
+    if data is None:
+        data = {}
+
+    message = registration_error(data)
+    if message is not None:
+        return JsonResponse({'message': message}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        password = await hashing_pool.make_password(data['password'])
+    except PoolBusy:
+        return pool_busy_response()
+
+    try:
+        token = await sync_to_async(create_account)(data, password)
+    except IntegrityError:
+        return JsonResponse(
+            {'message': DUPLICATE_EMAIL},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return JsonResponse({'token': token.key, 'staff': token.user.is_staff})
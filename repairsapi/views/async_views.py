@@ -0,0 +1,299 @@
+"""Async views for tickets, customers and employees
+
+These serve the same data as the ViewSets under the `async/` prefix, but
+are coroutines from end to end: the token is checked with the async ORM
+(or the token cache), and rows are read with `aget()` and `async for`.
+Under honeyrae/asgi.py a request waiting on the database no longer ties
+up a worker thread, so one process can hold many more polling clients.
+
+Writes that have to happen together with a counter or version update run
+in one transaction through `sync_to_async`, since Django transactions are
+bound to a single thread.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from repairsapi.authentication import CachedTokenAuthentication, QueryTokenAuthentication
+from repairsapi.deletion import delete_customer
+from repairsapi.events import encode, follow, publish_ticket_events, resume_after
+from repairsapi.parsers import FastJSONParser
+from repairsapi.renderers import encode_json
+from repairsapi.models import Customer, Employee, ServiceTicket
+from repairsapi.stats import record_ticket_change, snapshot
+from .customer_view import CustomerSerializer
+from .employee_view import EmployeeSerializer
+from .ticket_view import (
+    ServiceTicketSerializer, filter_tickets, ticket_fieldset, ticket_list_rows, ticket_row_data, ticket_rows
+)
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    '''Render `data` as JSON the same way the ViewSets' responses are'''
+    if data is None:
+        return HttpResponse(status=status_code)
+    # JsonResponse would serialize it again with the stdlib encoder
+    return HttpResponse(encode_json(data), content_type='application/json', status=status_code)  # pylint: disable=http-response-with-content-type-json
+
+
+class AsyncView(View):
+    """Base class for the async views
+
+    Wraps the request in a DRF Request so handlers get `request.data`,
+    `request.query_params` and `request.auth` just like a ViewSet action,
+    and turns authentication failures and missing rows into 401 and 404.
+    """
+
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+    authentication = CachedTokenAuthentication()
+
+    async def dispatch(self, request, *args, **kwargs):  # pylint: disable=invalid-overridden-method
+        request = Request(request, parsers=[FastJSONParser()])
+
+        try:
+            credentials = await self.authentication.aauthenticate(request)
+        except exceptions.AuthenticationFailed as ex:
+            return self.unauthorized(ex.detail)
+
+        if credentials is None:
+            return self.unauthorized(exceptions.NotAuthenticated.default_detail)
+        request.user, request.auth = credentials
+
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or handler is None:
+            return await self.http_method_not_allowed(request, *args, **kwargs)
+
+        try:
+            return await handler(request, *args, **kwargs)
+        except ObjectDoesNotExist:
+            return render({'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND)
+        except exceptions.ParseError as ex:
+            return render({'detail': ex.detail}, status.HTTP_400_BAD_REQUEST)
+        except exceptions.ValidationError as ex:
+            return render(ex.detail, status.HTTP_400_BAD_REQUEST)
+
+    def unauthorized(self, detail):
+        '''401 response asking for a token, as DRF sends'''
+        response = render({'detail': detail}, status.HTTP_401_UNAUTHORIZED)
+        response['WWW-Authenticate'] = self.authentication.authenticate_header(None)
+        return response
+
+    async def paginated(self, queryset, request, serialize, paginator=None):
+        '''Render one page of `queryset` with `next` and `previous` cursor links
+
+        Method arguments:
+          serialize -- Function turning the page's rows into JSON data
+          paginator -- The paginator to use, if not a new `pagination_class`
+        '''
+        paginator = paginator or self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, request)
+        return render(paginator.get_paginated_response(serialize(page)).data)
+
+
+class AsyncServiceTicketView(AsyncView):
+    """Honey Rae API service tickets view for ASGI"""
+
+    async def get(self, request, pk=None):
+        """Handle GET requests for one service ticket, or a page of them
+
+        Accepts the same `status`, `q`, `fields` and `expand` parameters
+        as ServiceTicketView.list and retrieve.
+
+        Returns:
+            HttpResponse -- JSON serialized ticket or page of tickets
+        """
+        fieldset = ticket_fieldset(request)
+        if pk is not None:
+            service_ticket = await ticket_rows(ServiceTicket.objects.filter(pk=pk), fieldset=fieldset).aget()
+            return render(ticket_row_data(service_ticket, fieldset))
+
+        paginator = self.pagination_class()
+        rows = ticket_list_rows(filter_tickets(request), request, paginator, fieldset)
+        return await self.paginated(rows, request, lambda page: [ticket_row_data(row, fieldset) for row in page], paginator)
+
+    async def post(self, request, pk=None):  # pylint: disable=unused-argument
+        """Handle POST requests for service tickets
+
+        Returns:
+            HttpResponse -- JSON serialized ticket with 201 status code
+        """
+        new_ticket = ServiceTicket()
+        new_ticket.customer = await Customer.objects.select_related('user').aget(user=request.auth.user)
+        new_ticket.description = request.data['description']
+        new_ticket.emergency = request.data['emergency']
+
+        await save_ticket(new_ticket, None)
+
+        return render(ServiceTicketSerializer(new_ticket).data, status.HTTP_201_CREATED)
+
+    async def put(self, request, pk=None):
+        """Handle PUT requests to assign a service ticket to an employee
+
+        Returns:
+            HttpResponse -- No response body. Just 204 status code.
+        """
+        ticket = await ServiceTicket.objects.aget(pk=pk)
+        before = snapshot(ticket)
+
+        ticket.employee = await Employee.objects.aget(pk=request.data['employee'])
+        await save_ticket(ticket, before)
+
+        return render(None, status.HTTP_204_NO_CONTENT)
+
+    async def delete(self, request, pk=None):
+        """Handle DELETE requests for service tickets
+
+        Returns:
+            HttpResponse -- No response body. Just 204 status code.
+        """
+        await delete_ticket(pk)
+        return render(None, status.HTTP_204_NO_CONTENT)
+
+
+class AsyncCustomerView(AsyncView):
+    """Honey Rae API customers view for ASGI"""
+
+    async def get(self, request, pk=None):
+        """Handle GET requests for one customer, or a page of them
+
+        Returns:
+            HttpResponse -- JSON serialized customer or page of customers
+        """
+        if pk is not None:
+            customer = await Customer.objects.select_related('user').aget(pk=pk)
+            return render(CustomerSerializer(customer).data)
+
+        return await self.paginated(
+            Customer.objects.select_related('user'), request, lambda page: CustomerSerializer(page, many=True).data
+        )
+
+    async def put(self, request, pk=None):
+        """Handle PUT requests for single customer
+
+        Returns:
+            HttpResponse -- No response body. Just 204 status code.
+        """
+        customer = await Customer.objects.aget(pk=pk)
+
+        # Only the customer themselves may change their address
+        if request.auth.user.id != customer.user_id:
+            return render(None, status.HTTP_401_UNAUTHORIZED)
+
+        customer.address = request.data['address']
+        await customer.asave()
+
+        return render(None, status.HTTP_204_NO_CONTENT)
+
+    async def delete(self, request, pk=None):
+        """Handle DELETE requests for single customer
+
+        Returns:
+            HttpResponse -- No response body. Just 204 status code.
+        """
+        customer = await Customer.objects.select_related('user').aget(pk=pk)
+        await sync_to_async(delete_customer)(customer)
+        return render(None, status.HTTP_204_NO_CONTENT)
+
+
+class AsyncEmployeeView(AsyncView):
+    """Honey Rae API employees view for ASGI"""
+
+    async def get(self, request, pk=None):
+        """Handle GET requests for one employee, or a page of them
+
+        Returns:
+            HttpResponse -- JSON serialized employee or page of employees
+        """
+        if pk is not None:
+            employee = await Employee.objects.select_related('user').aget(pk=pk)
+            return render(EmployeeSerializer(employee).data)
+
+        return await self.paginated(
+            Employee.objects.select_related('user'), request, lambda page: EmployeeSerializer(page, many=True).data
+        )
+
+
+class TicketEventView(AsyncView):
+    """Honey Rae API feed of service ticket changes, as Server-Sent Events
+
+    Staff see every ticket and customers only their own. Each event is
+    `created`, `updated` or `deleted`, with a `tickets` list of the id,
+    emergency, date_completed, employee id and customer id of each ticket
+    one request wrote as its data, or `customer_deleted` with just the
+    customer id when a customer and all of their tickets are deleted. See repairsapi.events for where events
+    are kept and how they are replayed.
+
+    Only serve this through honeyrae/asgi.py. Under WSGI each open stream
+    would hold a worker thread for as long as the client stays connected.
+    Each open stream looks for new events every `poll` seconds, with one
+    query on the primary database.
+    """
+
+    authentication = QueryTokenAuthentication()
+    heartbeat = 15
+    poll = 1
+    retry = 3000
+
+    async def get(self, request):
+        """Handle GET requests to stream ticket changes
+
+        Pass the token as `?token=` if the client can't set the
+        Authorization header, as browsers' EventSource can't. The token is
+        then in the URL, which the ASGI server and any proxy in front of it
+        write to their access logs, so keep those logs private or turn off
+        their query strings; the repairsapi middleware redacts it from its
+        own logs. A reconnecting client's Last-Event-ID header replays the
+        events it missed, or sends `reset` if they are no longer kept.
+
+        Returns:
+            StreamingHttpResponse -- text/event-stream that stays open,
+                                     with a comment line every `heartbeat` seconds
+        """
+        customer_id = None
+        if not request.auth.user.is_staff:
+            customer_id = (await Customer.objects.aget(user=request.auth.user)).id
+
+        # From the moment of connecting, not of the first read
+        after, resumed = await resume_after(request.headers.get('Last-Event-ID'))
+        return StreamingHttpResponse(
+            self.stream(customer_id, after, resumed),
+            content_type='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    async def stream(self, customer_id, after, resumed):
+        yield b'retry: %d\n\n' % self.retry
+        if not resumed:
+            yield b'id: %d\nevent: reset\ndata: {}\n\n' % after
+
+        async for event in follow(after, customer_id, self.poll, self.heartbeat):
+            yield b': keepalive\n\n' if event is None else encode(event)
+
+
+@sync_to_async
+def save_ticket(ticket, before):
+    '''Save a new or changed ticket and update the status counters together
+
+    Method arguments:
+      ticket -- The ticket to save
+      before -- Its snapshot from before the change, or None if it is new
+    '''
+    with transaction.atomic():
+        ticket.save()
+        record_ticket_change(before, snapshot(ticket))
+        publish_ticket_events('created' if before is None else 'updated', [ticket])
+
+
+@sync_to_async
+def delete_ticket(pk):
+    '''Delete a ticket and take it off the status counters together'''
+    with transaction.atomic():
+        service_ticket = ServiceTicket.objects.get(pk=pk)
+        before = snapshot(service_ticket)
+        publish_ticket_events('deleted', [service_ticket])
+        service_ticket.delete()
+        record_ticket_change(before, None)
@@ -1,14 +1,28 @@
 """View module for handling requests for customer data"""
+from django.contrib.auth.models import User
 from django.http import HttpResponseServerError
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import serializers, status
+from repairsapi.deletion import delete_customer
+from repairsapi.fieldsets import FieldsetSerializerMixin, only_fieldset, requested_fieldset
 from repairsapi.models import Customer
+from repairsapi.queries import query_budget
+from repairsapi.response_cache import cache_response
+from repairsapi.routers import reads_from_replica
+from repairsapi.versions import conditional_on
 
 
 class CustomerView(ViewSet):
     """Honey Rae API customers view"""
 
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+
+    @query_budget(3)
+    @reads_from_replica
+    @conditional_on(Customer, User)
+    @cache_response(Customer, User)
     def retrieve(self, request, pk=None):
         """Handle GET requests for single customer
 
@@ -16,31 +30,48 @@ class CustomerView(ViewSet):
             Response -- JSON serialized customer record
         """
 
-        # Step 1: Get a single customer based on the primary key in the request URL
-        customer = Customer.objects.get(pk=pk)
+        # Step 1: Get a single customer based on the primary key in the request URL,
+        # reading only the columns of the requested fields
+        fieldset = requested_fieldset(request, CustomerSerializer.Meta.fields)
+        customer = only_fieldset(Customer.objects.all(), fieldset, CUSTOMER_COLUMNS).get(pk=pk)
 
         # Step 2: Serialize the customer record as JSON
-        serialized = CustomerSerializer(customer, context={'request': request})
+        serialized = CustomerSerializer(customer, context={'request': request}, fieldset=fieldset)
 
         # Step 3: Send JSON response to client with 200 status code
         return Response(serialized.data, status=status.HTTP_200_OK)
 
+    @query_budget(3)
+    @reads_from_replica
+    @conditional_on(Customer, User)
+    @cache_response(Customer, User)
     def list(self, request):
         """Handle GET requests to get all customers
 
+        Pass `?fields=` to send only some fields. See repairsapi.fieldsets.
+
         Returns:
-            Response -- JSON serialized list of customers
+            Response -- One page of JSON serialized customers with
+                        `next` and `previous` cursor links
         """
 
-        # Step 1: Get all customer data from the database
-        customers = Customer.objects.all()
+        # Step 1: Get all customer data from the database, joined with the
+        # user table so `full_name` doesn't query once per customer, unless
+        # the client left `full_name` out
+        fieldset = requested_fieldset(request, CustomerSerializer.Meta.fields)
+        customers = only_fieldset(Customer.objects.all(), fieldset, CUSTOMER_COLUMNS)
 
-        # Step 2: Convert the data to JSON format
-        serialized = CustomerSerializer(customers, many=True)
+        # Step 2: Fetch only the page of customers the client asked for
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(customers, request, view=self)
 
-        # Step 3: Respond to the client with the JSON data and 200 status code
-        return Response(serialized.data, status=status.HTTP_200_OK)
+        # Step 3: Convert the data to JSON format
+        serialized = CustomerSerializer(page, many=True, fieldset=fieldset)
 
+        # Step 4: Respond to the client with the JSON data, cursor links and 200 status code
+        return paginator.get_paginated_response(serialized.data)
+
+    @query_budget(35)
     def destroy(self, request, pk=None):
         """Handle DELETE requests for single customer
 
@@ -52,14 +83,16 @@ class CustomerView(ViewSet):
         # TODO: Add a "Delete my account" feature to client application
 
         # Step 1: Get a single customer based on the primary key in the request URL
-        customer = Customer.objects.get(pk=pk)
+        customer = Customer.objects.select_related('user').get(pk=pk)
 
-        # Step 2: Delete the customer from the database
-        customer.delete()
+        # Step 2: Delete the customer, their tickets and their user account
+        # from the database, the tickets with a single DELETE
+        delete_customer(customer)
 
         # Step 3: Respond with no body and a 204 status code
         return Response(None, status=status.HTTP_204_NO_CONTENT)
 
+    @query_budget(4)
     def update(self, request, pk=None):
         """Handle PUT requests for single customer
 
@@ -71,7 +104,7 @@ class CustomerView(ViewSet):
             customer = Customer.objects.get(pk=pk)
 
             # Verify that the request was made by the person being updated
-            if request.auth.user == customer.user:
+            if request.auth.user.id == customer.user_id:
 
                 # Update the record and save back to the database
                 customer.address = request.data["address"]
@@ -93,7 +126,15 @@ class CustomerView(ViewSet):
             return HttpResponseServerError(ex)
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+# Columns behind each field of CustomerSerializer's output
+CUSTOMER_COLUMNS = {
+    'id': ('id',),
+    'address': ('address',),
+    'full_name': ('user__first_name', 'user__last_name'),
+}
+
+
+class CustomerSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """JSON serializer for customers"""
 
     class Meta:
@@ -1,8 +1,15 @@
 """View module for handling requests for employee data"""
+from django.contrib.auth.models import User
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import serializers, status
+from repairsapi.fieldsets import FieldsetSerializerMixin, only_fieldset, requested_fieldset
 from repairsapi.models import Employee
+from repairsapi.queries import query_budget
+from repairsapi.response_cache import cache_response
+from repairsapi.routers import reads_from_replica
+from repairsapi.versions import conditional_on
 
 
 # TODO: Make employees users of the system that can log in with the client app.
@@ -11,42 +18,70 @@ from repairsapi.models import Employee
 class EmployeeView(ViewSet):
     """Honey Rae API employees view"""
 
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+
+    @query_budget(1)
     def create(self, request):
         """Unsupported from customer facing client"""
 
         # TODO: Once employees can authenticate, make one of them
         return Response({'message': 'Unsupported HTTP method'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    @query_budget(3)
+    @reads_from_replica
+    @conditional_on(Employee, User)
+    @cache_response(Employee, User)
     def retrieve(self, request, pk=None):
         """Handle GET requests for single employee
 
         Returns:
             Response -- JSON serialized employee record
         """
-        employee = Employee.objects.get(pk=pk)
-        serialized = EmployeeSerializer(employee, context={'request': request})
+        fieldset = requested_fieldset(request, EmployeeSerializer.Meta.fields)
+        employee = only_fieldset(Employee.objects.all(), fieldset, EMPLOYEE_COLUMNS).get(pk=pk)
+        serialized = EmployeeSerializer(employee, context={'request': request}, fieldset=fieldset)
         return Response(serialized.data, status=status.HTTP_200_OK)
 
+    @query_budget(3)
+    @reads_from_replica
+    @conditional_on(Employee, User)
+    @cache_response(Employee, User)
     def list(self, request):
         """Handle GET requests to get all employees
 
+        Pass `?fields=` to send only some fields. See repairsapi.fieldsets.
+
         Returns:
-            Response -- JSON serialized list of employees
+            Response -- One page of JSON serialized employees with
+                        `next` and `previous` cursor links
         """
-        employees = Employee.objects.all()
-        serialized = EmployeeSerializer(employees, many=True)
-        return Response(serialized.data, status=status.HTTP_200_OK)
+        fieldset = requested_fieldset(request, EmployeeSerializer.Meta.fields)
+        employees = only_fieldset(Employee.objects.all(), fieldset, EMPLOYEE_COLUMNS)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(employees, request, view=self)
+        serialized = EmployeeSerializer(page, many=True, fieldset=fieldset)
+        return paginator.get_paginated_response(serialized.data)
 
+    @query_budget(1)
     def destroy(self, request, pk=None):
         """Unsupported from customer facing client"""
         return Response({'message': 'Unsupported HTTP method'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    @query_budget(1)
     def update(self, request, pk=None):
         """Unsupported from customer facing client"""
         return Response({'message': 'Unsupported HTTP method'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
 
-class EmployeeSerializer(serializers.ModelSerializer):
+# Columns behind each field of EmployeeSerializer's output
+EMPLOYEE_COLUMNS = {
+    'id': ('id',),
+    'specialty': ('specialty',),
+    'full_name': ('user__first_name', 'user__last_name'),
+}
+
+
+class EmployeeSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """JSON serializer for employees"""
     class Meta:
         model = Employee
@@ -0,0 +1,28 @@
+import hmac
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+from repairsapi.metrics import render_metrics
+
+
+@require_GET
+def metrics(request):
+    '''Serves the request histograms and token cache counters for Prometheus
+
+    Only to a scraper sending the METRICS_TOKEN setting as a bearer token.
+
+    Method arguments:
+      request -- The full HTTP request object
+    '''
+    if not has_metrics_token(request):
+        return HttpResponseForbidden('Send the metrics token as "Authorization: Bearer <token>"')
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def has_metrics_token(request):
+    '''Whether the request's bearer token is the METRICS_TOKEN setting'''
+    expected = getattr(settings, 'METRICS_TOKEN', None)
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if not expected or scheme.lower() != 'bearer':
+        return False
+    return hmac.compare_digest(token.strip().encode(), expected.encode())
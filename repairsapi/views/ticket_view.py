@@ -1,27 +1,154 @@
 """View module for handling requests for serviceTicket data"""
 from datetime import datetime
-from django.http import HttpResponseServerError
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.db.models.functions import Concat
+from django.http import HttpResponseServerError, StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import serializers, status
-from repairsapi.models import ServiceTicket, Customer, Employee
+from repairsapi.dispatch import dispatch_tickets
+from repairsapi.events import publish_ticket_events
+from repairsapi.fieldsets import Fieldset, requested_fieldset
+from repairsapi.stats import COUNTERS, record_ticket_change, record_ticket_changes, snapshot
+from repairsapi.renderers import encode_json
+from repairsapi.response_cache import cache_response
+from repairsapi.routers import reads_from_replica
+from repairsapi.search import is_ranked, search_tickets
+from repairsapi.versions import bump_versions, conditional_on
+from repairsapi.models import ServiceTicket, Customer, Employee, TicketStatistic
+from repairsapi.queries import query_budget
+
+
+# Columns behind each field of ServiceTicketSerializer's output, read by
+# `ticket_rows()`. A relation that isn't expanded only needs its id.
+TICKET_COLUMNS = {
+    'id': ('id',),
+    'description': ('description',),
+    'emergency': ('emergency',),
+    'date_completed': ('date_completed',),
+    'employee': ('employee_id',),
+    'customer': ('customer_id',),
+}
+TICKET_RELATIONS = ('employee', 'customer')
+
+# Every field, with employees and customers nested, as sent by default
+TICKET_FIELDSET = Fieldset(TICKET_COLUMNS, TICKET_RELATIONS)
+
+# Columns and database computed names read when a relation is expanded
+EXPANDED_COLUMNS = {
+    'employee': (
+        ('employee__specialty',),
+        {'employee_full_name': Concat('employee__user__first_name', Value(' '), 'employee__user__last_name')},
+    ),
+    'customer': (
+        (),
+        {'customer_full_name': Concat('customer__user__first_name', Value(' '), 'customer__user__last_name')},
+    ),
+}
+
+
+def ticket_rows(service_tickets, *extra, fieldset=None):
+    """Read only the columns ServiceTicketSerializer outputs, as flat dicts
+
+    The customer and employee `full_name`s are concatenated by the
+    database, so no model instances are built for the rows. Any `extra`
+    columns or annotations are read too, for ordering and pagination.
+
+    Given a `fieldset`, only the columns of its fields are read, and the
+    employee and user tables are only joined for expanded relations.
+    """
+    if fieldset is None:
+        fieldset = TICKET_FIELDSET
+
+    columns = ['id', *fieldset.columns(TICKET_COLUMNS), *extra]
+    annotations = {}
+    for relation in TICKET_RELATIONS:
+        if fieldset.expands(relation):
+            columns.extend(EXPANDED_COLUMNS[relation][0])
+            annotations.update(EXPANDED_COLUMNS[relation][1])
+
+    return service_tickets.values(*dict.fromkeys(columns), **annotations)
+
+
+def ticket_row_data(row, fieldset=None):
+    """Shape a `ticket_rows()` row exactly as ServiceTicketSerializer would
+    shape the ticket, down to the key order, so the rendered JSON is identical
+
+    Given a `fieldset`, only its fields are included, and relations it
+    doesn't expand are given as their id.
+    """
+    if fieldset is None or fieldset == TICKET_FIELDSET:
+        date_completed = row['date_completed']
+        return {
+            'id': row['id'],
+            'description': row['description'],
+            'emergency': row['emergency'],
+            'date_completed': None if date_completed is None else date_completed.isoformat(),
+            'employee': ticket_employee_data(row),
+            'customer': ticket_customer_data(row),
+        }
+
+    data = {}
+    for field in fieldset.fields:
+        if field == 'date_completed':
+            data[field] = None if row[field] is None else row[field].isoformat()
+        elif field == 'employee':
+            data[field] = ticket_employee_data(row) if fieldset.expands(field) else row['employee_id']
+        elif field == 'customer':
+            data[field] = ticket_customer_data(row) if fieldset.expands(field) else row['customer_id']
+        else:
+            data[field] = row[field]
+
+    return data
+
+
+def ticket_employee_data(row):
+    """The nested `employee` object of a `ticket_rows()` row"""
+    return None if row['employee_id'] is None else {
+        'id': row['employee_id'],
+        'specialty': row['employee__specialty'],
+        'full_name': row['employee_full_name'],
+    }
+
+
+def ticket_customer_data(row):
+    """The nested `customer` object of a `ticket_rows()` row"""
+    return {
+        'id': row['customer_id'],
+        'full_name': row['customer_full_name'],
+    }
 
 
 class ServiceTicketView(ViewSet):
     """Honey Rae API service tickets view"""
 
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+    stream_chunk_size = 2000
+    bulk_max_items = 1000
+
+    @query_budget(12)
     def destroy(self, request, pk=None):
         """Handle DELETE requests for service tickets
 
         Returns:
             Response: None with 204 status code
         """
-        service_ticket = ServiceTicket.objects.get(pk=pk)
-        service_ticket.delete()
+        with transaction.atomic():
+            service_ticket = ServiceTicket.objects.get(pk=pk)
+            before = snapshot(service_ticket)
+            publish_ticket_events('deleted', [service_ticket])
+            service_ticket.delete()
+            record_ticket_change(before, None)
 
         return Response(None, status=status.HTTP_204_NO_CONTENT)
 
 
+    @query_budget(8)
     def create(self, request):
         """Handle POST requests for service tickets
 
@@ -29,57 +156,330 @@ class ServiceTicketView(ViewSet):
             Response: JSON serialized representation of newly created service ticket
         """
         new_ticket = ServiceTicket()
-        new_ticket.customer = Customer.objects.get(user=request.auth.user)
+        new_ticket.customer = Customer.objects.select_related('user').get(user=request.auth.user)
         new_ticket.description = request.data['description']
         new_ticket.emergency = request.data['emergency']
-        new_ticket.save()
+
+        with transaction.atomic():
+            new_ticket.save()
+            record_ticket_change(None, snapshot(new_ticket))
+            publish_ticket_events('created', [new_ticket])
 
         serialized = ServiceTicketSerializer(new_ticket, many=False)
 
         return Response(serialized.data, status=status.HTTP_201_CREATED)
 
+    @query_budget(3)
+    @reads_from_replica
+    @conditional_on(ServiceTicket, Customer, Employee, User)
+    @cache_response(ServiceTicket, Customer, Employee, User)
     def retrieve(self, request, pk=None):
         """Handle GET requests for single serviceTicket
 
         Returns:
             Response -- JSON serialized serviceTicket record
         """
-        service_ticket = ServiceTicket.objects.get(pk=pk)
-        serialized = ServiceTicketSerializer(service_ticket)
-        return Response(serialized.data, status=status.HTTP_200_OK)
-
+        fieldset = ticket_fieldset(request)
+        service_ticket = ticket_rows(ServiceTicket.objects.filter(pk=pk), fieldset=fieldset).get()
+        return Response(ticket_row_data(service_ticket, fieldset), status=status.HTTP_200_OK)
+
+    @query_budget(3)
+    @reads_from_replica
+    @conditional_on(ServiceTicket, Customer, Employee, User)
+    @cache_response(ServiceTicket, Customer, Employee, User)
     def list(self, request):
         """Handle GET requests to get all serviceTickets
 
+        Pass `?q=` to search ticket descriptions. Matches come most
+        relevant first, and combine with `status`.
+
+        Pass `?stream=1` (or `true` or `yes`, or `ndjson` for one JSON
+        object per line) to export every matching ticket in a single
+        streamed response instead of one page. `?stream=0` sends a page.
+
+        Pass `?fields=` and `?expand=` to send only some fields, and
+        employees and customers as ids. See repairsapi.fieldsets.
+
+        Returns:
+            Response -- One page of JSON serialized serviceTickets with
+                        `next` and `previous` cursor links
+        """
+        fieldset = ticket_fieldset(request)
+        service_tickets = filter_tickets(request)
+
+        stream = request.query_params.get("stream", "").lower()
+        if stream in ("1", "true", "yes", "ndjson"):
+            is_async = isinstance(request._request, ASGIRequest)  # pylint: disable=protected-access
+            return self.stream_tickets(service_tickets, stream == "ndjson", fieldset, is_async)
+
+        paginator = self.pagination_class()
+        rows = ticket_list_rows(service_tickets, request, paginator, fieldset)
+        page = paginator.paginate_queryset(rows, request, view=self)
+        return paginator.get_paginated_response([ticket_row_data(row, fieldset) for row in page])
+
+    def stream_tickets(self, service_tickets, ndjson=False, fieldset=None, is_async=False):
+        """Stream every ticket in `service_tickets` as a JSON array or NDJSON
+
+        Rows are read from the database cursor `stream_chunk_size` at a time
+        and each chunk is serialized and encoded before the next is fetched,
+        so only one chunk is ever held in memory.
+
+        Under ASGI the body must be an async iterator, or Django reads the
+        whole of a sync one into a list in a worker thread before sending
+        any of it. Pass `is_async` for ASGI requests to fetch the chunks
+        with the async ORM instead.
+
         Returns:
-            Response -- JSON serialized list of serviceTickets
+            StreamingHttpResponse -- Chunked JSON body with 200 status code
         """
-        service_tickets = []
+        # Fixed now, as the replica picked for this request is only current
+        # while the view runs
+        tickets = ticket_rows(service_tickets, fieldset=fieldset).order_by('id').using(service_tickets.db)
+
+        def generate():
+            chunk = []
+            first = True
+
+            if not ndjson:
+                yield b'['
+
+            for ticket in tickets.iterator(chunk_size=self.stream_chunk_size):
+                chunk.append(ticket)
+                if len(chunk) == self.stream_chunk_size:
+                    yield encode(chunk, first)
+                    chunk = []
+                    first = False
+
+            if chunk:
+                yield encode(chunk, first)
+
+            if not ndjson:
+                yield b']'
+
+        async def agenerate():
+            chunk = []
+            first = True
+
+            if not ndjson:
+                yield b'['
+
+            async for ticket in tickets.aiterator(chunk_size=self.stream_chunk_size):
+                chunk.append(ticket)
+                if len(chunk) == self.stream_chunk_size:
+                    yield encode(chunk, first)
+                    chunk = []
+                    first = False
+
+            if chunk:
+                yield encode(chunk, first)
+
+            if not ndjson:
+                yield b']'
+
+        def encode(chunk, first):
+            rows = [encode_json(ticket_row_data(item, fieldset)) for item in chunk]
+            if ndjson:
+                return b'\n'.join(rows) + b'\n'
+            return (b'' if first else b',') + b','.join(rows)
+
+        content_type = 'application/x-ndjson' if ndjson else 'application/json'
+        body = agenerate() if is_async else generate()
+        return StreamingHttpResponse(body, content_type=content_type, status=status.HTTP_200_OK)
 
-        if "status" in request.query_params:
-            if request.query_params['status'] == "done":
-                service_tickets = ServiceTicket.objects.filter(date_completed__isnull=False)
+    @query_budget(2)
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Handle GET requests for ticket counts by status
 
-            if request.query_params['status'] == "unclaimed":
-                service_tickets = ServiceTicket.objects.filter(date_completed__isnull=False, employee__isnull=False)
+        Reads the incrementally maintained counters rather than counting
+        the ticket table, so it is cheap enough to poll.
 
-            if request.query_params['status'] == "inprogress":
-                service_tickets = ServiceTicket.objects.filter(date_completed__isnull=False, employee__isnull=True)
+        Returns:
+            Response -- JSON counts overall and for each employee
+        """
+        if not request.auth.user.is_staff:
+            return Response({'message': 'Only staff can view ticket statistics'}, status=status.HTTP_403_FORBIDDEN)
 
-            if request.query_params['status'] == "all":
-                service_tickets = ServiceTicket.objects.all()
+        data = dict.fromkeys(COUNTERS, 0)
+        data['employees'] = []
 
+        for row in TicketStatistic.objects.select_related('employee__user').order_by('employee'):
+            counts = {counter: getattr(row, counter) for counter in COUNTERS}
+            if row.employee is None:
+                data.update(counts)
+            else:
+                data['employees'].append({
+                    'id': row.employee.id,
+                    'full_name': row.employee.full_name,
+                    **counts
+                })
+
+        return Response(data, status=status.HTTP_200_OK)
+
+    @query_budget(8)
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Handle POST requests to create many service tickets at once
+
+        Expects a JSON array of `{"description", "emergency"}` objects. Staff
+        must also give the `customer` id of each ticket; customers always
+        create tickets for themselves. Valid items are inserted together
+        with one bulk insert, and invalid ones are reported without
+        stopping the rest. /tickets/events clients are sent one `created`
+        event listing them all.
+
+        Returns:
+            Response -- One result per item, in request order: the serialized
+                        ticket or its `errors`. 201 if every item was created,
+                        207 if only some were, 400 if none were.
+        """
+        if not isinstance(request.data, list) or len(request.data) > self.bulk_max_items:
+            return Response(
+                {'message': f'Expected a JSON array of at most {self.bulk_max_items} tickets'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        items = [BulkTicketSerializer(data=item) for item in request.data]
+        results = [None if item.is_valid() else {'errors': item.errors} for item in items]
+
+        # Look up every customer in one query
+        if request.auth.user.is_staff:
+            customer_ids = {item.validated_data.get('customer') for item in items if item.is_valid()}
+            customers = Customer.objects.select_related('user').in_bulk(customer_ids - {None})
         else:
-            if request.auth.user.is_staff:
-                service_tickets = ServiceTicket.objects.all()
+            customer = Customer.objects.select_related('user').filter(user=request.auth.user).first()
+            if customer is None:
+                return Response({'message': 'Only customers and staff can create tickets'}, status=status.HTTP_403_FORBIDDEN)
+            customers = {None: customer}
+
+        new_tickets = []
+        for index, item in enumerate(items):
+            if results[index] is not None:
+                continue
+
+            customer_id = item.validated_data.get('customer') if request.auth.user.is_staff else None
+            if customer_id not in customers:
+                results[index] = {'errors': {'customer': ['A valid customer id is required']}}
+                continue
+
+            new_tickets.append((index, ServiceTicket(
+                customer=customers[customer_id],
+                description=item.validated_data['description'],
+                emergency=item.validated_data['emergency']
+            )))
+
+        with transaction.atomic():
+            ServiceTicket.objects.bulk_create([ticket for _, ticket in new_tickets], batch_size=500)
+            bump_versions(ServiceTicket)
+            record_ticket_changes((None, snapshot(ticket)) for _, ticket in new_tickets)
+            publish_ticket_events('created', [ticket for _, ticket in new_tickets])
+
+        serialized = ServiceTicketSerializer([ticket for _, ticket in new_tickets], many=True).data
+        for (index, _), ticket in zip(new_tickets, serialized):
+            results[index] = ticket
+
+        return Response(results, status=bulk_status(len(new_tickets), len(results), status.HTTP_201_CREATED))
+
+    @query_budget(20)
+    @action(detail=False, methods=['put'])
+    def assign(self, request):
+        """Handle PUT requests to assign many service tickets at once
+
+        Expects a JSON array of `{"ticket", "employee"}` id pairs. Tickets
+        and employees are each looked up with one query, and the valid
+        assignments are written with one UPDATE however many employees
+        they go to, and sent to /tickets/events clients as one `updated`
+        event.
+
+        Returns:
+            Response -- One result per pair, in request order, either the
+                        pair itself or its `errors`. 200 if every pair was
+                        assigned, 207 if only some were, 400 if none were.
+        """
+        if not request.auth.user.is_staff:
+            return Response({'message': 'Only staff can assign tickets'}, status=status.HTTP_403_FORBIDDEN)
+
+        if not isinstance(request.data, list) or len(request.data) > self.bulk_max_items:
+            return Response(
+                {'message': f'Expected a JSON array of at most {self.bulk_max_items} assignments'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        items = [TicketAssignmentSerializer(data=item) for item in request.data]
+        results = [item.validated_data if item.is_valid() else {'errors': item.errors} for item in items]
+
+        valid = [result for result in results if 'errors' not in result]
+        tickets = {
+            row['id']: row for row in ServiceTicket.objects
+                .filter(pk__in={result['ticket'] for result in valid})
+                .values('id', 'customer_id', 'employee_id', 'date_completed', 'emergency')
+        }
+        employees = set(Employee.objects.filter(pk__in={result['employee'] for result in valid}).values_list('id', flat=True))
+
+        assignments = {}
+        for index, result in enumerate(results):
+            if 'errors' in result:
+                continue
+
+            errors = {}
+            if result['ticket'] not in tickets:
+                errors['ticket'] = ['Ticket does not exist']
+            elif result['ticket'] in assignments:
+                errors['ticket'] = ['Ticket appears more than once']
+            if result['employee'] not in employees:
+                errors['employee'] = ['Employee does not exist']
+
+            if errors:
+                results[index] = {'errors': errors}
             else:
-                service_tickets = ServiceTicket.objects.filter(customer__user=request.auth.user)
+                assignments[result['ticket']] = result['employee']
+
+        by_employee = {}
+        for ticket_id, employee_id in assignments.items():
+            by_employee.setdefault(employee_id, []).append(ticket_id)
+
+        with transaction.atomic():
+            if assignments:
+                ServiceTicket.objects.filter(pk__in=assignments).update(employee_id=Case(
+                    *(When(pk__in=ticket_ids, then=employee_id) for employee_id, ticket_ids in by_employee.items())
+                ))
+            bump_versions(ServiceTicket)
+
+            record_ticket_changes(
+                (snapshot(tickets[ticket_id]), snapshot({**tickets[ticket_id], 'employee_id': employee_id}))
+                for ticket_id, employee_id in assignments.items()
+            )
+            publish_ticket_events('updated', (
+                {**tickets[ticket_id], 'employee_id': employee_id} for ticket_id, employee_id in assignments.items()
+            ))
+
+        return Response(results, status=bulk_status(len(assignments), len(results), status.HTTP_200_OK))
+
+    @query_budget(10)
+    @action(detail=False, methods=['post'], url_path='dispatch')
+    def dispatch_unclaimed(self, request):
+        """Handle POST requests to assign every unclaimed ticket at once
+
+        Routed at /tickets/dispatch, as `dispatch` is taken by the ViewSet.
+        Each open, unassigned ticket goes to the least loaded employee whose
+        specialty its description mentions, or else the least loaded
+        employee overall, emergencies first. See repairsapi.dispatch.
 
+        Returns:
+            Response -- How many tickets were assigned and the
+                        `{"ticket", "employee"}` pairs, with 200 status code
+        """
+        if not request.auth.user.is_staff:
+            return Response({'message': 'Only staff can dispatch tickets'}, status=status.HTTP_403_FORBIDDEN)
 
+        plan = dispatch_tickets()
 
-        serialized = ServiceTicketSerializer(service_tickets, many=True)
-        return Response(serialized.data, status=status.HTTP_200_OK)
+        return Response({
+            'assigned': len(plan),
+            'assignments': [{'ticket': ticket_id, 'employee': employee_id} for ticket_id, employee_id in plan.items()],
+        }, status=status.HTTP_200_OK)
 
+    @query_budget(13)
     def update(self, request, pk=None):
         """Handle PUT requests for single customer
 
@@ -89,6 +489,7 @@ class ServiceTicketView(ViewSet):
 
         # Select the targeted ticket using pk
         ticket = ServiceTicket.objects.get(pk=pk)
+        before = snapshot(ticket)
 
         # Get the employee id from the client request
         employee_id = request.data['employee']
@@ -99,12 +500,95 @@ class ServiceTicketView(ViewSet):
         # Assign that Employee instance to the employee property of the ticket
         ticket.employee = assigned_employee
 
-        # Save the updated ticket
-        ticket.save()
+        # Save the updated ticket and move it between the status counters
+        with transaction.atomic():
+            ticket.save()
+            record_ticket_change(before, snapshot(ticket))
+            publish_ticket_events('updated', [ticket])
 
         return Response(None, status=status.HTTP_204_NO_CONTENT)
 
 
+def filter_tickets(request):
+    """Build the ticket queryset for the `status` and `q` filters and requesting user
+
+    Shared by ServiceTicketView.list and the async ticket view.
+
+    Returns:
+        QuerySet -- Matching tickets, for `ticket_rows()` to project
+    """
+    service_tickets = ServiceTicket.objects.none()
+    tickets = ServiceTicket.objects.all()
+
+    if "status" in request.query_params:
+        if request.query_params['status'] == "done":
+            service_tickets = tickets.filter(date_completed__isnull=False)
+
+        if request.query_params['status'] == "unclaimed":
+            service_tickets = tickets.filter(employee__isnull=True)
+
+        if request.query_params['status'] == "inprogress":
+            service_tickets = tickets.filter(employee__isnull=False, date_completed__isnull=True)
+
+        if request.query_params['status'] == "all":
+            service_tickets = tickets.all()
+
+    else:
+        if request.auth.user.is_staff:
+            service_tickets = tickets.all()
+        else:
+            service_tickets = tickets.filter(customer__user=request.auth.user)
+
+    if "q" in request.query_params:
+        service_tickets = search_tickets(service_tickets, request.query_params['q'])
+
+    return service_tickets
+
+
+def ticket_fieldset(request):
+    """The ticket fields requested with `?fields=` and `?expand=`"""
+    return requested_fieldset(request, TICKET_FIELDSET.fields, TICKET_RELATIONS)
+
+
+def ticket_list_rows(service_tickets, request, paginator, fieldset):
+    """`ticket_rows()` for a page of the ticket list
+
+    Shared by ServiceTicketView.list and the async ticket view. A `?q=`
+    search is paged most relevant first where results are ranked, by
+    setting the paginator's ordering.
+
+    Returns:
+        QuerySet -- Rows for `paginator` to page through
+    """
+    extra = ()
+    if "q" in request.query_params and is_ranked():
+        paginator.ordering = ('rank', 'id')
+        extra = ('rank',)
+    return ticket_rows(service_tickets, *extra, fieldset=fieldset)
+
+
+def bulk_status(succeeded, total, success_status):
+    """Status code for a bulk request where `succeeded` of `total` items worked"""
+    if succeeded == total:
+        return success_status
+    if succeeded == 0:
+        return status.HTTP_400_BAD_REQUEST
+    return status.HTTP_207_MULTI_STATUS
+
+
+class BulkTicketSerializer(serializers.Serializer):
+    """Validates one item of a bulk ticket create request"""
+    description = serializers.CharField(max_length=155)
+    emergency = serializers.BooleanField(default=False)
+    customer = serializers.IntegerField(required=False)
+
+
+class TicketAssignmentSerializer(serializers.Serializer):
+    """Validates one ticket/employee pair of a bulk assign request"""
+    ticket = serializers.IntegerField()
+    employee = serializers.IntegerField()
+
+
 class TicketEmployeeSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -1,12 +1,21 @@
 #!/bin/bash
+#
+# Usage: ./seed_database.sh
+#          Small fixture data set with the well known logins
+#        ./seed_database.sh synthetic [seed_synthetic options]
+#          Large generated data set, e.g. --tickets 1000000
 
-rm db.sqlite3
-rm -rf ./repairsapi/migrations
+rm -f db.sqlite3
 python3 manage.py migrate
-python3 manage.py makemigrations repairsapi
-python3 manage.py migrate repairsapi
-python3 manage.py loaddata users
-python3 manage.py loaddata tokens
-python3 manage.py loaddata customers
-python3 manage.py loaddata employees
-python3 manage.py loaddata tickets
+
+if [ "$1" = "synthetic" ]; then
+    shift
+    python3 manage.py seed_synthetic "$@"
+else
+    python3 manage.py loaddata users
+    python3 manage.py loaddata tokens
+    python3 manage.py loaddata customers
+    python3 manage.py loaddata employees
+    python3 manage.py loaddata tickets
+    python3 manage.py reconcile_ticket_stats
+fi